@@ -7,3 +7,35 @@ admin.site.register(Utilisateur)
 admin.site.register(CompteBancaire)
 admin.site.register(Pret)
 admin.site.register(Transaction)
+admin.site.register(CleIdempotence)
+admin.site.register(CumulJournalier)
+admin.site.register(Echeance)
+admin.site.register(Tache)
+admin.site.register(CompteSupprime)
+admin.site.register(TransactionSupprimee)
+admin.site.register(ReglementImporte)
+
+
+class LectureSeuleAdmin(admin.ModelAdmin):
+    """Grand livre en ajout seul : consultable, ni modifiable ni supprimable"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EcritureComptable)
+class EcritureComptableAdmin(LectureSeuleAdmin):
+    list_display = ["date_ecriture", "compte", "sequence", "sens", "montant"]
+    list_filter = ["sens"]
+    search_fields = ["compte__numero_compte", "mouvement"]
+
+
+@admin.register(SoldeInstantane)
+class SoldeInstantaneAdmin(LectureSeuleAdmin):
+    list_display = ["compte", "sequence", "solde", "date_ecriture"]
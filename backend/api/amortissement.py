@@ -0,0 +1,186 @@
+from decimal import Decimal
+
+import numpy as np
+from django.db.models.functions import Coalesce, TruncDate
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from .models import Echeance, Pret
+
+TAILLE_LOT = 10000
+
+
+def _tableau(principal, taux_mensuel, duree, type_amortissement):
+    """
+    Capital et intérêts (en centimes) de chaque échéance, pour des prêts de même durée.
+
+    `principal` et `taux_mensuel` sont des vecteurs (N,) ; le résultat est une
+    paire de matrices (N, duree) d'entiers. Chaque montant est arrondi au
+    centime à partir des valeurs exactes, et la dernière échéance absorbe
+    l'écart d'arrondi pour que la somme du capital égale le principal.
+    """
+    p = principal[:, None].astype(float)
+    r = taux_mensuel[:, None]
+    k = np.arange(duree)[None, :]  # échéances déjà payées avant chacune
+
+    if type_amortissement == "degressif":
+        # Capital constant, intérêts sur le capital restant dû
+        capital_exact = np.broadcast_to(p / duree, (len(principal), duree))
+        restant = p - p / duree * k
+    else:
+        # Annuités constantes : A = P·r / (1 − (1 + r)^−n), A = P/n si r = 0
+        facteur = (1 + r) ** k
+        avec_taux = r > 0
+        r_sur = np.where(avec_taux, r, 1.0)
+        annuite = np.where(
+            avec_taux, p * r_sur / (1 - (1 + r_sur) ** -duree), p / duree
+        )
+        restant = np.where(
+            avec_taux, p * facteur - annuite * (facteur - 1) / r_sur, p - annuite * k
+        )
+        capital_exact = annuite - r * restant
+
+    interets = np.rint(r * restant).astype(np.int64)
+    capital = np.rint(capital_exact).astype(np.int64)
+    capital[:, -1] = principal - capital[:, :-1].sum(axis=1)
+    return capital, interets
+
+
+def _dates(debuts, duree):
+    """Dates d'échéance (N, duree) : même jour du mois, ramené au dernier jour si besoin"""
+    mois = debuts.astype("datetime64[M]")[:, None] + np.arange(1, duree + 1)
+    premiers = mois.astype("datetime64[D]")
+    longueurs = ((mois + 1).astype("datetime64[D]") - premiers).astype(np.int64)
+    jours = (debuts - debuts.astype("datetime64[M]").astype("datetime64[D]")).astype(
+        np.int64
+    )
+    return premiers + np.minimum(jours[:, None], longueurs - 1)
+
+
+def _interets_courus(debuts, dates, interets, date_reference):
+    """Intérêts des échéances échues plus le prorata de l'échéance en cours"""
+    reference = np.datetime64(date_reference, "D")
+    precedentes = np.concatenate([debuts[:, None], dates[:, :-1]], axis=1)
+    echues = dates <= reference
+    en_cours = (precedentes <= reference) & ~echues
+    prorata = (reference - precedentes).astype(float) / (dates - precedentes).astype(
+        float
+    )
+    courus = np.where(echues, interets, 0) + np.where(en_cours, interets * prorata, 0)
+    return np.rint(courus.sum(axis=1)).astype(np.int64)
+
+
+class Echeanciers:
+    """Échéanciers d'un lot de prêts de même durée et même type d'amortissement"""
+
+    def __init__(self, ids, dates, capital, interets, restant_du, interets_courus):
+        self.ids = ids
+        self.dates = dates
+        self.capital = capital
+        self.interets = interets
+        self.restant_du = restant_du
+        self.interets_courus = interets_courus
+
+
+def calculer(prets, date_reference=None):
+    """
+    Calcule les échéanciers d'un lot de prêts en une passe vectorisée par groupe.
+
+    `prets` est une séquence de tuples (id, principal, taux_annuel, duree_mois,
+    type_amortissement, date_debut). Les prêts sont regroupés par durée et type
+    pour que chaque groupe tienne dans des matrices pleines. Les montants sont
+    calculés en centimes. Retourne une liste d'`Echeanciers`.
+    """
+    date_reference = date_reference or timezone.localdate()
+    groupes = {}
+    for pret in prets:
+        groupes.setdefault((pret[3], pret[4]), []).append(pret)
+
+    resultats = []
+    for (duree, type_amortissement), groupe in groupes.items():
+        ids = np.array([pret[0] for pret in groupe], dtype=np.int64)
+        principal = np.array([int(pret[1] * 100) for pret in groupe], dtype=np.int64)
+        taux_mensuel = np.array([float(pret[2]) / 12 for pret in groupe])
+        debuts = np.array([pret[5] for pret in groupe], dtype="datetime64[D]")
+
+        capital, interets = _tableau(principal, taux_mensuel, duree, type_amortissement)
+        dates = _dates(debuts, duree)
+        resultats.append(
+            Echeanciers(
+                ids,
+                dates,
+                capital,
+                interets,
+                principal[:, None] - np.cumsum(capital, axis=1),
+                _interets_courus(debuts, dates, interets, date_reference),
+            )
+        )
+    return resultats
+
+
+def _decimal(centimes):
+    return Decimal(centimes).scaleb(-2)
+
+
+def lignes_echeances(echeanciers, ids=None):
+    """Convertit des échéanciers calculés (des prêts `ids` s'il est fourni) en lignes `Echeance`"""
+    for lot in echeanciers:
+        for pret_id, dates, capital, interets, restant_du in zip(
+            lot.ids.tolist(),
+            lot.dates.tolist(),
+            lot.capital.tolist(),
+            lot.interets.tolist(),
+            lot.restant_du.tolist(),
+        ):
+            if ids is not None and pret_id not in ids:
+                continue
+            for numero, ligne in enumerate(
+                zip(dates, capital, interets, restant_du), start=1
+            ):
+                yield Echeance(
+                    pret_id=pret_id,
+                    numero=numero,
+                    date_echeance=ligne[0],
+                    capital=_decimal(ligne[1]),
+                    interets=_decimal(ligne[2]),
+                    restant_du=_decimal(ligne[3]),
+                )
+
+
+def prets_a_calculer(ids=None):
+    """Prêts en cours, au format attendu par `calculer`"""
+    prets = Pret.objects.filter(statut="en_cours")
+    if ids is not None:
+        prets = prets.filter(pk__in=ids)
+    return prets.annotate(
+        principal=Coalesce("montant_initial", "montant"),
+        debut=Coalesce("date_debut", TruncDate("date_demande")),
+    ).values_list(
+        "pk", "principal", "taux_annuel", "duree_mois", "type_amortissement", "debut"
+    )
+
+
+def enregistrer_echeanciers(ids=None, taille_lot=TAILLE_LOT):
+    """
+    Recalcule et enregistre les échéanciers des prêts en cours.
+
+    Parcourt les prêts par plages de clés primaires ; chaque lot remplace ses
+    échéances (`bulk_create`) dans sa propre transaction. Les intérêts courus
+    sont comptabilisés à part, par `api.interets`. Retourne le nombre de
+    prêts traités.
+    """
+    total = 0
+    dernier_id = 0
+    while True:
+        lot = list(
+            prets_a_calculer(ids).filter(pk__gt=dernier_id).order_by("pk")[:taille_lot]
+        )
+        if not lot:
+            return total
+        dernier_id = lot[-1][0]
+        echeanciers = calculer(lot)
+
+        with atomic():
+            Echeance.objects.filter(pret_id__in=[pret[0] for pret in lot]).delete()
+            Echeance.objects.bulk_create(lignes_echeances(echeanciers), batch_size=5000)
+        total += len(lot)
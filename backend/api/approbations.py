@@ -0,0 +1,172 @@
+from datetime import datetime
+
+from django.db.models import F
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from .amortissement import enregistrer_echeanciers
+from .cumuls import etat_pret, etat_transaction, mettre_a_jour_cumuls
+from .models import CompteBancaire, Pret, Transaction
+from .services import Operation, regler_en_lot
+from .verification import invalider_verification
+
+# Nombre d'éléments réglés par transaction de base de données
+TAILLE_LOT = 500
+
+MESSAGE_INTROUVABLE = {
+    "virement": "Virement introuvable ou plus en attente d'approbation",
+    "pret": "Prêt introuvable ou plus en attente d'approbation",
+    "compte": "Compte introuvable ou plus en attente d'approbation",
+}
+
+
+def decouper(ids, taille=TAILLE_LOT):
+    for debut in range(0, len(ids), taille):
+        yield ids[debut : debut + taille]
+
+
+def approuver_en_lot(type_element, ids, decision, taille_lot=TAILLE_LOT):
+    """
+    Approuve ou rejette une liste d'éléments en attente, lot par lot.
+
+    Chaque lot est réglé dans sa propre transaction : un lot en échec n'annule
+    pas les précédents. Retourne un résultat par identifiant, dans l'ordre reçu.
+    """
+    approuver = {
+        "virement": _approuver_virements,
+        "pret": _approuver_prets,
+        "compte": _approuver_comptes,
+    }[type_element]
+
+    ids = list(dict.fromkeys(ids))
+    erreurs = {}
+    for lot in decouper(ids, taille_lot):
+        with atomic():
+            erreurs.update(approuver(lot, decision))
+
+    resultats = []
+    for pk in ids:
+        erreur = erreurs.get(pk)
+        resultats.append(
+            {"id": pk, "succes": erreur is None, "detail": erreur or decision}
+        )
+    return resultats
+
+
+def _introuvables(lot, trouves, type_element):
+    return {pk: MESSAGE_INTROUVABLE[type_element] for pk in lot if pk not in trouves}
+
+
+def _approuver_virements(lot, decision):
+    virements = {
+        virement.pk: virement
+        for virement in Transaction.objects.select_for_update().filter(
+            pk__in=lot, type="transfert", status="en_attente"
+        )
+    }
+    erreurs = _introuvables(lot, virements, "virement")
+
+    avant = [etat_transaction(virement) for virement in virements.values()]
+    if decision == "rejete":
+        Transaction.objects.filter(pk__in=virements).update(status="échoué")
+        mettre_a_jour_cumuls(
+            ajouter=[etat._replace(statut="échoué") for etat in avant], retirer=avant
+        )
+        return erreurs
+
+    resultats = regler_en_lot(
+        [
+            Operation(
+                virement.pk,
+                virement.montant,
+                source_id=virement.compte_source_id,
+                destination_id=virement.compte_destination_id,
+                transaction=virement,
+            )
+            for virement in virements.values()
+        ]
+    )
+    reglees = [pk for pk, erreur in resultats.items() if erreur is None]
+    Transaction.objects.filter(pk__in=reglees).update(status="succès")
+    mettre_a_jour_cumuls(
+        ajouter=[
+            etat_transaction(virements[pk])._replace(statut="succès") for pk in reglees
+        ],
+        retirer=[etat_transaction(virements[pk]) for pk in reglees],
+    )
+    erreurs.update({pk: erreur for pk, erreur in resultats.items() if erreur})
+    return erreurs
+
+
+def _approuver_prets(lot, decision):
+    prets = list(
+        Pret.objects.select_for_update().filter(pk__in=lot, statut="en_attente")
+    )
+    erreurs = _introuvables(lot, {pret.pk for pret in prets}, "pret")
+
+    avant = [etat_pret(pret) for pret in prets]
+    if decision == "rejete":
+        Pret.objects.filter(pk__in=[pret.pk for pret in prets]).update(statut="rejeté")
+        mettre_a_jour_cumuls(
+            ajouter=[etat._replace(statut="rejeté") for etat in avant], retirer=avant
+        )
+        return erreurs
+
+    # Le déblocage de chaque prêt est inscrit comme une transaction,
+    # enregistrée par regler_en_lot pour les seuls prêts réglés
+    transactions = [
+        Transaction(
+            compte_source_id=pret.compte_id,
+            type="pret",
+            montant=pret.montant,
+            status="succès",
+            commentaire=f"Déblocage du prêt #{pret.id},"
+            f" montant: {pret.montant}, date {datetime.now()}",
+        )
+        for pret in prets
+    ]
+    resultats = regler_en_lot(
+        [
+            Operation(
+                pret.pk,
+                pret.montant,
+                destination_id=pret.compte_id,
+                transaction=transaction,
+                contrepartie="pret",
+            )
+            for pret, transaction in zip(prets, transactions)
+        ]
+    )
+    reglees = {pk for pk, erreur in resultats.items() if erreur is None}
+    Pret.objects.filter(pk__in=reglees).update(
+        statut="en_cours", date_debut=timezone.localdate(), montant_initial=F("montant")
+    )
+    enregistrer_echeanciers(ids=reglees)
+    mettre_a_jour_cumuls(
+        ajouter=[
+            etat
+            for pret, transaction in zip(prets, transactions)
+            if pret.pk in reglees
+            for etat in (
+                etat_pret(pret)._replace(statut="en_cours"),
+                etat_transaction(transaction),
+            )
+        ],
+        retirer=[etat for pret, etat in zip(prets, avant) if pret.pk in reglees],
+    )
+    erreurs.update({pk: erreur for pk, erreur in resultats.items() if erreur})
+    return erreurs
+
+
+def _approuver_comptes(lot, decision):
+    comptes = set(
+        CompteBancaire.objects.select_for_update()
+        .filter(pk__in=lot, statut="en_attente")
+        .values_list("pk", flat=True)
+    )
+    numeros = CompteBancaire.objects.filter(pk__in=comptes).values_list(
+        "numero_compte", flat=True
+    )
+    invalider_verification(list(numeros))
+    CompteBancaire.objects.filter(pk__in=comptes).update(statut=decision)
+    return _introuvables(lot, comptes, "compte")
@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import HTTP_HEADER_ENCODING
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .caches import construire_cache
+from .models import Utilisateur
+
+# Champs conservés en cache ; le mot de passe reste différé sur l'instance
+CHAMPS = [
+    champ.attname
+    for champ in Utilisateur._meta.concrete_fields
+    if champ.attname != "password"
+]
+
+cache_utilisateurs = construire_cache(
+    "utilisateurs_jwt",
+    alias=getattr(settings, "JWT_USER_CACHE_ALIAS", "default"),
+    ttl=getattr(settings, "JWT_USER_CACHE_TTL", 300),
+)
+
+
+def invalider_utilisateur(user_id):
+    cache_utilisateurs.delete(str(user_id))
+    # Et au commit : une lecture concurrente a pu remettre l'ancienne version
+    transaction.on_commit(lambda: cache_utilisateurs.delete(str(user_id)))
+
+
+class JWTAuthenticationEnCache(JWTAuthentication):
+    """
+    Authentification JWT qui résout l'utilisateur depuis un cache à durée de vie.
+
+    Les champs de l'utilisateur (sauf le mot de passe, dont seule l'empreinte
+    est gardée pour `CHECK_REVOKE_TOKEN`) sont mis en cache par identifiant ;
+    une requête authentifiée ne touche la base qu'en cas d'absence du cache.
+    L'instance rendue est un vrai `Utilisateur`, construit par `from_db` :
+    elle s'utilise comme clé étrangère et ne sauvegarde que les champs chargés.
+    Le cache est invalidé à chaque sauvegarde, suppression ou mise à jour en
+    masse de l'utilisateur. Il n'est utilisé que s'il est partagé entre
+    processus (`cache_partage`) : sinon une désactivation ou un changement de
+    rôle ne serait vu qu'au bout du TTL par les autres processus, et
+    l'utilisateur est relu en base à chaque requête.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.user_id(validated_token)
+        entree = None
+        if cache_utilisateurs.partage:
+            entree = cache_utilisateurs.get(str(user_id))
+        if entree is None:
+            entree = self.mettre_en_cache(
+                user_id,
+                Utilisateur.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values(*CHAMPS, "password")
+                .first(),
+            )
+        return self.construire(entree, validated_token)
+
+    async def aauthenticate(self, request):
+        """Variante de `authenticate` pour les vues asynchrones (ORM asynchrone)"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        user_id = self.user_id(validated_token)
+        entree = None
+        if cache_utilisateurs.partage:
+            entree = cache_utilisateurs.get(str(user_id))
+        if entree is None:
+            entree = self.mettre_en_cache(
+                user_id,
+                await Utilisateur.objects.filter(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+                .values(*CHAMPS, "password")
+                .afirst(),
+            )
+        return self.construire(entree, validated_token), validated_token
+
+    def user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+    def mettre_en_cache(self, user_id, valeurs):
+        if valeurs is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        entree = {
+            "valeurs": [valeurs[champ] for champ in CHAMPS],
+            "empreinte_mot_de_passe": get_md5_hash_password(valeurs["password"]),
+        }
+        if cache_utilisateurs.partage:
+            cache_utilisateurs.set(str(user_id), entree)
+        return entree
+
+    def construire(self, entree, validated_token):
+        user = Utilisateur.from_db(
+            router.db_for_read(Utilisateur), CHAMPS, entree["valeurs"]
+        )
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if (
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+                != entree["empreinte_mot_de_passe"]
+            ):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+class JWTAuthenticationParametre(JWTAuthenticationEnCache):
+    """
+    Accepte aussi le jeton d'accès dans le paramètre `token` de l'URL, pour
+    les clients `EventSource` des navigateurs qui ne peuvent pas envoyer
+    d'en-tête Authorization. À réserver aux flux d'événements.
+    """
+
+    def get_header(self, request):
+        header = super().get_header(request)
+        jeton = request.GET.get("token")
+        if header is None and jeton:
+            return f"{api_settings.AUTH_HEADER_TYPES[0]} {jeton}".encode(
+                HTTP_HEADER_ENCODING
+            )
+        return header
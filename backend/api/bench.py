@@ -0,0 +1,245 @@
+import math
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.transaction import atomic
+from rest_framework.test import APIClient
+
+from .models import (
+    CompteBancaire,
+    EcritureComptable,
+    Pret,
+    SoldeInstantane,
+    Transaction,
+    Utilisateur,
+)
+from .profilage import CompteurSQL
+
+# Préfixe des utilisateurs créés par les factories, pour les retrouver
+PREFIXE = "bench-api-"
+TAILLE_LOT = 5000
+
+
+def _par_lots(objets, taille_lot):
+    lot = []
+    for objet in objets:
+        lot.append(objet)
+        if len(lot) >= taille_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def peupler(
+    utilisateurs=100,
+    comptes_par_utilisateur=2,
+    transactions=10000,
+    prets=1000,
+    seed=0,
+    taille_lot=TAILLE_LOT,
+):
+    """
+    Crée un jeu de données de benchmark par `bulk_create`.
+
+    Les utilisateurs partagent un même hachage de mot de passe (calculé une
+    seule fois). Les soldes sont posés directement, sans écritures au grand
+    livre. Retourne le suffixe du jeu créé.
+    """
+    rng = random.Random(seed)
+    suffixe = uuid.uuid4().hex[:8]
+    mot_de_passe = make_password("bench")
+
+    with atomic():
+        Utilisateur.objects.create_user(
+            username=f"{PREFIXE}{suffixe}-admin", password="bench", role="admin"
+        )
+        clients = Utilisateur.objects.bulk_create(
+            (
+                Utilisateur(
+                    username=f"{PREFIXE}{suffixe}-{i}",
+                    password=mot_de_passe,
+                    first_name=f"Prénom {i}",
+                    last_name=f"Nom {i}",
+                )
+                for i in range(utilisateurs)
+            ),
+            batch_size=taille_lot,
+        )
+        comptes = []
+        for lot in _par_lots(
+            (
+                CompteBancaire(
+                    utilisateur=client,
+                    type_compte="courant" if j == 0 else "epargne",
+                    statut="approuve",
+                    solde=Decimal(rng.randint(1000, 1000000)),
+                )
+                for client in clients
+                for j in range(comptes_par_utilisateur)
+            ),
+            taille_lot,
+        ):
+            comptes += CompteBancaire.objects.bulk_create(lot)
+        ids = [compte.pk for compte in comptes]
+
+        types = ["depot", "retrait", "transfert"]
+        statuts = ["succès", "succès", "succès", "échoué", "en_attente"]
+        for lot in _par_lots(
+            (
+                Transaction(
+                    compte_source_id=rng.choice(ids),
+                    compte_destination_id=(
+                        rng.choice(ids) if type_transaction == "transfert" else None
+                    ),
+                    type=type_transaction,
+                    montant=Decimal(rng.randint(1, 5000)),
+                    status=(
+                        rng.choice(statuts)
+                        if type_transaction == "transfert"
+                        else "succès"
+                    ),
+                )
+                for type_transaction in (rng.choice(types) for _ in range(transactions))
+            ),
+            taille_lot,
+        ):
+            Transaction.objects.bulk_create(lot)
+
+        for lot in _par_lots(
+            (
+                Pret(
+                    compte_id=rng.choice(ids),
+                    motif="Benchmark",
+                    montant=Decimal(rng.randint(100, 100000)),
+                    statut=rng.choice(["en_attente", "en_cours", "rembourse"]),
+                )
+                for _ in range(prets)
+            ),
+            taille_lot,
+        ):
+            Pret.objects.bulk_create(lot)
+    return suffixe
+
+
+def purger_grand_livre(comptes):
+    """
+    Efface le grand livre de comptes de benchmark, préalable à leur suppression.
+
+    Les écritures étant en ajout seul (`EcritureComptable.objects` refuse
+    `delete`), le gestionnaire de base est utilisé, pour ces données jetables
+    seulement. Les jambes externes des mêmes mouvements partent avec elles.
+    """
+    mouvements = EcritureComptable.objects.filter(compte__in=comptes).values(
+        "mouvement"
+    )
+    SoldeInstantane.objects.filter(compte__in=comptes).delete()
+    return EcritureComptable._base_manager.filter(mouvement__in=mouvements).delete()
+
+
+def supprimer():
+    """Supprime tous les jeux de benchmark (les comptes et lignes suivent en cascade)"""
+    utilisateurs = Utilisateur.objects.filter(username__startswith=PREFIXE)
+    purger_grand_livre(CompteBancaire.objects.filter(utilisateur__in=utilisateurs))
+    return utilisateurs.delete()
+
+
+def centile(valeurs_triees, p):
+    """Centile par rang le plus proche d'une liste déjà triée"""
+    if not valeurs_triees:
+        return None
+    rang = max(math.ceil(p / 100 * len(valeurs_triees)), 1)
+    return valeurs_triees[rang - 1]
+
+
+class Resultat:
+    """Latences, codes HTTP et requêtes SQL d'un scénario"""
+
+    def __init__(self):
+        self.latences = []
+        self.requetes_sql = []
+        self.erreurs = 0
+        self.codes = {}
+        self.duree = 0.0
+        self._verrou = threading.Lock()
+
+    def fusionner(self, latences, requetes_sql, codes):
+        with self._verrou:
+            self.latences += latences
+            self.requetes_sql += requetes_sql
+            for code, nombre in codes.items():
+                self.codes[code] = self.codes.get(code, 0) + nombre
+                if code >= 400:
+                    self.erreurs += nombre
+
+    def as_dict(self):
+        latences = sorted(self.latences)
+        nombre = len(latences)
+        return {
+            "requetes": nombre,
+            "erreurs": self.erreurs,
+            "codes": {str(code): n for code, n in sorted(self.codes.items())},
+            "duree": round(self.duree, 3),
+            "debit": round(nombre / self.duree, 1) if self.duree else None,
+            "latence_ms": {
+                nom: round(centile(latences, p) * 1000, 2) if latences else None
+                for nom, p in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+            },
+            "requetes_sql": {
+                "moyenne": (
+                    round(sum(self.requetes_sql) / nombre, 2) if nombre else None
+                ),
+                "max": max(self.requetes_sql, default=None),
+            },
+        }
+
+
+def executer(scenario, clients, requetes_par_client, seed=0):
+    """
+    Exécute un scénario avec un thread par client.
+
+    `scenario(api, utilisateur, rng, index)` envoie une requête et retourne la
+    réponse ; `index` est unique sur l'ensemble des threads. `clients` est une
+    liste d'utilisateurs, authentifiés par `force_authenticate`.
+    Chaque thread compte ses requêtes SQL avec `execute_wrapper` sur sa propre
+    connexion, puis la ferme.
+    """
+    resultat = Resultat()
+
+    def worker(numero, utilisateur):
+        # Une erreur 500 est comptée comme une réponse, sans arrêter le thread
+        api = APIClient(raise_request_exception=False)
+        api.force_authenticate(utilisateur)
+        rng = random.Random(seed + numero)
+        latences, requetes_sql, codes = [], [], {}
+        try:
+            for index in range(requetes_par_client):
+                compteur = CompteurSQL()
+                with connection.execute_wrapper(compteur):
+                    debut = time.perf_counter()
+                    reponse = scenario(
+                        api, utilisateur, rng, numero * requetes_par_client + index
+                    )
+                    latences.append(time.perf_counter() - debut)
+                requetes_sql.append(compteur.requetes)
+                codes[reponse.status_code] = codes.get(reponse.status_code, 0) + 1
+        finally:
+            connection.close()
+            resultat.fusionner(latences, requetes_sql, codes)
+
+    threads = [
+        threading.Thread(target=worker, args=(numero, utilisateur))
+        for numero, utilisateur in enumerate(clients)
+    ]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    resultat.duree = time.perf_counter() - debut
+    return resultat
@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class CacheLRU:
+    """Cache en mémoire borné en taille (LRU) et en durée de vie (TTL), thread-safe"""
+
+    def __init__(self, taille_max=10000, ttl=3600):
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._donnees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, cle):
+        with self._verrou:
+            entree = self._donnees.get(cle)
+            if entree is None:
+                return None
+            expiration, valeur = entree
+            if expiration < time.monotonic():
+                del self._donnees[cle]
+                return None
+            self._donnees.move_to_end(cle)
+            return valeur
+
+    def set(self, cle, valeur):
+        with self._verrou:
+            self._donnees[cle] = (time.monotonic() + self.ttl, valeur)
+            self._donnees.move_to_end(cle)
+            while len(self._donnees) > self.taille_max:
+                self._donnees.popitem(last=False)
+
+    def delete(self, cle):
+        with self._verrou:
+            self._donnees.pop(cle, None)
+
+    def clear(self):
+        with self._verrou:
+            self._donnees.clear()
+
+    def __len__(self):
+        return len(self._donnees)
+
+
+class CacheDjango:
+    """
+    Adaptateur de même interface que `CacheLRU` vers un cache de `settings.CACHES`.
+
+    Les clés portent le préfixe et une génération, lue dans le cache partagé :
+    `clear()` passe à la génération suivante sans toucher aux autres entrées
+    de l'alias. Les entrées des générations passées expirent avec leur TTL.
+    """
+
+    def __init__(self, alias, prefixe, ttl=3600):
+        self.alias = alias
+        self.prefixe = prefixe
+        self.ttl = ttl
+
+    def _cle(self, cle):
+        generation = caches[self.alias].get_or_set(
+            f"{self.prefixe}:generation", 0, None
+        )
+        return f"{self.prefixe}:{generation}:{cle}"
+
+    def get(self, cle):
+        return caches[self.alias].get(self._cle(cle))
+
+    def set(self, cle, valeur):
+        caches[self.alias].set(self._cle(cle), valeur, self.ttl)
+
+    def delete(self, cle):
+        caches[self.alias].delete(self._cle(cle))
+
+    def clear(self):
+        try:
+            caches[self.alias].incr(f"{self.prefixe}:generation")
+        except ValueError:  # génération absente : aucune entrée à invalider
+            caches[self.alias].add(f"{self.prefixe}:generation", 0, None)
+
+
+class CacheInstrumente:
+    """Enveloppe un cache et compte les succès, échecs et invalidations"""
+
+    def __init__(self, nom, backend):
+        self.nom = nom
+        self.backend = backend
+        self.succes = 0
+        self.echecs = 0
+        self.invalidations = 0
+        self._verrou = threading.Lock()
+        instrumentes.append(self)
+
+    def get(self, cle):
+        valeur = self.backend.get(cle)
+        with self._verrou:
+            if valeur is None:
+                self.echecs += 1
+            else:
+                self.succes += 1
+        return valeur
+
+    def set(self, cle, valeur):
+        self.backend.set(cle, valeur)
+
+    def delete(self, cle, compter=True):
+        self.backend.delete(cle)
+        if compter:
+            with self._verrou:
+                self.invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    @property
+    def partage(self):
+        """Vrai si les entrées sont partagées entre processus (voir `cache_partage`)"""
+        return isinstance(self.backend, CacheDjango) and cache_partage(
+            self.backend.alias
+        )
+
+    def taux_succes(self):
+        total = self.succes + self.echecs
+        return self.succes / total if total else None
+
+
+instrumentes = []
+
+
+def cache_partage(alias):
+    """
+    Vrai si l'alias de CACHES est commun à tous les processus serveur.
+
+    Le cache en mémoire de Django (LocMemCache) est propre à chaque processus
+    et le cache factice ne conserve rien : une invalidation n'y atteint pas
+    les autres processus.
+    """
+    return bool(alias) and not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def construire_cache(nom, alias=None, taille_max=10000, ttl=3600):
+    """Cache LRU local par défaut, ou cache Django `alias` s'il est fourni"""
+    if alias:
+        backend = CacheDjango(alias, nom, ttl)
+    else:
+        backend = CacheLRU(taille_max, ttl)
+    return CacheInstrumente(nom, backend)
+
+
+def exposition():
+    """Compteurs des caches instrumentés au format texte de Prometheus"""
+    lignes = []
+    for metrique, attribut, aide in [
+        ("api_cache_hits_total", "succes", "Lectures servies par le cache."),
+        ("api_cache_misses_total", "echecs", "Lectures absentes du cache."),
+        ("api_cache_invalidations_total", "invalidations", "Entrées invalidées."),
+    ]:
+        lignes.append(f"# HELP {metrique} {aide}")
+        lignes.append(f"# TYPE {metrique} counter")
+        for cache in instrumentes:
+            lignes.append(
+                f'{metrique}{{cache="{cache.nom}"}} {getattr(cache, attribut)}'
+            )
+    return "\n".join(lignes) + "\n"
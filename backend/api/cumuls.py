@@ -0,0 +1,196 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import IntegrityError
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from .evenements import publier_apres_commit
+from .models import CompteBancaire, CumulJournalier, Pret, Transaction
+
+
+class Etat(NamedTuple):
+    """Contribution d'une transaction ou d'un prêt à un cumul journalier"""
+
+    compte_id: int
+    jour: object
+    categorie: str
+    statut: str
+    montant: Decimal
+    # Transaction ou prêt concerné, pour les événements (api.evenements)
+    identifiant: int = None
+
+
+def etat_transaction(transaction):
+    return Etat(
+        transaction.compte_source_id,
+        timezone.localdate(transaction.date_transaction),
+        transaction.type,
+        transaction.status,
+        Decimal(transaction.montant),
+        transaction.pk,
+    )
+
+
+def etat_pret(pret):
+    return Etat(
+        pret.compte_id,
+        timezone.localdate(pret.date_demande),
+        "pret",
+        pret.statut,
+        Decimal(pret.montant),
+        pret.pk,
+    )
+
+
+def mettre_a_jour_cumuls(ajouter=(), retirer=()):
+    """
+    Applique des contributions aux cumuls : +1 pour chaque état ajouté, -1 pour chaque retiré.
+
+    Une seule requête UPDATE par (compte, jour, catégorie, statut) concerné ;
+    la ligne est créée si elle n'existe pas encore. Les clés sont traitées
+    dans un ordre stable pour que deux mises à jour concurrentes prennent les
+    verrous dans le même ordre. Toute création ou changement de statut d'une
+    transaction ou d'un prêt passant par ici, les états ajoutés sont aussi
+    annoncés aux clients connectés.
+    """
+    publier_apres_commit(
+        [
+            (
+                etat.compte_id,
+                "pret" if etat.categorie == "pret" else "transaction",
+                {
+                    "id": etat.identifiant,
+                    "compte": etat.compte_id,
+                    "type": etat.categorie,
+                    "statut": etat.statut,
+                    "montant": str(etat.montant),
+                },
+            )
+            for etat in ajouter
+        ]
+    )
+    deltas = defaultdict(lambda: [0, Decimal("0")])
+    for signe, etats in ((1, ajouter), (-1, retirer)):
+        for etat in etats:
+            delta = deltas[etat[:4]]
+            delta[0] += signe
+            delta[1] += signe * etat.montant
+
+    with atomic():
+        for cle in sorted(deltas, key=str):
+            nombre, montant = deltas[cle]
+            if not nombre and not montant:
+                continue
+            compte_id, jour, categorie, statut = cle
+            lignes = CumulJournalier.objects.filter(
+                compte_id=compte_id, jour=jour, categorie=categorie, statut=statut
+            )
+            if lignes.update(
+                nombre=F("nombre") + nombre, montant=F("montant") + montant
+            ):
+                continue
+            try:
+                with atomic():
+                    CumulJournalier.objects.create(
+                        compte_id=compte_id,
+                        jour=jour,
+                        categorie=categorie,
+                        statut=statut,
+                        nombre=nombre,
+                        montant=montant,
+                    )
+            except IntegrityError:
+                # Ligne créée entre-temps par une requête concurrente
+                lignes.update(
+                    nombre=F("nombre") + nombre, montant=F("montant") + montant
+                )
+
+
+def reconstruire(taille_lot=1000):
+    """
+    Recalcule tous les cumuls à partir des transactions et des prêts.
+
+    Les agrégats sont calculés par la base (GROUP BY), par plages de comptes,
+    chaque plage dans sa propre transaction, pendant que les mises à jour
+    incrémentales continuent sur les autres comptes. Retourne le nombre de
+    lignes de cumul créées.
+    """
+    total = 0
+    dernier_id = 0
+    while True:
+        ids = list(
+            CompteBancaire.objects.filter(pk__gt=dernier_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:taille_lot]
+        )
+        if not ids:
+            return total
+        dernier_id = ids[-1]
+        total += _reconstruire_comptes(ids)
+
+
+def _reconstruire_comptes(ids, tentatives=3):
+    """
+    Remplace les cumuls des comptes `ids`, à l'abri des mises à jour concurrentes.
+
+    Le verrou exclusif des comptes attend les transactions en cours qui leur
+    ajoutent une transaction ou un prêt (la clé étrangère verrouille le compte
+    jusqu'au commit) ; la suppression attend celles qui tiennent déjà leurs
+    lignes de cumul, comme `mettre_a_jour_cumuls`. Les agrégats sont lus
+    ensuite, après leur commit. Une ligne créée entre-temps par une mise à jour
+    incrémentale fait échouer le lot, qui est alors recommencé.
+    """
+    for tentative in range(tentatives):
+        try:
+            with atomic():
+                list(
+                    CompteBancaire.objects.select_for_update()
+                    .filter(pk__in=ids)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)
+                )
+                CumulJournalier.objects.filter(compte_id__in=ids).delete()
+                lignes = _agreger(ids)
+                CumulJournalier.objects.bulk_create(lignes, batch_size=1000)
+            return len(lignes)
+        except IntegrityError:
+            if tentative == tentatives - 1:
+                raise
+
+
+def _agreger(ids):
+    lignes = [
+        CumulJournalier(
+            compte_id=ligne["compte_source"],
+            jour=ligne["jour"],
+            categorie=ligne["type"],
+            statut=ligne["status"],
+            nombre=ligne["nombre"],
+            montant=ligne["total"],
+        )
+        for ligne in Transaction.objects.filter(compte_source__in=ids)
+        .annotate(jour=TruncDate("date_transaction"))
+        .values("compte_source", "jour", "type", "status")
+        .annotate(nombre=Count("id"), total=Sum("montant"))
+        .order_by()
+    ]
+    lignes += [
+        CumulJournalier(
+            compte_id=ligne["compte"],
+            jour=ligne["jour"],
+            categorie="pret",
+            statut=ligne["statut"],
+            nombre=ligne["nombre"],
+            montant=ligne["total"],
+        )
+        for ligne in Pret.objects.filter(compte__in=ids)
+        .annotate(jour=TruncDate("date_demande"))
+        .values("compte", "jour", "statut")
+        .annotate(nombre=Count("id"), total=Sum("montant"))
+        .order_by()
+    ]
+    return lignes
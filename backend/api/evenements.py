@@ -0,0 +1,223 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from .caches import construire_cache
+from .models import CompteBancaire
+
+logger = logging.getLogger(__name__)
+
+# Propriétaire de chaque compte : il ne change jamais
+proprietaires = construire_cache(
+    "proprietaires_comptes",
+    taille_max=getattr(settings, "EVENTS_OWNER_CACHE_SIZE", 100000),
+    ttl=86400,
+)
+
+
+class Abonnement:
+    """
+    File des événements d'un client connecté, lue dans sa boucle asyncio.
+
+    Les événements peuvent être poussés depuis n'importe quel thread. Une
+    file pleine (client trop lent) est vidée et remplacée par un unique
+    événement « resync » : le client doit alors tout relire.
+    """
+
+    def __init__(self, utilisateur_id, taille):
+        self.utilisateur_id = utilisateur_id
+        self.boucle = asyncio.get_running_loop()
+        self.file = asyncio.Queue(taille)
+
+    def pousser(self, evenement):
+        try:
+            self.boucle.call_soon_threadsafe(self._ajouter, evenement)
+        except RuntimeError:  # boucle fermée : client parti
+            pass
+
+    def _ajouter(self, evenement):
+        try:
+            self.file.put_nowait(evenement)
+        except asyncio.QueueFull:
+            while not self.file.empty():
+                self.file.get_nowait()
+            self.file.put_nowait(("resync", {}))
+
+    async def lire(self, battement):
+        """Événements (type, données) au fil de l'eau ; None après `battement` secondes de silence"""
+        while True:
+            try:
+                yield await asyncio.wait_for(self.file.get(), battement)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class HubLocal:
+    """
+    Diffusion des événements aux clients connectés au processus.
+
+    Suffit avec un seul processus serveur ; sinon, `HubPostgres` relaie les
+    événements de tous les processus. Un client inactif ne coûte aucune
+    requête : il attend sur sa file.
+    """
+
+    def __init__(self, taille_file=100):
+        self.taille_file = taille_file
+        self._abonnes = defaultdict(set)
+        self._verrou = threading.Lock()
+
+    def abonner(self, utilisateur_id):
+        """À appeler depuis la boucle asyncio qui lira l'abonnement"""
+        abonnement = Abonnement(utilisateur_id, self.taille_file)
+        with self._verrou:
+            self._abonnes[utilisateur_id].add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            abonnes = self._abonnes.get(abonnement.utilisateur_id)
+            if abonnes is not None:
+                abonnes.discard(abonnement)
+                if not abonnes:
+                    del self._abonnes[abonnement.utilisateur_id]
+
+    def connectes(self):
+        with self._verrou:
+            return sum(len(abonnes) for abonnes in self._abonnes.values())
+
+    def exposition(self):
+        """Clients connectés au format texte de Prometheus"""
+        return (
+            "# HELP api_events_clients Clients connectés au flux d'événements.\n"
+            "# TYPE api_events_clients gauge\n"
+            f"api_events_clients {self.connectes()}\n"
+        )
+
+    def publier(self, evenements):
+        """Publie une liste de (utilisateur, type, données)"""
+        self.diffuser(evenements)
+
+    def diffuser(self, evenements):
+        for utilisateur_id, type_evenement, donnees in evenements:
+            with self._verrou:
+                abonnes = list(self._abonnes.get(utilisateur_id, ()))
+            for abonnement in abonnes:
+                abonnement.pousser((type_evenement, donnees))
+
+
+class HubPostgres(HubLocal):
+    """
+    Relais des événements entre processus par LISTEN/NOTIFY de PostgreSQL.
+
+    Chaque événement est publié par `pg_notify` sur `canal`. Un
+    thread par processus écoute le canal sur une connexion dédiée, ouverte
+    au premier abonnement, et rediffuse aux clients connectés localement.
+    """
+
+    def __init__(self, taille_file=100, canal="api_evenements"):
+        super().__init__(taille_file)
+        self.canal = canal
+        self._ecoute = None
+
+    def abonner(self, utilisateur_id):
+        with self._verrou:
+            if self._ecoute is None:
+                self._ecoute = threading.Thread(target=self._ecouter, daemon=True)
+                self._ecoute.start()
+        return super().abonner(utilisateur_id)
+
+    def publier(self, evenements):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            for evenement in evenements:
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    [self.canal, json.dumps(evenement, cls=JSONEncoder)],
+                )
+
+    def _ecouter(self):
+        import psycopg
+        from psycopg import sql
+
+        parametres = connections[DEFAULT_DB_ALIAS].get_connection_params()
+        while True:
+            try:
+                with psycopg.connect(**parametres, autocommit=True) as connexion:
+                    connexion.execute(
+                        sql.SQL("LISTEN {}").format(sql.Identifier(self.canal))
+                    )
+                    for notification in connexion.notifies():
+                        self.diffuser([tuple(json.loads(notification.payload))])
+            except Exception:
+                logger.exception("Écoute du canal %s interrompue", self.canal)
+                time.sleep(1)
+
+
+_hub = None
+_verrou_hub = threading.Lock()
+
+
+def hub_evenements():
+    """Hub du processus, de la classe `EVENTS_BACKEND`"""
+    global _hub
+    if _hub is None:
+        with _verrou_hub:
+            if _hub is None:
+                _hub = import_string(
+                    getattr(settings, "EVENTS_BACKEND", "api.evenements.HubLocal")
+                )(**getattr(settings, "EVENTS_OPTIONS", {}))
+    return _hub
+
+
+def proprietaires_comptes(compte_ids):
+    """{compte: utilisateur}, depuis le cache ou en une requête pour les absents"""
+    resultat, absents = {}, []
+    for compte_id in compte_ids:
+        utilisateur_id = proprietaires.get(str(compte_id))
+        if utilisateur_id is None:
+            absents.append(compte_id)
+        else:
+            resultat[compte_id] = utilisateur_id
+    if absents:
+        for compte_id, utilisateur_id in CompteBancaire.objects.filter(
+            pk__in=absents
+        ).values_list("pk", "utilisateur_id"):
+            proprietaires.set(str(compte_id), utilisateur_id)
+            resultat[compte_id] = utilisateur_id
+    return resultat
+
+
+def publier_apres_commit(evenements):
+    """
+    Publie des (compte, type, données) aux propriétaires des comptes, une
+    fois la transaction en cours validée : rien n'est annoncé d'une écriture
+    annulée, et le client qui relit voit déjà les données.
+    """
+    if not evenements or not getattr(settings, "EVENTS_ENABLED", True):
+        return
+
+    def publier():
+        comptes = proprietaires_comptes({compte_id for compte_id, _, _ in evenements})
+        hub_evenements().publier(
+            [
+                (comptes[compte_id], type_evenement, donnees)
+                for compte_id, type_evenement, donnees in evenements
+                if compte_id in comptes
+            ]
+        )
+
+    transaction.on_commit(publier, robust=True)
+
+
+def reinitialiser():
+    """Oublie le hub courant (réglages modifiés, tests)"""
+    global _hub
+    with _verrou_hub:
+        _hub = None
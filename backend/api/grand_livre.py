@@ -0,0 +1,182 @@
+import uuid
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import (
+    Case,
+    DecimalField,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .evenements import publier_apres_commit
+from .models import CompteBancaire, EcritureComptable, SoldeInstantane
+
+ZERO = Decimal("0.00")
+
+# Montant signé d'une écriture du point de vue du compte : un crédit augmente le solde
+MONTANT_SIGNE = Case(
+    When(sens="credit", then=F("montant")),
+    default=-F("montant"),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
+
+
+class Position(NamedTuple):
+    """État d'un compte juste après la mise à jour de son solde"""
+
+    compte_id: int
+    sequence: int
+    solde: Decimal
+
+
+def intervalle_instantanes():
+    return getattr(settings, "LEDGER_SNAPSHOT_INTERVAL", 100)
+
+
+class Mouvement(NamedTuple):
+    """Mouvement à inscrire : `None` en débit ou crédit désigne la contrepartie externe"""
+
+    montant: Decimal
+    debit: Position = None
+    credit: Position = None
+    contrepartie: str = "externe"
+    transaction: object = None
+
+
+def enregistrer_mouvement(
+    montant, debit=None, credit=None, contrepartie="externe", transaction=None
+):
+    """
+    Enregistre un mouvement en partie double : une écriture au débit et une au crédit.
+
+    `debit` et `credit` sont des `Position` ; `None` désigne la contrepartie
+    externe nommée par `contrepartie`. Doit être appelé dans la même
+    transaction que la mise à jour des soldes, qui verrouille les comptes.
+    """
+    return enregistrer_mouvements(
+        [Mouvement(montant, debit, credit, contrepartie, transaction)]
+    )
+
+
+def enregistrer_mouvements(mouvements):
+    """Inscrit une liste de `Mouvement` avec un seul INSERT par table"""
+    ecritures = []
+    positions = []
+    for mouvement in mouvements:
+        identifiant = uuid.uuid4()
+        for sens, position in (
+            ("debit", mouvement.debit),
+            ("credit", mouvement.credit),
+        ):
+            ecritures.append(
+                EcritureComptable(
+                    mouvement=identifiant,
+                    compte_id=position.compte_id if position else None,
+                    contrepartie="" if position else mouvement.contrepartie,
+                    transaction=mouvement.transaction,
+                    sens=sens,
+                    montant=mouvement.montant,
+                    sequence=position.sequence if position else None,
+                )
+            )
+            positions.append(position)
+    EcritureComptable.objects.bulk_create(ecritures)
+
+    # Dernier solde de chaque compte mouvementé, pour les clients connectés
+    soldes = {
+        position.compte_id: position
+        for position in sorted(filter(None, positions), key=lambda p: p.sequence)
+    }
+    publier_apres_commit(
+        [
+            (compte_id, "solde", {"compte": compte_id, "solde": str(position.solde)})
+            for compte_id, position in soldes.items()
+        ]
+    )
+
+    intervalle = intervalle_instantanes()
+    SoldeInstantane.objects.bulk_create(
+        [
+            SoldeInstantane(
+                compte_id=position.compte_id,
+                sequence=position.sequence,
+                solde=position.solde,
+                date_ecriture=ecriture.date_ecriture,
+            )
+            for position, ecriture in zip(positions, ecritures)
+            if position and position.sequence % intervalle == 0
+        ]
+    )
+    return ecritures
+
+
+def solde_a_date(compte_id, date=None):
+    """
+    Solde d'un compte d'après le grand livre à une date donnée (maintenant par défaut).
+
+    Part du dernier solde instantané antérieur à la date et n'additionne que
+    les écritures suivantes, soit au plus N écritures.
+    """
+    date = date or timezone.now()
+    instantane = (
+        SoldeInstantane.objects.filter(compte_id=compte_id, date_ecriture__lte=date)
+        .order_by("-sequence")
+        .values_list("sequence", "solde")
+        .first()
+    )
+    sequence, solde = instantane or (0, ZERO)
+
+    delta = EcritureComptable.objects.filter(
+        compte_id=compte_id, sequence__gt=sequence, date_ecriture__lte=date
+    ).aggregate(delta=Sum(MONTANT_SIGNE))["delta"]
+    return solde + (delta or ZERO)
+
+
+def soldes_grand_livre(compte_ids):
+    """
+    Solde courant d'après le grand livre pour un lot de comptes, en deux requêtes.
+
+    Retourne un dictionnaire {compte_id: solde}.
+    """
+    dernier_instantane = SoldeInstantane.objects.filter(
+        compte=OuterRef("compte")
+    ).order_by("-sequence")
+
+    soldes = dict(
+        CompteBancaire.objects.filter(pk__in=compte_ids)
+        .annotate(
+            solde_instantane=Coalesce(
+                Subquery(
+                    SoldeInstantane.objects.filter(compte=OuterRef("pk"))
+                    .order_by("-sequence")
+                    .values("solde")[:1]
+                ),
+                Value(ZERO),
+            )
+        )
+        .values_list("pk", "solde_instantane")
+    )
+
+    deltas = (
+        EcritureComptable.objects.filter(compte_id__in=compte_ids)
+        .annotate(
+            sequence_instantane=Coalesce(
+                Subquery(dernier_instantane.values("sequence")[:1]), Value(0)
+            )
+        )
+        .filter(sequence__gt=F("sequence_instantane"))
+        .values("compte")
+        .annotate(delta=Sum(MONTANT_SIGNE))
+        .order_by()
+    )
+    for ligne in deltas:
+        soldes[ligne["compte"]] += ligne["delta"]
+    return soldes
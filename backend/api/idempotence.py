@@ -0,0 +1,137 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.transaction import atomic
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .caches import CacheLRU
+from .models import CleIdempotence
+
+EN_TETE = "Idempotency-Key"
+
+cache_reponses = CacheLRU(
+    taille_max=getattr(settings, "IDEMPOTENCY_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "IDEMPOTENCY_CACHE_TTL", 3600),
+)
+
+
+def empreinte_requete(request):
+    donnees = request.data
+    if hasattr(donnees, "dict"):
+        donnees = donnees.dict()
+    brut = json.dumps(
+        [request.method, request.path, donnees], sort_keys=True, cls=JSONEncoder
+    )
+    return hashlib.sha256(brut.encode()).hexdigest()
+
+
+def _rejouer(empreinte, enregistrement):
+    empreinte_origine, code_statut, reponse = enregistrement
+    if empreinte_origine != empreinte:
+        return Response(
+            {
+                "detail": "Cette clé d'idempotence a déjà été utilisée "
+                "avec une requête différente."
+            },
+            status=422,
+        )
+    response = Response(reponse, status=code_statut)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _existante(request, cle, empreinte):
+    """Réponse à renvoyer pour une clé déjà enregistrée, None si elle a disparu"""
+    existante = (
+        CleIdempotence.objects.filter(utilisateur=request.user, cle=cle)
+        .values_list("empreinte", "code_statut", "reponse")
+        .first()
+    )
+    if existante is None:
+        return None
+    if existante[1] is None:
+        # Réservation sans réponse, d'avant l'enregistrement transactionnel :
+        # jamais réexécutée, l'issue de la requête d'origine est inconnue
+        return Response(
+            {
+                "detail": "Une requête avec cette clé d'idempotence n'a pas abouti ; "
+                "vérifiez son effet avant de réessayer avec une nouvelle clé."
+            },
+            status=409,
+        )
+    cache_reponses.set((request.user.pk, cle), existante)
+    return _rejouer(empreinte, existante)
+
+
+def idempotent(handler):
+    """
+    Décorateur pour les méthodes POST de vues DRF qui déplacent de l'argent.
+
+    Si la requête porte un en-tête `Idempotency-Key`, une seconde requête avec
+    la même clé renvoie la réponse d'origine sans réexécuter la vue. Les
+    réponses récentes sont servies depuis un cache LRU en mémoire ; la table
+    `CleIdempotence` (contrainte unique sur utilisateur et clé) fait foi entre
+    processus.
+
+    La clé est réservée, la vue exécutée et sa réponse enregistrée dans une
+    seule transaction : une requête concurrente avec la même clé attend sur
+    la contrainte d'unicité puis rejoue la réponse validée, et un arrêt du
+    processus annule à la fois le mouvement et la réservation. Seules les
+    réponses 2xx sont conservées : une erreur libère la clé pour permettre un
+    nouvel essai.
+    """
+
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        cle = request.headers.get(EN_TETE)
+        if not cle:
+            return handler(view, request, *args, **kwargs)
+        if len(cle) > 255:
+            return Response(
+                {"detail": f"L'en-tête {EN_TETE} ne doit pas dépasser 255 caractères."},
+                status=400,
+            )
+
+        empreinte = empreinte_requete(request)
+        while True:
+            enregistrement = cache_reponses.get((request.user.pk, cle))
+            if enregistrement is not None:
+                return _rejouer(empreinte, enregistrement)
+
+            with atomic():
+                try:
+                    with atomic():
+                        reservation = CleIdempotence.objects.create(
+                            utilisateur=request.user,
+                            cle=cle,
+                            chemin=request.path,
+                            empreinte=empreinte,
+                        )
+                except IntegrityError:
+                    reservation = None
+                if reservation is not None:
+                    response = handler(view, request, *args, **kwargs)
+                    if not 200 <= response.status_code < 300:
+                        reservation.delete()
+                        return response
+                    # Normalise la réponse (Decimal, dates...) telle qu'elle sera rejouée
+                    reponse = json.loads(json.dumps(response.data, cls=JSONEncoder))
+                    CleIdempotence.objects.filter(pk=reservation.pk).update(
+                        code_statut=response.status_code, reponse=reponse
+                    )
+            if reservation is not None:
+                cache_reponses.set(
+                    (request.user.pk, cle), (empreinte, response.status_code, reponse)
+                )
+                return response
+
+            existante = _existante(request, cle, empreinte)
+            if existante is not None:
+                return existante
+            # Clé libérée entre-temps par une requête en erreur : nouvel essai
+
+    return wrapper
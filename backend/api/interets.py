@@ -0,0 +1,134 @@
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import F, Max, Min
+from django.db.transaction import atomic
+
+from .amortissement import _decimal, calculer, lignes_echeances, prets_a_calculer
+from .cumuls import etat_transaction, mettre_a_jour_cumuls
+from .models import Echeance, LotTraite, Pret, Transaction
+
+TACHE = "interets_prets"
+TAILLE_LOT = 5000
+
+
+def fenetres(taille_lot=TAILLE_LOT):
+    """Plages [debut, fin[ de clés primaires couvrant les prêts en cours"""
+    bornes = Pret.objects.filter(statut="en_cours").aggregate(
+        premier=Min("pk"), dernier=Max("pk")
+    )
+    if bornes["premier"] is None:
+        return []
+    return [
+        (debut, debut + taille_lot)
+        for debut in range(bornes["premier"], bornes["dernier"] + 1, taille_lot)
+    ]
+
+
+def traiter_lot(debut, fin, date_reference):
+    """
+    Comptabilise les intérêts des prêts en cours dont la clé est dans [debut, fin[.
+
+    Les intérêts courus à `date_reference` sont ceux de l'échéancier
+    contractuel (capital initial, sans tenir compte des remboursements
+    anticipés) ; l'écart avec `Pret.interets_courus` est inscrit comme une
+    `Transaction` de type « interets ». Ce constat ne déplace aucun fonds : il
+    n'a ni écriture au grand livre ni effet sur le solde du compte, et aucun
+    endpoint ne prélève ces intérêts (`RembourserPret` ne débite que le
+    capital). Le traitement est idempotent : relancé pour la même date, il
+    n'inscrit plus rien. Les échéances passées dont le capital prévu
+    n'est pas remboursé sont marquées en retard. Tout le lot, point de reprise
+    compris, est enregistré dans une seule transaction.
+    """
+    resultat = {"prets": 0, "transactions": 0, "interets": Decimal("0"), "retards": 0}
+    with atomic():
+        _, cree = LotTraite.objects.get_or_create(
+            tache=TACHE, date_reference=date_reference, debut=debut
+        )
+        if not cree:
+            return resultat
+
+        prets = list(
+            prets_a_calculer().filter(pk__gte=debut, pk__lt=fin).order_by("pk")
+        )
+        if not prets:
+            return resultat
+        ids = [pret[0] for pret in prets]
+        # Verrouille les prêts contre un remboursement concurrent
+        courants = {
+            pk: (compte_id, interets_courus)
+            for pk, compte_id, interets_courus in Pret.objects.select_for_update()
+            .filter(pk__in=ids)
+            .values_list("pk", "compte_id", "interets_courus")
+        }
+        echeanciers = calculer(prets, date_reference)
+
+        a_jour = []
+        transactions = []
+        for lot in echeanciers:
+            for pret_id, centimes in zip(
+                lot.ids.tolist(), lot.interets_courus.tolist()
+            ):
+                compte_id, interets_courus = courants[pret_id]
+                interets = _decimal(centimes)
+                if interets <= interets_courus:
+                    continue
+                a_jour.append(Pret(pk=pret_id, interets_courus=interets))
+                transactions.append(
+                    Transaction(
+                        compte_source_id=compte_id,
+                        type="interets",
+                        montant=interets - interets_courus,
+                        status="succès",
+                        commentaire=f"Intérêts courus du prêt #{pret_id}"
+                        f" au {date_reference.isoformat()}",
+                    )
+                )
+        Pret.objects.bulk_update(a_jour, ["interets_courus"], batch_size=1000)
+        transactions = Transaction.objects.bulk_create(transactions)
+        mettre_a_jour_cumuls(
+            ajouter=[etat_transaction(transaction) for transaction in transactions]
+        )
+
+        # Échéanciers manquants (prêts antérieurs au calcul des échéanciers)
+        avec_echeancier = set(
+            Echeance.objects.filter(pret_id__in=ids)
+            .values_list("pret_id", flat=True)
+            .distinct()
+        )
+        manquants = set(ids) - avec_echeancier
+        if manquants:
+            Echeance.objects.bulk_create(
+                lignes_echeances(echeanciers, manquants), batch_size=5000
+            )
+
+        echeances = Echeance.objects.filter(pret_id__in=ids)
+        resultat["retards"] = echeances.filter(
+            en_retard=False,
+            date_echeance__lt=date_reference,
+            restant_du__lt=F("pret__montant"),
+        ).update(en_retard=True)
+        echeances.filter(en_retard=True, restant_du__gte=F("pret__montant")).update(
+            en_retard=False
+        )
+
+    resultat["prets"] = len(prets)
+    resultat["transactions"] = len(transactions)
+    resultat["interets"] = sum(
+        (transaction.montant for transaction in transactions), Decimal("0")
+    )
+    return resultat
+
+
+def initialiser_processus():
+    """Initialisation d'un processus du pool (nécessaire au démarrage par « spawn »)"""
+    import django
+
+    django.setup()
+
+
+def traiter_lot_processus(debut, fin, date_reference):
+    try:
+        return traiter_lot(debut, fin, date_reference)
+    finally:
+        connections.close_all()
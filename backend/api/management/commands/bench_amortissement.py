@@ -0,0 +1,57 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from api.amortissement import calculer, lignes_echeances
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le calcul vectorisé des échéanciers sur un portefeuille de prêts "
+        "synthétique, sans accès à la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prets", type=int, default=100000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--lignes",
+            action="store_true",
+            help="Mesure aussi la conversion en lignes Echeance à insérer.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        debut_portefeuille = date(2024, 1, 1)
+        prets = [
+            (
+                pk,
+                Decimal(rng.randint(10000, 5000000)) / 100,
+                Decimal(rng.choice(["0", "0.05", "0.08", "0.12", "0.18"])),
+                rng.choice([6, 12, 24, 36, 60, 120, 240]),
+                rng.choice(["constant", "degressif"]),
+                debut_portefeuille + timedelta(days=rng.randint(0, 900)),
+            )
+            for pk in range(1, options["prets"] + 1)
+        ]
+
+        debut = time.perf_counter()
+        echeanciers = calculer(prets, date(2026, 6, 30))
+        duree = time.perf_counter() - debut
+        echeances = sum(lot.capital.size for lot in echeanciers)
+        self.stdout.write(
+            f"calcul : {len(prets)} prêts, {echeances} échéances en {duree:.3f}s "
+            f"({len(prets) / duree:.0f} prêts/s)"
+        )
+
+        if options["lignes"]:
+            debut = time.perf_counter()
+            lignes = sum(1 for _ in lignes_echeances(echeanciers))
+            duree = time.perf_counter() - debut
+            self.stdout.write(
+                f"conversion : {lignes} lignes en {duree:.3f}s "
+                f"({lignes / duree:.0f} lignes/s)"
+            )
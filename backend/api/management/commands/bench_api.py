@@ -0,0 +1,191 @@
+import json
+import random
+import sys
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.bench import PREFIXE, executer
+from api.models import CompteBancaire, Transaction, Utilisateur
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark des endpoints /api sur le dernier jeu créé par peupler_bench : "
+        "latences p50/p95/p99, débit et requêtes SQL par scénario, en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=8)
+        parser.add_argument("--requetes", type=int, default=50)
+        parser.add_argument(
+            "--scenarios",
+            nargs="*",
+            help="Scénarios à exécuter (tous par défaut).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--sortie", help="Fichier JSON de sortie (stdout sinon).")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stderr.write(
+                "Attention : SQLite sérialise les écritures, "
+                "les résultats ne sont pas représentatifs de PostgreSQL."
+            )
+        admin = (
+            Utilisateur.objects.filter(
+                username__startswith=PREFIXE, username__endswith="-admin"
+            )
+            .order_by("-date_inscription")
+            .first()
+        )
+        if admin is None:
+            raise CommandError("Aucun jeu de benchmark : lancez peupler_bench.")
+        prefixe = admin.username[: -len("admin")]
+        clients = list(
+            Utilisateur.objects.filter(
+                username__startswith=prefixe, role="client"
+            ).order_by("?")[: options["clients"]]
+        )
+        if not clients:
+            raise CommandError("Le jeu de benchmark ne contient aucun client.")
+
+        comptes = {}
+        for pk, utilisateur_id in CompteBancaire.objects.filter(
+            utilisateur__in=clients
+        ).values_list("pk", "utilisateur_id"):
+            comptes.setdefault(utilisateur_id, []).append(pk)
+        numeros = list(
+            CompteBancaire.objects.filter(
+                utilisateur__username__startswith=prefixe
+            ).values_list("numero_compte", flat=True)[:1000]
+        )
+        tous_les_comptes = [pk for ids in comptes.values() for pk in ids]
+        nombre = options["clients"] * options["requetes"]
+
+        def liste_transactions(api, utilisateur, rng, index):
+            return api.get("/api/transactions/?page_size=50")
+
+        def liste_comptes(api, utilisateur, rng, index):
+            return api.get("/api/comptes/")
+
+        def verification_compte(api, utilisateur, rng, index):
+            return api.post(
+                "/api/verify-account/", {"numero_compte": rng.choice(numeros)}
+            )
+
+        def virement(api, utilisateur, rng, index):
+            return api.post(
+                "/api/transactions/create/",
+                {
+                    "compte_source": comptes[utilisateur.pk][0],
+                    "compte_destination": rng.choice(
+                        comptes[utilisateur.pk][1:] or tous_les_comptes
+                    ),
+                    "type": "transfert",
+                    "montant": "1",
+                    "status": "en_attente",
+                },
+            )
+
+        def mobile_money(api, utilisateur, rng, index):
+            return api.post(
+                "/api/transactions/mobile-money/",
+                {
+                    "compte": comptes[utilisateur.pk][0],
+                    "montant": "10",
+                    "type_transaction": rng.choice(["depot", "retrait"]),
+                    "fournisseur": "mvola",
+                    "numero_telephone": "0340000000",
+                },
+            )
+
+        def approbation(api, utilisateur, rng, index):
+            return api.patch(
+                f"/api/transactions/{a_approuver[index]}/approuver/",
+                {"status": "succès"},
+            )
+
+        def approbation_groupee(api, utilisateur, rng, index):
+            return api.post(
+                "/api/approbations/",
+                {
+                    "type": "virement",
+                    "ids": a_approuver_en_lot[index * 50 : (index + 1) * 50],
+                    "decision": "approuve",
+                },
+                format="json",
+            )
+
+        scenarios = {
+            "liste-transactions": (liste_transactions, clients),
+            "liste-comptes": (liste_comptes, clients),
+            "verify-account": (verification_compte, clients),
+            "effectuer-transaction": (virement, clients),
+            "mobile-money-transaction": (mobile_money, clients),
+            "approuver-rejeter-virement": (approbation, [admin] * len(clients)),
+            "approbations-groupees": (approbation_groupee, [admin] * len(clients)),
+        }
+        choisis = options["scenarios"] or list(scenarios)
+        inconnus = set(choisis) - set(scenarios)
+        if inconnus:
+            raise CommandError(f"Scénarios inconnus : {', '.join(sorted(inconnus))}")
+
+        # Virements en attente à approuver, un par requête (50 par lot groupé)
+        rng = random.Random(options["seed"])
+        a_approuver = self.creer_virements(
+            rng,
+            tous_les_comptes,
+            nombre if "approuver-rejeter-virement" in choisis else 0,
+        )
+        a_approuver_en_lot = self.creer_virements(
+            rng,
+            tous_les_comptes,
+            nombre * 50 if "approbations-groupees" in choisis else 0,
+        )
+
+        rapport = {
+            "parametres": {
+                "clients": len(clients),
+                "requetes_par_client": options["requetes"],
+                "seed": options["seed"],
+                "base": connection.vendor,
+            },
+            "scenarios": {},
+        }
+        for nom in choisis:
+            scenario, utilisateurs = scenarios[nom]
+            resultat = executer(
+                scenario, utilisateurs, options["requetes"], seed=options["seed"]
+            )
+            rapport["scenarios"][nom] = resultat.as_dict()
+            self.stderr.write(
+                f"{nom} : {rapport['scenarios'][nom]['debit']} req/s, "
+                f"p95={rapport['scenarios'][nom]['latence_ms']['p95']} ms"
+            )
+
+        sortie = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options["sortie"]:
+            with open(options["sortie"], "w", encoding="utf-8") as fichier:
+                fichier.write(sortie + "\n")
+        else:
+            sys.stdout.write(sortie + "\n")
+
+    def creer_virements(self, rng, comptes, nombre):
+        virements = Transaction.objects.bulk_create(
+            (
+                Transaction(
+                    compte_source_id=source,
+                    compte_destination_id=destination,
+                    type="transfert",
+                    montant=Decimal("1"),
+                    status="en_attente",
+                )
+                for source, destination in (
+                    rng.sample(comptes, 2) for _ in range(nombre)
+                )
+            ),
+            batch_size=5000,
+        )
+        return [virement.pk for virement in virements]
@@ -0,0 +1,82 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from api.bench import purger_grand_livre
+from api.models import CompteBancaire, Transaction, Utilisateur
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit (éléments/s) de l'approbation des virements un par un "
+        "et de l'endpoint d'approbation groupée."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--virements", type=int, default=500)
+
+    def handle(self, *args, **options):
+        suffixe = uuid.uuid4().hex[:8]
+        admin = Utilisateur.objects.create_user(
+            username=f"bench-admin-{suffixe}", password=None, role="admin"
+        )
+        client = Utilisateur.objects.create_user(
+            username=f"bench-client-{suffixe}", password=None
+        )
+        try:
+            source, destination = [
+                CompteBancaire.objects.create(
+                    utilisateur=client,
+                    type_compte="courant",
+                    statut="approuve",
+                    solde=Decimal("1000000"),
+                )
+                for _ in range(2)
+            ]
+            api = APIClient()
+            api.force_authenticate(admin)
+
+            nombre = options["virements"]
+            unitaires = self.creer_virements(source, destination, nombre)
+            debut = time.perf_counter()
+            for pk in unitaires:
+                api.patch(f"/api/transactions/{pk}/approuver/", {"status": "succès"})
+            duree_unitaire = time.perf_counter() - debut
+
+            groupes = self.creer_virements(source, destination, nombre)
+            debut = time.perf_counter()
+            reponse = api.post(
+                "/api/approbations/",
+                {"type": "virement", "ids": groupes, "decision": "approuve"},
+                format="json",
+            )
+            duree_groupee = time.perf_counter() - debut
+
+            self.stdout.write(
+                f"unitaire : {nombre / duree_unitaire:.1f} éléments/s "
+                f"({duree_unitaire:.3f}s)"
+            )
+            self.stdout.write(
+                f"groupée  : {nombre / duree_groupee:.1f} éléments/s "
+                f"({duree_groupee:.3f}s, {reponse.data['succes']} réglés)"
+            )
+        finally:
+            purger_grand_livre(client.comptes.all())
+            admin.delete()
+            client.delete()
+
+    def creer_virements(self, source, destination, nombre):
+        virements = Transaction.objects.bulk_create(
+            Transaction(
+                compte_source=source,
+                compte_destination=destination,
+                type="transfert",
+                montant=Decimal("1"),
+                status="en_attente",
+            )
+            for _ in range(nombre)
+        )
+        return [virement.pk for virement in virements]
@@ -0,0 +1,213 @@
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bench import PREFIXE, centile
+from api.models import CompteBancaire, Utilisateur
+
+# (nom, méthode, chemin WSGI, chemin ASGI, corps JSON)
+ENDPOINTS = [
+    (
+        "liste-transactions",
+        "GET",
+        "/api/transactions/?page_size=50",
+        "/api/async/transactions/?page_size=50",
+        None,
+    ),
+    ("liste-comptes", "GET", "/api/comptes/", "/api/async/comptes/", None),
+    ("liste-prets", "GET", "/api/prets/", "/api/async/prets/", None),
+    ("user-info", "GET", "/api/user-info/", "/api/async/user-info/", None),
+    (
+        "verify-account",
+        "POST",
+        "/api/verify-account/",
+        "/api/async/verify-account/",
+        "numero",
+    ),
+]
+
+
+def _charge(base, methode, chemin, corps, jeton, concurrence, requetes):
+    """
+    Envoie `requetes` requêtes par client, avec `concurrence` threads clients.
+
+    Chaque thread garde une connexion HTTP persistante (rouverte après une
+    erreur réseau). Retourne latences, codes et durée totale.
+    """
+    url = urlsplit(base)
+    entetes = {"Authorization": f"Bearer {jeton}"}
+    if corps is not None:
+        entetes["Content-Type"] = "application/json"
+        corps = json.dumps(corps)
+    latences, codes, verrou = [], {}, threading.Lock()
+    depart = threading.Barrier(concurrence + 1)
+
+    def worker():
+        locales, codes_locaux = [], {}
+        connexion = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+        depart.wait()
+        try:
+            for _ in range(requetes):
+                debut = time.perf_counter()
+                try:
+                    connexion.request(methode, chemin, body=corps, headers=entetes)
+                    reponse = connexion.getresponse()
+                    reponse.read()
+                    code = reponse.status
+                except (OSError, http.client.HTTPException):
+                    connexion.close()
+                    code = 0
+                locales.append(time.perf_counter() - debut)
+                codes_locaux[code] = codes_locaux.get(code, 0) + 1
+        finally:
+            connexion.close()
+            with verrou:
+                latences.extend(locales)
+                for code, nombre in codes_locaux.items():
+                    codes[code] = codes.get(code, 0) + nombre
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrence)]
+    for thread in threads:
+        thread.start()
+    depart.wait()
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return latences, codes, time.perf_counter() - debut
+
+
+def _resume(latences, codes, duree):
+    latences = sorted(latences)
+    return {
+        "requetes": len(latences),
+        "erreurs": sum(n for code, n in codes.items() if code == 0 or code >= 400),
+        "codes": {str(code): n for code, n in sorted(codes.items())},
+        "duree": round(duree, 3),
+        "debit": round(len(latences) / duree, 1) if duree else None,
+        "latence_ms": {
+            nom: round(centile(latences, p) * 1000, 2) if latences else None
+            for nom, p in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare les endpoints de lecture synchrones (WSGI) et leurs variantes "
+        "asynchrones (ASGI) sous une concurrence croissante, en JSON. Les deux "
+        "déploiements doivent tourner avec le même nombre de workers, par ex. "
+        "« gunicorn config.wsgi -w 4 -b :8000 » et "
+        "« gunicorn config.asgi -k uvicorn.workers.UvicornWorker -w 4 -b :8001 »."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wsgi", default="http://127.0.0.1:8000")
+        parser.add_argument("--asgi", default="http://127.0.0.1:8001")
+        parser.add_argument("--concurrence", type=int, nargs="+", default=[16, 64, 256])
+        parser.add_argument("--requetes", type=int, default=20)
+        parser.add_argument(
+            "--endpoints",
+            nargs="*",
+            help="Endpoints à mesurer (tous par défaut).",
+        )
+        parser.add_argument(
+            "--utilisateur",
+            help="Client authentifié (par défaut, un client du dernier jeu "
+            "créé par peupler_bench, mot de passe « bench »).",
+        )
+        parser.add_argument("--mot-de-passe", default="bench")
+        parser.add_argument("--sortie", help="Fichier JSON de sortie (stdout sinon).")
+
+    def handle(self, *args, **options):
+        endpoints = {endpoint[0]: endpoint for endpoint in ENDPOINTS}
+        choisis = options["endpoints"] or list(endpoints)
+        inconnus = set(choisis) - set(endpoints)
+        if inconnus:
+            raise CommandError(f"Endpoints inconnus : {', '.join(sorted(inconnus))}")
+
+        username = options["utilisateur"]
+        if username is None:
+            client = (
+                Utilisateur.objects.filter(username__startswith=PREFIXE, role="client")
+                .order_by("-date_inscription")
+                .first()
+            )
+            if client is None:
+                raise CommandError("Aucun jeu de benchmark : lancez peupler_bench.")
+            username = client.username
+        numero = (
+            CompteBancaire.objects.filter(statut="approuve")
+            .values_list("numero_compte", flat=True)
+            .first()
+        )
+
+        rapport = {
+            "parametres": {
+                "wsgi": options["wsgi"],
+                "asgi": options["asgi"],
+                "requetes_par_client": options["requetes"],
+                "utilisateur": username,
+            },
+            "endpoints": {},
+        }
+        for deploiement in ("wsgi", "asgi"):
+            base = options[deploiement]
+            jeton = self.obtenir_jeton(base, username, options["mot_de_passe"])
+            for nom in choisis:
+                _, methode, chemin_wsgi, chemin_asgi, corps = endpoints[nom]
+                chemin = chemin_wsgi if deploiement == "wsgi" else chemin_asgi
+                if corps == "numero":
+                    corps = {"numero_compte": numero}
+                for concurrence in options["concurrence"]:
+                    resume = _resume(
+                        *_charge(
+                            base,
+                            methode,
+                            chemin,
+                            corps,
+                            jeton,
+                            concurrence,
+                            options["requetes"],
+                        )
+                    )
+                    rapport["endpoints"].setdefault(nom, {}).setdefault(
+                        deploiement, {}
+                    )[str(concurrence)] = resume
+                    self.stderr.write(
+                        f"{deploiement} {nom} x{concurrence} : "
+                        f"{resume['debit']} req/s, "
+                        f"p99={resume['latence_ms']['p99']} ms, "
+                        f"{resume['erreurs']} erreurs"
+                    )
+
+        sortie = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options["sortie"]:
+            with open(options["sortie"], "w", encoding="utf-8") as fichier:
+                fichier.write(sortie + "\n")
+        else:
+            sys.stdout.write(sortie + "\n")
+
+    def obtenir_jeton(self, base, username, mot_de_passe):
+        url = urlsplit(base)
+        connexion = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+        try:
+            connexion.request(
+                "POST",
+                "/api/token/",
+                body=json.dumps({"username": username, "password": mot_de_passe}),
+                headers={"Content-Type": "application/json"},
+            )
+            reponse = connexion.getresponse()
+            donnees = reponse.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise CommandError(f"{base} injoignable : {e}") from e
+        finally:
+            connexion.close()
+        if reponse.status != 200:
+            raise CommandError(f"Authentification refusée par {base}.")
+        return json.loads(donnees)["access"]
@@ -0,0 +1,140 @@
+import json
+import sys
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+from api.bench import centile
+
+
+def _mode(settings_dict):
+    if settings_dict["OPTIONS"].get("pool"):
+        return "pool"
+    if settings_dict["CONN_MAX_AGE"] != 0:
+        return "persistantes"
+    return "sans_reutilisation"
+
+
+def _cycles(connexion, requetes):
+    """
+    Simule `requetes` requêtes HTTP d'une requête SQL chacune.
+
+    Comme entre deux requêtes HTTP, la connexion est rendue par
+    `close_if_unusable_or_obsolete` : fermée, conservée ou rendue au pool
+    selon la configuration. Retourne les durées de chaque cycle.
+    """
+    durees = []
+    try:
+        for _ in range(requetes):
+            debut = time.perf_counter()
+            with connexion.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            connexion.close_if_unusable_or_obsolete()
+            durees.append(time.perf_counter() - debut)
+    finally:
+        connexion.close()
+    return durees
+
+
+def _executer(fabrique, threads, requetes):
+    durees, verrou = [], threading.Lock()
+
+    def worker():
+        locales = _cycles(fabrique(), requetes)
+        with verrou:
+            durees.extend(locales)
+
+    liste = [threading.Thread(target=worker) for _ in range(threads)]
+    debut = time.perf_counter()
+    for thread in liste:
+        thread.start()
+    for thread in liste:
+        thread.join()
+    duree = time.perf_counter() - debut
+
+    durees.sort()
+    return {
+        "requetes": len(durees),
+        "duree": round(duree, 3),
+        "debit": round(len(durees) / duree, 1) if duree else None,
+        "latence_ms": {
+            nom: round(centile(durees, p) * 1000, 3) if durees else None
+            for nom, p in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le coût de connexion par requête : la configuration courante de "
+        "DATABASES (pool psycopg, connexions persistantes) comparée à une "
+        "connexion ouverte puis fermée à chaque requête, en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--requetes", type=int, default=200)
+        parser.add_argument("--sortie", help="Fichier JSON de sortie (stdout sinon).")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        settings_dict = connections[alias].settings_dict
+        if connections[alias].vendor == "sqlite":
+            self.stderr.write(
+                "Attention : une connexion SQLite est un fichier local, "
+                "les résultats ne sont pas représentatifs de PostgreSQL."
+            )
+
+        # Même base, sans pool ni persistance
+        sans_reutilisation = {
+            **settings_dict,
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {
+                cle: valeur
+                for cle, valeur in settings_dict["OPTIONS"].items()
+                if cle != "pool"
+            },
+        }
+        backend = load_backend(settings_dict["ENGINE"])
+
+        rapport = {
+            "parametres": {
+                "base": connections[alias].vendor,
+                "mode": _mode(settings_dict),
+                "threads": options["threads"],
+                "requetes_par_thread": options["requetes"],
+            },
+            "modes": {},
+        }
+        for nom, fabrique in [
+            (
+                "sans_reutilisation",
+                lambda: backend.DatabaseWrapper(
+                    sans_reutilisation, f"{alias}-sans-reutilisation"
+                ),
+            ),
+            (_mode(settings_dict), lambda: connections[alias]),
+        ]:
+            resultat = _executer(fabrique, options["threads"], options["requetes"])
+            rapport["modes"][nom] = resultat
+            self.stderr.write(
+                f"{nom} : {resultat['debit']} req/s, "
+                f"p50={resultat['latence_ms']['p50']} ms, "
+                f"p99={resultat['latence_ms']['p99']} ms"
+            )
+
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None:
+            rapport["pool"] = pool.get_stats()
+
+        sortie = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options["sortie"]:
+            with open(options["sortie"], "w", encoding="utf-8") as fichier:
+                fichier.write(sortie + "\n")
+        else:
+            sys.stdout.write(sortie + "\n")
@@ -0,0 +1,143 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.models import CompteBancaire, Pret, Transaction
+from api.serialisation_rapide import Plan, orjson, rendre
+from api.serializers import (
+    CompteBancaireSerializer,
+    PretSerializer,
+    TransactionSerializer,
+)
+
+# (serializer, queryset des vues de liste)
+LISTES = {
+    "transactions": (
+        TransactionSerializer,
+        lambda: Transaction.objects.select_related(
+            "compte_source", "compte_destination"
+        ).order_by("-date_transaction", "-id"),
+    ),
+    "comptes": (
+        CompteBancaireSerializer,
+        lambda: CompteBancaire.objects.select_related("utilisateur").order_by("pk"),
+    ),
+    "prets": (
+        PretSerializer,
+        lambda: Pret.objects.select_related("compte__utilisateur").order_by("pk"),
+    ),
+}
+
+
+def _meilleur(fonction, repetitions):
+    """Plus courte durée de `repetitions` appels, et le dernier résultat"""
+    meilleure = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        duree = time.perf_counter() - debut
+        meilleure = duree if meilleure is None else min(meilleure, duree)
+    return meilleure, resultat
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark de la sérialisation des listes : serializer DRF et "
+        "JSONRenderer contre le chemin rapide (values, conversions, rendu "
+        "orjson), en lignes par seconde, requête comprise ou non. Vérifie que "
+        "les deux sorties sont identiques."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lignes", type=int, default=10000)
+        parser.add_argument("--repetitions", type=int, default=5)
+        parser.add_argument(
+            "--listes", nargs="*", help="Listes à mesurer (toutes par défaut)."
+        )
+        parser.add_argument("--sortie", help="Fichier JSON de sortie (stdout sinon).")
+
+    def handle(self, *args, **options):
+        choisies = options["listes"] or list(LISTES)
+        inconnues = set(choisies) - set(LISTES)
+        if inconnues:
+            raise CommandError(f"Listes inconnues : {', '.join(sorted(inconnues))}")
+
+        request = Request(APIRequestFactory().get("/"))
+        rendu = JSONRenderer()
+        repetitions = options["repetitions"]
+        rapport = {
+            "parametres": {
+                "lignes": options["lignes"],
+                "repetitions": repetitions,
+                "encodeur": "orjson" if orjson is not None else "json",
+            },
+            "listes": {},
+        }
+        for nom in choisies:
+            serializer_class, queryset = LISTES[nom]
+            contexte = {"request": request}
+            plan = Plan(serializer_class(context=contexte))
+            lignes = options["lignes"]
+
+            def drf(instances):
+                return rendu.render(
+                    serializer_class(instances, many=True, context=contexte).data
+                )
+
+            def rapide(valeurs):
+                return rendre(plan.convertir(valeurs))
+
+            instances = list(queryset()[:lignes])
+            valeurs = list(queryset().values(*plan.colonnes)[:lignes])
+            if not instances:
+                raise CommandError(
+                    f"Aucune ligne pour « {nom} » : lancez peupler_bench."
+                )
+
+            mesures = {
+                "drf": _meilleur(lambda: drf(instances), repetitions),
+                "rapide": _meilleur(lambda: rapide(valeurs), repetitions),
+                "drf_avec_requete": _meilleur(
+                    lambda: drf(list(queryset()[:lignes])), repetitions
+                ),
+                "rapide_avec_requete": _meilleur(
+                    lambda: rapide(queryset().values(*plan.colonnes)[:lignes]),
+                    repetitions,
+                ),
+            }
+            resultat = {
+                "lignes": len(instances),
+                "identique": mesures["drf"][1] == mesures["rapide"][1],
+            }
+            for mesure, (duree, _) in mesures.items():
+                resultat[mesure] = {
+                    "duree_ms": round(duree * 1000, 2),
+                    "lignes_par_seconde": round(len(instances) / duree),
+                }
+            resultat["acceleration"] = round(
+                mesures["drf"][0] / mesures["rapide"][0], 1
+            )
+            resultat["acceleration_avec_requete"] = round(
+                mesures["drf_avec_requete"][0] / mesures["rapide_avec_requete"][0], 1
+            )
+            rapport["listes"][nom] = resultat
+            self.stderr.write(
+                f"{nom} : {resultat['drf']['lignes_par_seconde']} -> "
+                f"{resultat['rapide']['lignes_par_seconde']} lignes/s "
+                f"(x{resultat['acceleration']}, "
+                f"x{resultat['acceleration_avec_requete']} requête comprise)"
+            )
+            if not resultat["identique"]:
+                self.stderr.write(self.style.ERROR(f"{nom} : sorties différentes"))
+
+        sortie = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options["sortie"]:
+            with open(options["sortie"], "w", encoding="utf-8") as fichier:
+                fichier.write(sortie + "\n")
+        else:
+            sys.stdout.write(sortie + "\n")
@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import Sum
+
+from api.models import CompteBancaire, Utilisateur
+from api.services import SoldeInsuffisant, crediter, debiter, transferer
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de contention sur les soldes : plusieurs threads débitent, "
+        "créditent et transfèrent sur un petit nombre de comptes « chauds », "
+        "puis vérifient qu'aucune mise à jour n'a été perdue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--operations", type=int, default=200)
+        parser.add_argument("--comptes", type=int, default=2)
+        parser.add_argument("--solde-initial", type=Decimal, default=Decimal("1000"))
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stderr.write(
+                "Attention : SQLite sérialise les écritures, "
+                "les résultats ne sont pas représentatifs de PostgreSQL."
+            )
+
+        utilisateur = Utilisateur.objects.create_user(
+            username=f"bench-{uuid.uuid4().hex[:8]}", password=None
+        )
+        try:
+            comptes = [
+                CompteBancaire.objects.create(
+                    utilisateur=utilisateur,
+                    type_compte="courant",
+                    statut="approuve",
+                    solde=options["solde_initial"],
+                ).pk
+                for _ in range(max(options["comptes"], 2))
+            ]
+            self.run_benchmark(comptes, options)
+        finally:
+            utilisateur.delete()
+
+    def run_benchmark(self, comptes, options):
+        compteurs = {"operations": 0, "refus": 0, "erreurs": 0}
+        credits_nets = Decimal("0")
+        verrou = threading.Lock()
+
+        def worker(index):
+            nonlocal credits_nets
+            rng = random.Random(options["seed"] + index)
+            local = {"operations": 0, "refus": 0, "erreurs": 0}
+            net = Decimal("0")
+            try:
+                for _ in range(options["operations"]):
+                    montant = Decimal(rng.randint(1, 20))
+                    operation = rng.choice(("debit", "credit", "transfert"))
+                    try:
+                        if operation == "debit":
+                            debiter(rng.choice(comptes), montant)
+                            net -= montant
+                        elif operation == "credit":
+                            crediter(rng.choice(comptes), montant)
+                            net += montant
+                        else:
+                            source, destination = rng.sample(comptes, 2)
+                            transferer(source, destination, montant)
+                        local["operations"] += 1
+                    except SoldeInsuffisant:
+                        local["refus"] += 1
+                    except OperationalError:
+                        local["erreurs"] += 1
+            finally:
+                connection.close()
+                with verrou:
+                    for cle, valeur in local.items():
+                        compteurs[cle] += valeur
+                    credits_nets += net
+
+        threads = [
+            threading.Thread(target=worker, args=(i,))
+            for i in range(options["threads"])
+        ]
+        debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+
+        attendu = options["solde_initial"] * len(comptes) + credits_nets
+        total = CompteBancaire.objects.filter(pk__in=comptes).aggregate(
+            total=Sum("solde")
+        )["total"]
+        negatifs = CompteBancaire.objects.filter(pk__in=comptes, solde__lt=0).count()
+
+        self.stdout.write(
+            f"threads={options['threads']} comptes={len(comptes)} "
+            f"operations={compteurs['operations']} refus={compteurs['refus']} "
+            f"erreurs={compteurs['erreurs']} duree={duree:.3f}s "
+            f"debit={compteurs['operations'] / duree:.1f} op/s"
+        )
+        if total != attendu or negatifs:
+            self.stderr.write(
+                self.style.ERROR(
+                    f"Incohérence : total={total} attendu={attendu} "
+                    f"comptes négatifs={negatifs}"
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Aucune mise à jour perdue ({total})")
+            )
@@ -0,0 +1,106 @@
+import json
+import sys
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.bench import centile
+from api.models import Tache
+from api.taches import differer, nom_travailleur, travailler
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit de la file de tâches : enfilage de tâches vides, "
+        "puis vidage par N travailleurs concurrents, avec le délai entre "
+        "création et fin de chaque tâche, en JSON. Les tâches créées sont "
+        "supprimées ensuite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--taches", type=int, default=2000)
+        parser.add_argument("--workers", type=int, nargs="*", default=[1, 4])
+        parser.add_argument("--lot", type=int, default=10)
+        parser.add_argument("--sortie", help="Fichier JSON de sortie (stdout sinon).")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stderr.write(
+                "Attention : SQLite sérialise les écritures et ignore SKIP LOCKED, "
+                "les résultats ne sont pas représentatifs de PostgreSQL."
+            )
+        rapport = {
+            "parametres": {
+                "base": connection.vendor,
+                "taches": options["taches"],
+                "lot": options["lot"],
+            },
+            "enfilage": None,
+            "travailleurs": {},
+        }
+        for workers in options["workers"]:
+            execution = uuid.uuid4().hex
+            debut = time.perf_counter()
+            for _ in range(options["taches"]):
+                differer("ping", execution=execution)
+            duree_enfilage = time.perf_counter() - debut
+            rapport["enfilage"] = {
+                "duree": round(duree_enfilage, 3),
+                "taches_par_seconde": round(options["taches"] / duree_enfilage, 1),
+            }
+
+            arret = threading.Event()
+            executees = [0] * workers
+
+            def worker(numero):
+                executees[numero] = travailler(
+                    nom_travailleur(numero),
+                    arret,
+                    lot=options["lot"],
+                    une_fois=True,
+                )
+
+            threads = [
+                threading.Thread(target=worker, args=(numero,))
+                for numero in range(workers)
+            ]
+            debut = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            duree = time.perf_counter() - debut
+
+            taches = Tache.objects.filter(nom="ping", arguments__execution=execution)
+            delais = sorted(
+                (fin - creation).total_seconds()
+                for creation, fin in taches.filter(statut="terminee").values_list(
+                    "date_creation", "date_fin"
+                )
+            )
+            resultat = {
+                "executees": sum(executees),
+                "terminees": len(delais),
+                "duree": round(duree, 3),
+                "taches_par_seconde": round(sum(executees) / duree, 1),
+                "delai_ms": {
+                    nom: round(centile(delais, p) * 1000, 1) if delais else None
+                    for nom, p in (("p50", 50), ("p99", 99), ("max", 100))
+                },
+            }
+            taches.delete()
+            rapport["travailleurs"][workers] = resultat
+            self.stderr.write(
+                f"{workers} travailleurs : {resultat['taches_par_seconde']} tâches/s "
+                f"({resultat['terminees']}/{options['taches']} terminées)"
+            )
+
+        sortie = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options["sortie"]:
+            with open(options["sortie"], "w", encoding="utf-8") as fichier:
+                fichier.write(sortie + "\n")
+        else:
+            sys.stdout.write(sortie + "\n")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.amortissement import TAILLE_LOT, enregistrer_echeanciers
+
+
+class Command(BaseCommand):
+    help = "Recalcule les échéanciers de tous les prêts en cours, par lots vectorisés."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT)
+
+    def handle(self, *args, **options):
+        total = enregistrer_echeanciers(taille_lot=options["taille_lot"])
+        self.stdout.write(self.style.SUCCESS(f"{total} échéanciers recalculés"))
@@ -0,0 +1,94 @@
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.interets import (
+    TACHE,
+    TAILLE_LOT,
+    fenetres,
+    initialiser_processus,
+    traiter_lot,
+    traiter_lot_processus,
+)
+from api.models import LotTraite
+
+
+class Command(BaseCommand):
+    help = (
+        "Traitement quotidien des prêts en cours : intérêts courus, transactions "
+        "d'intérêts et échéances en retard. Reprend après le dernier lot traité."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=parse_date,
+            help="Date de référence (aujourd'hui par défaut).",
+        )
+        parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT)
+        parser.add_argument(
+            "--processus",
+            type=int,
+            default=1,
+            help="Nombre de processus traitant les lots en parallèle.",
+        )
+        parser.add_argument(
+            "--recommencer",
+            action="store_true",
+            help="Oublie les lots déjà traités pour cette date.",
+        )
+
+    def handle(self, *args, **options):
+        date_reference = options["date"] or timezone.localdate()
+        points = LotTraite.objects.filter(tache=TACHE, date_reference=date_reference)
+        if options["recommencer"]:
+            points.delete()
+        deja = set(points.values_list("debut", flat=True))
+        lots = [
+            (debut, fin)
+            for debut, fin in fenetres(options["taille_lot"])
+            if debut not in deja
+        ]
+        self.stdout.write(
+            f"{date_reference} : {len(lots)} lots à traiter, {len(deja)} déjà traités"
+        )
+
+        total = {"prets": 0, "transactions": 0, "interets": Decimal("0"), "retards": 0}
+        if options["processus"] > 1:
+            if connections["default"].vendor == "sqlite":
+                self.stderr.write(
+                    "Attention : SQLite sérialise les écritures, "
+                    "les processus parallèles risquent des erreurs de verrouillage."
+                )
+            # Chaque processus ouvre ses propres connexions
+            connections.close_all()
+            with ProcessPoolExecutor(
+                options["processus"], initializer=initialiser_processus
+            ) as pool:
+                resultats = pool.map(
+                    traiter_lot_processus,
+                    [debut for debut, _ in lots],
+                    [fin for _, fin in lots],
+                    [date_reference] * len(lots),
+                )
+                for resultat in resultats:
+                    self.cumuler(total, resultat)
+        else:
+            for debut, fin in lots:
+                self.cumuler(total, traiter_lot(debut, fin, date_reference))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total['prets']} prêts, {total['transactions']} transactions "
+                f"d'intérêts ({total['interets']}), {total['retards']} échéances "
+                "en retard"
+            )
+        )
+
+    def cumuler(self, total, resultat):
+        for cle, valeur in resultat.items():
+            total[cle] += valeur
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.mobile_money import TAILLE_LOT, importer_reglements
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un fichier de règlement Mobile Money (CSV ou JSONL) en le lisant "
+        "ligne par ligne et en réglant les opérations par lots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("fichier")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT)
+
+    def handle(self, *args, **options):
+        chemin = options["fichier"]
+        format_fichier = options["format"] or (
+            "jsonl" if chemin.endswith((".jsonl", ".json")) else "csv"
+        )
+        try:
+            flux = open(chemin, encoding="utf-8-sig", newline="")
+        except OSError as erreur:
+            raise CommandError(f"Impossible d'ouvrir {chemin} : {erreur}")
+
+        with flux:
+            rapport = importer_reglements(flux, format_fichier, options["taille_lot"])
+
+        for erreur in rapport.erreurs:
+            self.stderr.write(f"Ligne {erreur['ligne']} : {erreur['detail']}")
+        self.stdout.write(
+            json.dumps(rapport.as_dict() | {"erreurs": len(rapport.erreurs)})
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from api.bench import PREFIXE, peupler, supprimer
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée un jeu de données de benchmark (utilisateurs, comptes, "
+        "transactions et prêts) par insertions groupées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--utilisateurs", type=int, default=100)
+        parser.add_argument("--comptes-par-utilisateur", type=int, default=2)
+        parser.add_argument("--transactions", type=int, default=10000)
+        parser.add_argument("--prets", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--supprimer",
+            action="store_true",
+            help=f"Supprime les jeux existants (utilisateurs {PREFIXE}*) et s'arrête.",
+        )
+
+    def handle(self, *args, **options):
+        if options["supprimer"]:
+            total, _ = supprimer()
+            self.stdout.write(self.style.SUCCESS(f"{total} lignes supprimées"))
+            return
+
+        suffixe = peupler(
+            utilisateurs=options["utilisateurs"],
+            comptes_par_utilisateur=max(options["comptes_par_utilisateur"], 1),
+            transactions=options["transactions"],
+            prets=options["prets"],
+            seed=options["seed"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Jeu de benchmark {suffixe} créé"))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from api.grand_livre import soldes_grand_livre
+from api.models import CompteBancaire
+from api.replicas import lecture_replica
+from api.services import ajuster_grand_livre
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le solde de chaque compte au grand livre, par lots de comptes "
+        "parcourus par clé primaire, sans charger toute la table en mémoire. "
+        "Le parcours lit sur un réplica s'il en existe ; les corrections "
+        "recalculent l'écart sur le primaire."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--taille-lot", type=int, default=1000)
+        parser.add_argument(
+            "--corriger",
+            action="store_true",
+            help="Inscrire une écriture d'ajustement pour chaque écart constaté",
+        )
+
+    def handle(self, *args, **options):
+        taille_lot = options["taille_lot"]
+        dernier_id = 0
+        nb_comptes = nb_ecarts = 0
+
+        while True:
+            with lecture_replica():
+                lot = list(
+                    CompteBancaire.objects.filter(pk__gt=dernier_id)
+                    .order_by("pk")
+                    .values_list("pk", "solde")[:taille_lot]
+                )
+                if not lot:
+                    break
+                attendus = soldes_grand_livre([pk for pk, _ in lot])
+            dernier_id = lot[-1][0]
+            nb_comptes += len(lot)
+
+            for pk, solde in lot:
+                ecart = solde - attendus[pk]
+                if not ecart:
+                    continue
+                nb_ecarts += 1
+                self.stdout.write(
+                    f"Compte {pk} : solde={solde} grand_livre={attendus[pk]} "
+                    f"écart={ecart}"
+                )
+                if options["corriger"]:
+                    ajuster_grand_livre(pk)
+
+        style = self.style.SUCCESS if not nb_ecarts else self.style.WARNING
+        self.stdout.write(style(f"{nb_comptes} comptes vérifiés, {nb_ecarts} écart(s)"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.cumuls import reconstruire
+from api.taches import differer
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les cumuls journaliers du tableau de bord à partir des "
+        "transactions et des prêts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--taille-lot", type=int, default=1000)
+        parser.add_argument(
+            "--differer",
+            action="store_true",
+            help="Confie le recalcul à un travailleur `runworker`.",
+        )
+
+    def handle(self, *args, **options):
+        if options["differer"]:
+            tache = differer("reconstruire_cumuls", taille_lot=options["taille_lot"])
+            self.stdout.write(self.style.SUCCESS(f"Tâche #{tache.pk} enregistrée"))
+            return
+        lignes = reconstruire(options["taille_lot"])
+        self.stdout.write(self.style.SUCCESS(f"{lignes} cumuls recalculés"))
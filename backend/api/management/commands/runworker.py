@@ -0,0 +1,68 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.taches import liberer_bloquees, nom_travailleur, travailler
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les tâches différées (api.taches) avec N travailleurs "
+        "concurrents, jusqu'à SIGINT ou SIGTERM : les tâches réservées mais "
+        "non commencées sont alors rendues à la file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--lot", type=int, default=10, help="Tâches réservées à la fois."
+        )
+        parser.add_argument(
+            "--une-fois",
+            action="store_true",
+            help="S'arrête dès que la file est vide.",
+        )
+
+    def handle(self, *args, **options):
+        arret = threading.Event()
+        for signal_arret in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_arret, lambda *_: arret.set())
+
+        liberees = liberer_bloquees()
+        if liberees:
+            self.stderr.write(f"{liberees} tâches bloquées libérées")
+
+        executees = [0] * options["workers"]
+
+        def worker(numero):
+            executees[numero] = travailler(
+                nom_travailleur(numero),
+                arret,
+                lot=options["lot"],
+                attente=settings.JOB_QUEUE_POLL_INTERVAL,
+                une_fois=options["une_fois"],
+            )
+
+        threads = [
+            threading.Thread(target=worker, args=(numero,), daemon=True)
+            for numero in range(options["workers"])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stderr.write(f"{len(threads)} travailleurs démarrés")
+
+        # Les tâches d'autres processus arrêtés brutalement sont reprises
+        # périodiquement
+        prochaine = time.monotonic() + settings.JOB_QUEUE_LOCK_TIMEOUT / 2
+        while any(thread.is_alive() for thread in threads):
+            if arret.wait(settings.JOB_QUEUE_POLL_INTERVAL):
+                break
+            if time.monotonic() >= prochaine:
+                liberer_bloquees()
+                prochaine = time.monotonic() + settings.JOB_QUEUE_LOCK_TIMEOUT / 2
+        for thread in threads:
+            thread.join()
+        self.stdout.write(self.style.SUCCESS(f"{sum(executees)} tâches exécutées"))
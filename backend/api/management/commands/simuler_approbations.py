@@ -0,0 +1,171 @@
+import json
+import sys
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.models import Pret, Transaction
+from api.regles_approbation import (
+    STATUTS_ENCOURS,
+    Contexte,
+    MoteurRegles,
+    moteur_regles,
+)
+
+# Issue des opérations déjà traitées par un administrateur
+ISSUES = {
+    "virement": {"succès": "approuve", "échoué": "rejete"},
+    "pret": {"en_cours": "approuve", "rembourse": "approuve", "rejeté": "rejete"},
+}
+
+
+def _operations(objet, depuis):
+    """
+    (montant, date, ouverture du compte, rôle, utilisateur, statut, extra) ;
+    `extra` est, pour un prêt, le montant restant compté dans l'encours.
+    """
+    if objet == "virement":
+        lignes = Transaction.objects.filter(type="transfert")
+        if depuis is not None:
+            lignes = lignes.filter(date_transaction__gte=depuis)
+        return lignes.values_list(
+            "montant",
+            "date_transaction",
+            "compte_source__date_ouverture",
+            "compte_source__utilisateur__role",
+            "compte_source__utilisateur_id",
+            "status",
+            "pk",
+        ).iterator(chunk_size=5000)
+    lignes = Pret.objects.all()
+    if depuis is not None:
+        lignes = lignes.filter(date_demande__gte=depuis)
+    return (
+        lignes.annotate(demande=Coalesce("montant_initial", "montant"))
+        .values_list(
+            "demande",
+            "date_demande",
+            "compte__date_ouverture",
+            "compte__utilisateur__role",
+            "compte__utilisateur_id",
+            "statut",
+            "montant",
+        )
+        .iterator(chunk_size=5000)
+    )
+
+
+def _encours():
+    return dict(
+        Pret.objects.filter(statut__in=STATUTS_ENCOURS)
+        .values_list("compte__utilisateur_id")
+        .annotate(total=Sum("montant"))
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue les virements et prêts enregistrés à travers les règles "
+        "d'approbation, sans rien modifier : taux d'approbation et de rejet "
+        "automatiques, règles déclenchées et désaccords avec les décisions "
+        "déjà prises par les administrateurs, en JSON. L'encours est celui "
+        "d'aujourd'hui, hors prêt rejoué : une approximation de l'encours au "
+        "moment de la demande."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--regles",
+            help="Fichier JSON de règles à essayer (APPROVAL_RULES par défaut).",
+        )
+        parser.add_argument("--depuis", help="Date ISO des premières opérations.")
+        parser.add_argument("--sortie", help="Fichier JSON de sortie (stdout sinon).")
+
+    def handle(self, *args, **options):
+        if options["regles"]:
+            with open(options["regles"], encoding="utf-8") as fichier:
+                moteur = MoteurRegles(json.load(fichier))
+        else:
+            moteur = moteur_regles()
+        depuis = None
+        if options["depuis"]:
+            depuis = parse_datetime(options["depuis"])
+            if depuis is None:
+                raise CommandError("--depuis : date ISO attendue")
+            if timezone.is_naive(depuis):
+                depuis = timezone.make_aware(depuis)
+
+        rapport = {"parametres": {"depuis": options["depuis"]}, "objets": {}}
+        for objet in ("virement", "pret"):
+            utilise_encours = moteur.utilise_encours(objet)
+            encours = _encours() if utilise_encours else {}
+            decisions, regles, desaccords = Counter(), Counter(), Counter()
+            duree = 0.0
+            for (
+                montant,
+                date,
+                ouverture,
+                role,
+                utilisateur,
+                statut,
+                extra,
+            ) in _operations(objet, depuis):
+                exposition = Decimal("0")
+                if utilise_encours:
+                    exposition = encours.get(utilisateur, Decimal("0"))
+                    if objet == "pret":
+                        # Hors prêt rejoué, puis montant demandé
+                        if statut in STATUTS_ENCOURS:
+                            exposition -= extra
+                        exposition += montant
+                contexte = Contexte(
+                    montant,
+                    (date - ouverture).total_seconds() / 86400,
+                    role,
+                    exposition,
+                )
+                debut = time.perf_counter()
+                decision, nom = moteur.decider(objet, contexte)
+                duree += time.perf_counter() - debut
+
+                decisions[decision or "manuel"] += 1
+                if nom is not None:
+                    regles[nom] += 1
+                issue = ISSUES[objet].get(statut)
+                if decision is not None and issue is not None and issue != decision:
+                    desaccords[f"{decision} / administrateur : {issue}"] += 1
+
+            total = sum(decisions.values())
+            resultat = {
+                "operations": total,
+                "decisions": dict(decisions),
+                "taux_approbation_auto": (
+                    round(decisions["approuve"] / total, 4) if total else None
+                ),
+                "taux_rejet_auto": (
+                    round(decisions["rejete"] / total, 4) if total else None
+                ),
+                "regles": dict(regles),
+                "desaccords": dict(desaccords),
+                "evaluations_par_seconde": round(total / duree) if duree else None,
+            }
+            rapport["objets"][objet] = resultat
+            self.stderr.write(
+                f"{objet} : {total} opérations, "
+                f"{resultat['taux_approbation_auto']} approuvées et "
+                f"{resultat['taux_rejet_auto']} rejetées automatiquement, "
+                f"{sum(desaccords.values())} désaccords"
+            )
+
+        sortie = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options["sortie"]:
+            with open(options["sortie"], "w", encoding="utf-8") as fichier:
+                fichier.write(sortie + "\n")
+        else:
+            sys.stdout.write(sortie + "\n")
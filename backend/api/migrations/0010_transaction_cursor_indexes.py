@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_alter_transaction_compte_destination"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["-date_transaction", "-id"], name="transaction_date_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["compte_source", "-date_transaction", "-id"],
+                name="transaction_source_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["compte_destination", "-date_transaction", "-id"],
+                name="transaction_dest_date_idx",
+            ),
+        ),
+    ]
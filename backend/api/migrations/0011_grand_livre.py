@@ -0,0 +1,148 @@
+# Generated by Django 5.2 on 2026-10-17 19:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def ouvrir_grand_livre(apps, schema_editor):
+    """Crée une écriture d'ouverture pour le solde existant de chaque compte"""
+    CompteBancaire = apps.get_model("api", "CompteBancaire")
+    EcritureComptable = apps.get_model("api", "EcritureComptable")
+
+    for compte in CompteBancaire.objects.exclude(solde=0).iterator(chunk_size=1000):
+        mouvement = uuid.uuid4()
+        sens_compte, sens_contrepartie = (
+            ("credit", "debit") if compte.solde > 0 else ("debit", "credit")
+        )
+        EcritureComptable.objects.bulk_create(
+            [
+                EcritureComptable(
+                    mouvement=mouvement,
+                    compte_id=compte.pk,
+                    sens=sens_compte,
+                    montant=abs(compte.solde),
+                    sequence=1,
+                ),
+                EcritureComptable(
+                    mouvement=mouvement,
+                    contrepartie="ouverture",
+                    sens=sens_contrepartie,
+                    montant=abs(compte.solde),
+                ),
+            ]
+        )
+        CompteBancaire.objects.filter(pk=compte.pk).update(nb_ecritures=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_transaction_cursor_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comptebancaire",
+            name="nb_ecritures",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name="EcritureComptable",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "mouvement",
+                    models.UUIDField(db_index=True, default=uuid.uuid4, editable=False),
+                ),
+                ("contrepartie", models.CharField(blank=True, max_length=30)),
+                (
+                    "sens",
+                    models.CharField(
+                        choices=[("debit", "Débit"), ("credit", "Crédit")], max_length=6
+                    ),
+                ),
+                ("montant", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("sequence", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("date_ecriture", models.DateTimeField(auto_now_add=True)),
+                (
+                    "compte",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ecritures",
+                        to="api.comptebancaire",
+                    ),
+                ),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ecritures",
+                        to="api.transaction",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Écriture comptable",
+                "verbose_name_plural": "Écritures comptables",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("compte", "sequence"),
+                        name="ecriture_compte_sequence_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="SoldeInstantane",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sequence", models.PositiveBigIntegerField()),
+                ("solde", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("date_ecriture", models.DateTimeField()),
+                (
+                    "compte",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="soldes_instantanes",
+                        to="api.comptebancaire",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Solde instantané",
+                "verbose_name_plural": "Soldes instantanés",
+                "indexes": [
+                    models.Index(
+                        fields=["compte", "date_ecriture"], name="solde_compte_date_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("compte", "sequence"), name="solde_compte_sequence_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(ouvrir_grand_livre, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2 on 2026-10-17 19:14
+
+import django.db.models.deletion
+import rest_framework.utils.encoders
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_grand_livre"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CleIdempotence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cle", models.CharField(max_length=255)),
+                ("chemin", models.CharField(max_length=255)),
+                ("empreinte", models.CharField(max_length=64)),
+                (
+                    "code_statut",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                (
+                    "reponse",
+                    models.JSONField(
+                        blank=True,
+                        encoder=rest_framework.utils.encoders.JSONEncoder,
+                        null=True,
+                    ),
+                ),
+                (
+                    "date_creation",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+                (
+                    "utilisateur",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cles_idempotence",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Clé d'idempotence",
+                "verbose_name_plural": "Clés d'idempotence",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("utilisateur", "cle"),
+                        name="idempotence_utilisateur_cle_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
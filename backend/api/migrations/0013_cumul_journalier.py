@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-17 19:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_cle_idempotence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CumulJournalier",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("jour", models.DateField()),
+                ("categorie", models.CharField(max_length=20)),
+                ("statut", models.CharField(max_length=20)),
+                ("nombre", models.IntegerField(default=0)),
+                (
+                    "montant",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "compte",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cumuls",
+                        to="api.comptebancaire",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Cumul journalier",
+                "verbose_name_plural": "Cumuls journaliers",
+                "indexes": [
+                    models.Index(fields=["jour"], name="cumul_jour_idx"),
+                    models.Index(
+                        fields=["categorie", "statut"], name="cumul_categorie_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("compte", "jour", "categorie", "statut"),
+                        name="cumul_compte_jour_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-17 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_cumul_journalier"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompteurNumero",
+            fields=[
+                (
+                    "nom",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("valeur", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Compteur de numérotation",
+                "verbose_name_plural": "Compteurs de numérotation",
+            },
+        ),
+        migrations.AlterField(
+            model_name="comptebancaire",
+            name="numero_compte",
+            field=models.CharField(blank=True, max_length=30, unique=True),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2 on 2026-10-17 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_numerotation_comptes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pret",
+            name="date_debut",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="pret",
+            name="duree_mois",
+            field=models.PositiveSmallIntegerField(default=12),
+        ),
+        migrations.AddField(
+            model_name="pret",
+            name="interets_courus",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name="pret",
+            name="montant_initial",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="pret",
+            name="taux_annuel",
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=6),
+        ),
+        migrations.AddField(
+            model_name="pret",
+            name="type_amortissement",
+            field=models.CharField(
+                choices=[
+                    ("constant", "Annuités constantes"),
+                    ("degressif", "Amortissement constant (dégressif)"),
+                ],
+                default="constant",
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="Echeance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("numero", models.PositiveSmallIntegerField()),
+                ("date_echeance", models.DateField()),
+                ("capital", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("interets", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("restant_du", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "pret",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="echeances",
+                        to="api.pret",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Échéance",
+                "verbose_name_plural": "Échéances",
+                "ordering": ["pret", "numero"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("pret", "numero"), name="echeance_pret_numero_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-17 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0015_echeancier_prets"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="echeance",
+            name="en_retard",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="LotTraite",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tache", models.CharField(max_length=50)),
+                ("date_reference", models.DateField()),
+                ("debut", models.PositiveBigIntegerField()),
+                ("date_traitement", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Lot traité",
+                "verbose_name_plural": "Lots traités",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tache", "date_reference", "debut"),
+                        name="lot_traite_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_interets_prets"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="alertes",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
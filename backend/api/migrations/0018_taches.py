@@ -0,0 +1,90 @@
+# Generated by Django 5.2 on 2026-10-17 19:59
+
+import django.db.models.deletion
+import django.utils.timezone
+import rest_framework.utils.encoders
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0017_alertes_virements"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nom", models.CharField(max_length=50)),
+                (
+                    "arguments",
+                    models.JSONField(
+                        default=dict, encoder=rest_framework.utils.encoders.JSONEncoder
+                    ),
+                ),
+                (
+                    "statut",
+                    models.CharField(
+                        choices=[
+                            ("en_attente", "En attente"),
+                            ("en_cours", "En cours"),
+                            ("terminee", "Terminée"),
+                            ("echouee", "Échouée"),
+                        ],
+                        default="en_attente",
+                        max_length=20,
+                    ),
+                ),
+                ("tentatives", models.PositiveSmallIntegerField(default=0)),
+                ("max_tentatives", models.PositiveSmallIntegerField(default=5)),
+                (
+                    "disponible_le",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("reclamee_par", models.CharField(blank=True, max_length=100)),
+                ("reclamee_le", models.DateTimeField(blank=True, null=True)),
+                (
+                    "resultat",
+                    models.JSONField(
+                        blank=True,
+                        encoder=rest_framework.utils.encoders.JSONEncoder,
+                        null=True,
+                    ),
+                ),
+                ("erreur", models.TextField(blank=True)),
+                ("date_creation", models.DateTimeField(auto_now_add=True)),
+                ("date_fin", models.DateTimeField(blank=True, null=True)),
+                (
+                    "utilisateur",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="taches",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tâche",
+                "verbose_name_plural": "Tâches",
+                "indexes": [
+                    models.Index(
+                        fields=["statut", "disponible_le", "id"],
+                        name="tache_reclamation_idx",
+                    )
+                ],
+            },
+        ),
+    ]
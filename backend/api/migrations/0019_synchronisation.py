@@ -0,0 +1,73 @@
+# Generated by Django 5.2 on 2026-10-17 20:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0018_taches"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompteSupprime",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("compte_id", models.PositiveBigIntegerField()),
+                ("utilisateur_id", models.PositiveBigIntegerField(db_index=True)),
+                (
+                    "date_suppression",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Compte supprimé",
+                "verbose_name_plural": "Comptes supprimés",
+            },
+        ),
+        migrations.AddField(
+            model_name="comptebancaire",
+            name="date_modification",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="pret",
+            name="date_modification",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="date_modification",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="comptebancaire",
+            index=models.Index(
+                fields=["date_modification", "id"], name="compte_modification_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pret",
+            index=models.Index(
+                fields=["date_modification", "id"], name="pret_modification_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["date_modification", "id"], name="transaction_modification_idx"
+            ),
+        ),
+    ]
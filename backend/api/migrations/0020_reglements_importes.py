@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-17 20:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0019_synchronisation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReglementImporte",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fournisseur", models.CharField(max_length=30)),
+                ("reference", models.CharField(max_length=100)),
+                ("date_import", models.DateTimeField(auto_now_add=True)),
+                (
+                    "transaction",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reglement_importe",
+                        to="api.transaction",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Règlement importé",
+                "verbose_name_plural": "Règlements importés",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("fournisseur", "reference"),
+                        name="reglement_reference_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-17 20:27
+
+import api.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_reglements_importes"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="utilisateur",
+            managers=[
+                ("objects", api.models.UtilisateurManager()),
+            ],
+        ),
+    ]
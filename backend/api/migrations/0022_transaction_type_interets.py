@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-17 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0021_utilisateur_managers"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="transaction",
+            name="type",
+            field=models.CharField(
+                choices=[
+                    ("depot", "Dépôt"),
+                    ("retrait", "Retrait"),
+                    ("transfert", "Transfert"),
+                    ("pret", "Prêt"),
+                    ("interets", "Intérêts courus"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-17 21:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0022_transaction_type_interets"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ecriturecomptable",
+            name="compte",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="ecritures",
+                to="api.comptebancaire",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="soldeinstantane",
+            name="compte",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="soldes_instantanes",
+                to="api.comptebancaire",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-17 21:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0023_grand_livre_protege"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionSupprimee",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("transaction_id", models.PositiveBigIntegerField()),
+                ("utilisateur_id", models.PositiveBigIntegerField(db_index=True)),
+                (
+                    "date_suppression",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Transaction supprimée",
+                "verbose_name_plural": "Transactions supprimées",
+            },
+        ),
+    ]
@@ -0,0 +1,285 @@
+import csv
+import json
+import time
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.db import IntegrityError
+from django.db.transaction import atomic
+
+from .cumuls import etat_transaction, mettre_a_jour_cumuls
+from .models import CompteBancaire, ReglementImporte, Transaction
+from .services import CENTIME, Operation, regler_en_lot
+
+# Pourcentage de frais par fournisseur et type d'opération
+FRAIS_POURCENTAGE = {
+    "mvola": {"depot": Decimal("0.003"), "retrait": Decimal("0.008")},
+    "orange_money": {"depot": Decimal("0.005"), "retrait": Decimal("0.01")},
+}
+FRAIS_PAR_DEFAUT = {"depot": Decimal("0.005"), "retrait": Decimal("0.01")}
+
+TYPES_OPERATION = ("depot", "retrait")
+TAILLE_LOT = 1000
+# Plus grand montant de Transaction.montant (10 chiffres dont 2 décimales)
+MONTANT_MAX = Decimal("99999999.99")
+
+
+def calculer_frais(fournisseur, type_transaction, montant):
+    """Frais d'une opération Mobile Money selon le fournisseur, arrondis au centime"""
+    frais_pourcentage = FRAIS_POURCENTAGE.get(fournisseur, FRAIS_PAR_DEFAUT)
+    pourcentage = frais_pourcentage.get(type_transaction, Decimal("0.005"))
+    return (Decimal(str(montant)) * pourcentage).quantize(
+        CENTIME, rounding=ROUND_HALF_UP
+    )
+
+
+def commentaire_operation(
+    type_transaction, fournisseur, numero_telephone, montant, frais
+):
+    if type_transaction == "retrait":
+        return f"Retrait via {fournisseur} ({numero_telephone}). Montant: {montant}, Frais: {frais}"
+    return f"Dépôt via {fournisseur} ({numero_telephone}). Montant: {montant}, Frais: {frais}"
+
+
+def lire_lignes(flux, format_fichier):
+    """Itère sur les lignes d'un fichier de règlement CSV ou JSONL sans le charger"""
+    if format_fichier == "csv":
+        yield from csv.DictReader(flux)
+        return
+    for texte in flux:
+        texte = texte.strip()
+        if texte:
+            try:
+                yield json.loads(texte)
+            except json.JSONDecodeError:
+                yield None
+
+
+def _valider(ligne):
+    """
+    Retourne (numero_compte, type, montant, fournisseur, telephone, reference)
+    ou lève ValueError.
+    """
+    if not isinstance(ligne, dict):
+        raise ValueError("Ligne illisible")
+    champs = [
+        "numero_compte",
+        "type_transaction",
+        "montant",
+        "fournisseur",
+        "numero_telephone",
+        "reference",
+    ]
+    valeurs = [str(ligne.get(champ) or "").strip() for champ in champs]
+    if not all(valeurs):
+        raise ValueError("Tous les champs sont requis.")
+
+    numero_compte, type_transaction, montant, fournisseur, telephone, reference = (
+        valeurs
+    )
+    if len(reference) > 100:
+        raise ValueError("Référence opérateur trop longue (100 caractères au plus).")
+    if type_transaction not in TYPES_OPERATION:
+        raise ValueError(f"Type d'opération inconnu : {type_transaction}")
+    try:
+        valeur = Decimal(montant)
+    except InvalidOperation:
+        raise ValueError(f"Montant invalide : {montant}")
+    # NaN et Infinity sont des Decimal valides, mais ni comparables ni arrondis
+    if not valeur.is_finite():
+        raise ValueError(f"Montant invalide : {montant}")
+    if valeur > MONTANT_MAX:
+        raise ValueError(f"Montant trop élevé (au plus {MONTANT_MAX}).")
+    montant = valeur.quantize(CENTIME, rounding=ROUND_HALF_UP)
+    if montant <= 0:
+        raise ValueError("Le montant doit être supérieur à zéro.")
+    return numero_compte, type_transaction, montant, fournisseur, telephone, reference
+
+
+class RapportImport:
+    """Compteurs d'un import ; seules les premières erreurs sont conservées"""
+
+    MAX_ERREURS = 100
+
+    def __init__(self):
+        self.lignes = 0
+        self.reglees = 0
+        self.rejetees = 0
+        self.doublons = 0
+        self.erreurs = []
+        self.debut = time.perf_counter()
+
+    def rejeter(self, numero_ligne, message):
+        self.rejetees += 1
+        if len(self.erreurs) < self.MAX_ERREURS:
+            self.erreurs.append({"ligne": numero_ligne, "detail": message})
+
+    def fusionner(self, autre):
+        """Ajoute les compteurs d'un rapport partiel (un lot)"""
+        self.reglees += autre.reglees
+        self.doublons += autre.doublons
+        self.rejetees += autre.rejetees
+        place = self.MAX_ERREURS - len(self.erreurs)
+        self.erreurs.extend(autre.erreurs[: max(place, 0)])
+
+    def as_dict(self):
+        duree = time.perf_counter() - self.debut
+        return {
+            "lignes": self.lignes,
+            "reglees": self.reglees,
+            "rejetees": self.rejetees,
+            "doublons": self.doublons,
+            "duree": round(duree, 3),
+            "lignes_par_seconde": round(self.lignes / duree, 1) if duree else None,
+            "erreurs": self.erreurs,
+        }
+
+
+def importer_reglements(flux, format_fichier="csv", taille_lot=TAILLE_LOT):
+    """
+    Importe un fichier de règlement Mobile Money ligne par ligne, par lots.
+
+    Chaque lot est validé, puis réglé dans une transaction : les `Transaction`
+    sont créées par `bulk_create` et les soldes mis à jour par `regler_en_lot`.
+    Une ligne refusée (compte inconnu, solde insuffisant) est enregistrée avec
+    le statut « échoué ». Chaque ligne réglée ou échouée est enregistrée par
+    sa référence opérateur (`ReglementImporte`, unique par fournisseur) : une
+    ligne déjà importée, dans ce fichier ou un précédent, est comptée comme
+    doublon et ignorée. Un lot en conflit avec une importation concurrente
+    des mêmes références est annulé puis relu : ces lignes deviennent des
+    doublons. La mémoire utilisée ne dépend que de la taille du lot.
+    """
+    rapport = RapportImport()
+    lot = []
+    for numero_ligne, ligne in enumerate(lire_lignes(flux, format_fichier), start=1):
+        rapport.lignes += 1
+        try:
+            lot.append((numero_ligne, _valider(ligne)))
+        except ValueError as erreur:
+            rapport.rejeter(numero_ligne, str(erreur))
+        if len(lot) >= taille_lot:
+            _regler_lot(lot, rapport)
+            lot = []
+    if lot:
+        _regler_lot(lot, rapport)
+    return rapport
+
+
+def _regler_lot(lot, rapport):
+    for _ in range(2):
+        partiel = RapportImport()
+        try:
+            _regler(lot, partiel)
+        except IntegrityError:
+            # Références enregistrées entre-temps par une importation
+            # concurrente : le lot est annulé, la relecture les écarte
+            continue
+        rapport.fusionner(partiel)
+        return
+    for numero_ligne, _ in lot:
+        rapport.rejeter(numero_ligne, "Conflit avec une importation concurrente.")
+
+
+def _regler(lot, rapport):
+    numeros = {valeurs[0] for _, valeurs in lot}
+    comptes = dict(
+        CompteBancaire.objects.filter(
+            numero_compte__in=numeros, statut="approuve"
+        ).values_list("numero_compte", "pk")
+    )
+    deja_importees = set(
+        ReglementImporte.objects.filter(
+            reference__in={valeurs[5] for _, valeurs in lot}
+        ).values_list("fournisseur", "reference")
+    )
+
+    a_regler = []
+    for numero_ligne, valeurs in lot:
+        cle = (valeurs[3], valeurs[5])
+        if cle in deja_importees:
+            rapport.doublons += 1
+            continue
+        if valeurs[0] not in comptes:
+            rapport.rejeter(numero_ligne, "Compte non trouvé ou non approuvé.")
+            continue
+        a_regler.append((numero_ligne, valeurs))
+        deja_importees.add(cle)
+    if not a_regler:
+        return
+
+    with atomic():
+        transactions = []
+        operations = []
+        for numero_ligne, valeurs in a_regler:
+            (
+                numero_compte,
+                type_transaction,
+                montant,
+                fournisseur,
+                telephone,
+                reference,
+            ) = valeurs
+            compte_id = comptes[numero_compte]
+            frais = calculer_frais(fournisseur, type_transaction, montant)
+            transactions.append(
+                Transaction(
+                    compte_source_id=compte_id,
+                    type=type_transaction,
+                    montant=montant,
+                    status="succès",
+                    commentaire=commentaire_operation(
+                        type_transaction, fournisseur, telephone, montant, frais
+                    ),
+                )
+            )
+            if type_transaction == "retrait":
+                operations.append(
+                    Operation(
+                        numero_ligne,
+                        montant + frais,
+                        source_id=compte_id,
+                        contrepartie=fournisseur,
+                    )
+                )
+            else:
+                operations.append(
+                    Operation(
+                        numero_ligne,
+                        montant - frais,
+                        destination_id=compte_id,
+                        contrepartie=fournisseur,
+                    )
+                )
+
+        transactions = Transaction.objects.bulk_create(transactions)
+        # Une importation concurrente du même fichier échoue ici (IntegrityError),
+        # avant tout règlement
+        ReglementImporte.objects.bulk_create(
+            [
+                ReglementImporte(
+                    fournisseur=valeurs[3],
+                    reference=valeurs[5],
+                    transaction=transaction,
+                )
+                for (_, valeurs), transaction in zip(a_regler, transactions)
+            ]
+        )
+        operations = [
+            operation._replace(transaction=transaction)
+            for operation, transaction in zip(operations, transactions)
+        ]
+        resultats = regler_en_lot(operations)
+
+        echouees = []
+        for operation, transaction in zip(operations, transactions):
+            erreur = resultats[operation.cle]
+            if erreur:
+                transaction.status = "échoué"
+                echouees.append(transaction.pk)
+                rapport.rejeter(operation.cle, erreur)
+            else:
+                rapport.reglees += 1
+        if echouees:
+            Transaction.objects.filter(pk__in=echouees).update(status="échoué")
+        mettre_a_jour_cumuls(
+            ajouter=[etat_transaction(transaction) for transaction in transactions]
+        )
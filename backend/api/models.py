@@ -1,7 +1,48 @@
 import uuid
 
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class UtilisateurQuerySet(models.QuerySet):
+    """
+    Invalide les utilisateurs en cache aussi pour les écritures en masse
+    (`update`, `bulk_update`), qui ne déclenchent pas les signaux.
+    """
+
+    def update(self, **kwargs):
+        ids = list(self.values_list("pk", flat=True))
+        lignes = super().update(**kwargs)
+        _invalider_utilisateurs(ids)
+        return lignes
+
+    def bulk_update(self, objs, *args, **kwargs):
+        objs = list(objs)
+        lignes = super().bulk_update(objs, *args, **kwargs)
+        _invalider_utilisateurs([obj.pk for obj in objs])
+        return lignes
+
+
+def _invalider_utilisateurs(ids):
+    from .authentication import invalider_utilisateur
+    from .verification import invalider_verification
+
+    for pk in ids:
+        invalider_utilisateur(pk)
+    # Le nom et le rôle du propriétaire font partie des données de vérification
+    invalider_verification(
+        list(
+            CompteBancaire.objects.filter(utilisateur__in=ids).values_list(
+                "numero_compte", flat=True
+            )
+        )
+    )
+
+
+class UtilisateurManager(UserManager.from_queryset(UtilisateurQuerySet)):
+    pass
 
 
 class Utilisateur(AbstractUser):
@@ -15,6 +56,8 @@ class Utilisateur(AbstractUser):
     cin = models.ImageField(upload_to="CIN", blank=True, null=True)
     date_inscription = models.DateTimeField(auto_now_add=True)
 
+    objects = UtilisateurManager()
+
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
@@ -24,6 +67,41 @@ class Utilisateur(AbstractUser):
         ordering = ["-date_inscription"]
 
 
+class HorodateQuerySet(models.QuerySet):
+    """
+    Tient `date_modification` à jour aussi pour les écritures en masse
+    (`update`, `bulk_update`), qui ne passent pas par `save()`.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault("date_modification", timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if "date_modification" not in fields:
+            objs = list(objs)
+            maintenant = timezone.now()
+            for obj in objs:
+                obj.date_modification = maintenant
+            fields = [*fields, "date_modification"]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
+HorodateManager = models.Manager.from_queryset(HorodateQuerySet)
+
+
+class CompteBancaireManager(HorodateManager):
+    def bulk_create(self, objs, *args, **kwargs):
+        # Numéros attribués en une seule réservation pour tout le lot
+        from .numerotation import numeros_compte
+
+        objs = list(objs)
+        sans_numero = [compte for compte in objs if not compte.numero_compte]
+        for compte, numero in zip(sans_numero, numeros_compte(len(sans_numero))):
+            compte.numero_compte = numero
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class CompteBancaire(models.Model):
     CHOIX_TYPE = (
         ("courant", "Compte Courant"),
@@ -39,7 +117,7 @@ class CompteBancaire(models.Model):
     utilisateur = models.ForeignKey(
         Utilisateur, on_delete=models.CASCADE, related_name="comptes"
     )
-    numero_compte = models.CharField(max_length=30, unique=True, default=0000)
+    numero_compte = models.CharField(max_length=30, unique=True, blank=True)
     type_compte = models.CharField(max_length=20, choices=CHOIX_TYPE)
     attestation_emploi = models.FileField(
         upload_to="attestations", blank=True, null=True
@@ -49,19 +127,32 @@ class CompteBancaire(models.Model):
     statut = models.CharField(
         max_length=20, choices=STATUT_CHOICES, default="en_attente"
     )
+    # Nombre d'écritures comptables passées sur le compte (numéro de séquence)
+    nb_ecritures = models.PositiveBigIntegerField(default=0, editable=False)
+    # Dernière modification, pour la synchronisation incrémentale
+    date_modification = models.DateTimeField(auto_now=True)
+
+    objects = CompteBancaireManager()
 
     def __str__(self):
         return f"Compte {self.numero_compte} - {self.utilisateur.username}"
 
     def save(self, *args, **kwargs):
-        num_uuid = uuid.uuid4()
-        numero_compte = f"MyBank-{str(num_uuid)[:8]}-{self.utilisateur.id}"
-        self.numero_compte = numero_compte
+        # Le numéro est attribué une seule fois, à la création
+        if not self.numero_compte:
+            from .numerotation import numeros_compte
+
+            self.numero_compte = numeros_compte()[0]
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Compte Bancaire"
         verbose_name_plural = "Comptes Bancaires"
+        indexes = [
+            models.Index(
+                fields=["date_modification", "id"], name="compte_modification_idx"
+            ),
+        ]
 
 
 class Pret(models.Model):
@@ -71,6 +162,10 @@ class Pret(models.Model):
         ("rejeté", "Rejeté"),
         ("en_attente", "En attente"),
     )
+    CHOIX_AMORTISSEMENT = (
+        ("constant", "Annuités constantes"),
+        ("degressif", "Amortissement constant (dégressif)"),
+    )
     compte = models.ForeignKey(
         CompteBancaire, on_delete=models.CASCADE, related_name="prets"
     )
@@ -79,6 +174,20 @@ class Pret(models.Model):
     statut = models.CharField(max_length=20, choices=CHOIX_STATUT, default="en_attente")
     date_demande = models.DateTimeField(auto_now_add=True)
     date_remboursement = models.DateTimeField(null=True, blank=True)
+    # Conditions du prêt ; l'échéancier est calculé par api.amortissement
+    taux_annuel = models.DecimalField(max_digits=6, decimal_places=4, default=0)
+    duree_mois = models.PositiveSmallIntegerField(default=12)
+    type_amortissement = models.CharField(
+        max_length=20, choices=CHOIX_AMORTISSEMENT, default="constant"
+    )
+    date_debut = models.DateField(null=True, blank=True)
+    montant_initial = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    interets_courus = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    date_modification = models.DateTimeField(auto_now=True)
+
+    objects = HorodateManager()
 
     def __str__(self):
         return f"{self.compte.numero_compte} - {self.montant} - {self.get_statut_display()}"
@@ -86,6 +195,11 @@ class Pret(models.Model):
     class Meta:
         verbose_name = "Prêt"
         verbose_name_plural = "Prêts"
+        indexes = [
+            models.Index(
+                fields=["date_modification", "id"], name="pret_modification_idx"
+            ),
+        ]
 
 
 class Transaction(models.Model):
@@ -94,6 +208,8 @@ class Transaction(models.Model):
         ("retrait", "Retrait"),
         ("transfert", "Transfert"),
         ("pret", "Prêt"),
+        # Constat sans mouvement de fonds ni écriture au grand livre
+        ("interets", "Intérêts courus"),
     )
     CHOIX_STATUS = (
         ("succès", "Succès"),
@@ -115,7 +231,12 @@ class Transaction(models.Model):
     montant = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=10, choices=CHOIX_STATUS)
     commentaire = models.TextField(blank=True, null=True)
+    # Limites de vélocité dépassées : le virement attend un administrateur
+    alertes = models.CharField(max_length=255, blank=True, default="")
     date_transaction = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
+
+    objects = HorodateManager()
 
     def __str__(self):
         return f"{self.type} - {self.montant} - {self.date_transaction}"
@@ -123,3 +244,343 @@ class Transaction(models.Model):
     class Meta:
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
+        indexes = [
+            # Index composites pour la pagination par curseur (date, id)
+            models.Index(
+                fields=["-date_transaction", "-id"], name="transaction_date_id_idx"
+            ),
+            models.Index(
+                fields=["compte_source", "-date_transaction", "-id"],
+                name="transaction_source_date_idx",
+            ),
+            models.Index(
+                fields=["compte_destination", "-date_transaction", "-id"],
+                name="transaction_dest_date_idx",
+            ),
+            models.Index(
+                fields=["date_modification", "id"],
+                name="transaction_modification_idx",
+            ),
+        ]
+
+
+class EcritureComptableQuerySet(models.QuerySet):
+    """
+    Écritures en ajout seul : `delete` et `update` en masse, qui ne passent
+    pas par les méthodes du modèle, sont refusés eux aussi.
+    """
+
+    def update(self, **kwargs):
+        raise ValueError("Les écritures comptables ne sont pas modifiables")
+
+    def delete(self):
+        raise ValueError("Les écritures comptables ne sont pas supprimables")
+
+
+class EcritureComptable(models.Model):
+    """
+    Écriture du grand livre, en partie double et en ajout seul.
+
+    Chaque mouvement produit une écriture au débit et une au crédit partageant
+    le même identifiant `mouvement`. Une écriture sans compte représente la
+    contrepartie externe (mobile money, prêt, ouverture...).
+    """
+
+    CHOIX_SENS = (
+        ("debit", "Débit"),
+        ("credit", "Crédit"),
+    )
+
+    mouvement = models.UUIDField(default=uuid.uuid4, db_index=True, editable=False)
+    # PROTECT : un compte ayant un historique comptable ne peut être supprimé
+    compte = models.ForeignKey(
+        CompteBancaire,
+        on_delete=models.PROTECT,
+        related_name="ecritures",
+        blank=True,
+        null=True,
+    )
+    contrepartie = models.CharField(max_length=30, blank=True)
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.SET_NULL,
+        related_name="ecritures",
+        blank=True,
+        null=True,
+    )
+    sens = models.CharField(max_length=6, choices=CHOIX_SENS)
+    montant = models.DecimalField(max_digits=10, decimal_places=2)
+    # Position de l'écriture dans l'historique du compte (1, 2, 3...)
+    sequence = models.PositiveBigIntegerField(blank=True, null=True)
+    date_ecriture = models.DateTimeField(auto_now_add=True)
+
+    objects = EcritureComptableQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.get_sens_display()} - {self.montant} - {self.date_ecriture}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Les écritures comptables ne sont pas modifiables")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Les écritures comptables ne sont pas supprimables")
+
+    class Meta:
+        verbose_name = "Écriture comptable"
+        verbose_name_plural = "Écritures comptables"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["compte", "sequence"], name="ecriture_compte_sequence_uniq"
+            ),
+        ]
+
+
+class SoldeInstantane(models.Model):
+    """Solde d'un compte après sa n-ième écriture, enregistré toutes les N écritures"""
+
+    compte = models.ForeignKey(
+        CompteBancaire, on_delete=models.PROTECT, related_name="soldes_instantanes"
+    )
+    sequence = models.PositiveBigIntegerField()
+    solde = models.DecimalField(max_digits=10, decimal_places=2)
+    date_ecriture = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.compte_id} #{self.sequence} - {self.solde}"
+
+    class Meta:
+        verbose_name = "Solde instantané"
+        verbose_name_plural = "Soldes instantanés"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["compte", "sequence"], name="solde_compte_sequence_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["compte", "date_ecriture"], name="solde_compte_date_idx"
+            ),
+        ]
+
+
+class CleIdempotence(models.Model):
+    """Réponse enregistrée pour un en-tête `Idempotency-Key` d'un utilisateur"""
+
+    utilisateur = models.ForeignKey(
+        Utilisateur, on_delete=models.CASCADE, related_name="cles_idempotence"
+    )
+    cle = models.CharField(max_length=255)
+    chemin = models.CharField(max_length=255)
+    # Empreinte SHA-256 du corps de la requête d'origine
+    empreinte = models.CharField(max_length=64)
+    # Vides tant que la requête d'origine est en cours de traitement
+    code_statut = models.PositiveSmallIntegerField(blank=True, null=True)
+    reponse = models.JSONField(blank=True, null=True, encoder=JSONEncoder)
+    date_creation = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.cle} - {self.utilisateur_id}"
+
+    class Meta:
+        verbose_name = "Clé d'idempotence"
+        verbose_name_plural = "Clés d'idempotence"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["utilisateur", "cle"], name="idempotence_utilisateur_cle_uniq"
+            ),
+        ]
+
+
+class CumulJournalier(models.Model):
+    """
+    Cumul par compte et par jour, tenu à jour à chaque écriture de transaction ou de prêt.
+
+    `categorie` vaut le type de la transaction, ou « pret » pour l'encours
+    des prêts (rattaché au jour de la demande) ; `statut` est le statut de la
+    transaction ou du prêt.
+    """
+
+    compte = models.ForeignKey(
+        CompteBancaire, on_delete=models.CASCADE, related_name="cumuls"
+    )
+    jour = models.DateField()
+    categorie = models.CharField(max_length=20)
+    statut = models.CharField(max_length=20)
+    nombre = models.IntegerField(default=0)
+    montant = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.compte_id} {self.jour} {self.categorie}/{self.statut}"
+
+    class Meta:
+        verbose_name = "Cumul journalier"
+        verbose_name_plural = "Cumuls journaliers"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["compte", "jour", "categorie", "statut"],
+                name="cumul_compte_jour_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["jour"], name="cumul_jour_idx"),
+            models.Index(fields=["categorie", "statut"], name="cumul_categorie_idx"),
+        ]
+
+
+class CompteurNumero(models.Model):
+    """Compteur nommé, réservé par blocs par `api.numerotation`"""
+
+    nom = models.CharField(max_length=50, primary_key=True)
+    valeur = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compteur de numérotation"
+        verbose_name_plural = "Compteurs de numérotation"
+
+
+class Echeance(models.Model):
+    """Échéance d'un prêt ; les montants sont recalculés par api.amortissement"""
+
+    pret = models.ForeignKey(Pret, on_delete=models.CASCADE, related_name="echeances")
+    numero = models.PositiveSmallIntegerField()
+    date_echeance = models.DateField()
+    capital = models.DecimalField(max_digits=12, decimal_places=2)
+    interets = models.DecimalField(max_digits=12, decimal_places=2)
+    restant_du = models.DecimalField(max_digits=12, decimal_places=2)
+    # Échéance passée alors que le capital restant dû dépasse celui prévu
+    en_retard = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "Échéance"
+        verbose_name_plural = "Échéances"
+        ordering = ["pret", "numero"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["pret", "numero"], name="echeance_pret_numero_uniq"
+            )
+        ]
+
+
+class ReglementImporte(models.Model):
+    """Ligne d'un fichier de règlement Mobile Money déjà importée, par référence opérateur"""
+
+    fournisseur = models.CharField(max_length=30)
+    reference = models.CharField(max_length=100)
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.CASCADE, related_name="reglement_importe"
+    )
+    date_import = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.fournisseur} {self.reference}"
+
+    class Meta:
+        verbose_name = "Règlement importé"
+        verbose_name_plural = "Règlements importés"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fournisseur", "reference"], name="reglement_reference_uniq"
+            )
+        ]
+
+
+class LotTraite(models.Model):
+    """Lot d'un traitement par plages de clés primaires déjà effectué (point de reprise)"""
+
+    tache = models.CharField(max_length=50)
+    date_reference = models.DateField()
+    debut = models.PositiveBigIntegerField()
+    date_traitement = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Lot traité"
+        verbose_name_plural = "Lots traités"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tache", "date_reference", "debut"], name="lot_traite_uniq"
+            )
+        ]
+
+
+class Tache(models.Model):
+    """Travail différé exécuté par `runworker` (voir api.taches)"""
+
+    CHOIX_STATUT = (
+        ("en_attente", "En attente"),
+        ("en_cours", "En cours"),
+        ("terminee", "Terminée"),
+        ("echouee", "Échouée"),
+    )
+
+    nom = models.CharField(max_length=50)
+    arguments = models.JSONField(default=dict, encoder=JSONEncoder)
+    statut = models.CharField(max_length=20, choices=CHOIX_STATUT, default="en_attente")
+    # Demandeur, seul autorisé (avec les administrateurs) à suivre la tâche
+    utilisateur = models.ForeignKey(
+        Utilisateur,
+        on_delete=models.CASCADE,
+        related_name="taches",
+        blank=True,
+        null=True,
+    )
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    max_tentatives = models.PositiveSmallIntegerField(default=5)
+    # Pas d'exécution avant cette date (reprise après échec)
+    disponible_le = models.DateTimeField(default=timezone.now)
+    # Travailleur ayant réclamé la tâche, et dernier renouvellement de sa
+    # réservation (voir api.taches.renouveler)
+    reclamee_par = models.CharField(max_length=100, blank=True)
+    reclamee_le = models.DateTimeField(blank=True, null=True)
+    resultat = models.JSONField(blank=True, null=True, encoder=JSONEncoder)
+    erreur = models.TextField(blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_fin = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.nom} #{self.pk} - {self.get_statut_display()}"
+
+    class Meta:
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+        indexes = [
+            # Réclamation : prochaines tâches en attente, par date de disponibilité
+            models.Index(
+                fields=["statut", "disponible_le", "id"], name="tache_reclamation_idx"
+            ),
+        ]
+
+
+class CompteSupprime(models.Model):
+    """Trace d'un compte supprimé, pour la synchronisation incrémentale"""
+
+    compte_id = models.PositiveBigIntegerField()
+    # Sans clé étrangère : la trace survit à la suppression du propriétaire
+    utilisateur_id = models.PositiveBigIntegerField(db_index=True)
+    date_suppression = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.compte_id} - {self.date_suppression}"
+
+    class Meta:
+        verbose_name = "Compte supprimé"
+        verbose_name_plural = "Comptes supprimés"
+
+
+class TransactionSupprimee(models.Model):
+    """
+    Trace d'une transaction supprimée avec le compte d'un autre utilisateur,
+    pour la synchronisation incrémentale de l'autre participant
+    """
+
+    transaction_id = models.PositiveBigIntegerField()
+    utilisateur_id = models.PositiveBigIntegerField(db_index=True)
+    date_suppression = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.transaction_id} - {self.date_suppression}"
+
+    class Meta:
+        verbose_name = "Transaction supprimée"
+        verbose_name_plural = "Transactions supprimées"
@@ -0,0 +1,100 @@
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, router
+from django.db.models import F
+from django.db.transaction import atomic, get_connection, on_commit
+
+from .models import CompteurNumero
+
+PREFIXE = "MyBank-"
+CHIFFRES = 10
+
+
+def chiffre_controle(nombre):
+    """Chiffre de contrôle de Luhn : détecte toute faute de frappe sur un chiffre"""
+    total = 0
+    for rang, chiffre in enumerate(reversed(str(nombre))):
+        valeur = int(chiffre)
+        if rang % 2 == 0:
+            valeur *= 2
+            if valeur > 9:
+                valeur -= 9
+        total += valeur
+    return (10 - total % 10) % 10
+
+
+def formater(nombre):
+    # Largeur fixe : l'ordre alphabétique des numéros suit l'ordre d'attribution
+    return f"{PREFIXE}{nombre:0{CHIFFRES}d}{chiffre_controle(nombre)}"
+
+
+def _reserver(nom, taille, using):
+    """Réserve `taille` valeurs du compteur et retourne la première"""
+    compteurs = CompteurNumero.objects.using(using).filter(nom=nom)
+    with atomic(using=using):
+        if not compteurs.update(valeur=F("valeur") + taille):
+            try:
+                with atomic(using=using):
+                    CompteurNumero.objects.using(using).create(nom=nom, valeur=taille)
+            except IntegrityError:
+                # Compteur créé entre-temps par un autre processus
+                compteurs.update(valeur=F("valeur") + taille)
+        fin = compteurs.values_list("valeur", flat=True).get()
+    return fin - taille + 1
+
+
+class AllocateurNumeros:
+    """
+    Attribue des numéros croissants par blocs réservés dans `CompteurNumero`.
+
+    Un bloc de `taille_bloc` valeurs est réservé en une requête UPDATE, puis
+    consommé en mémoire : une attribution ne touche la base qu'une fois par
+    bloc, sans boucle de réessai. Si la réservation a lieu dans une
+    transaction, le reste du bloc n'est conservé qu'après le commit ; en cas
+    de rollback, l'incrément du compteur est annulé et le bloc ne doit pas
+    resservir. Les numéros laissés inutilisés créent des trous, jamais des
+    doublons.
+    """
+
+    def __init__(self, nom, taille_bloc=100):
+        self.nom = nom
+        self.taille_bloc = taille_bloc
+        self._prochain = 0
+        self._fin = 0
+        self._verrou = threading.Lock()
+
+    def allouer(self, nombre=1):
+        with self._verrou:
+            pris = min(nombre, self._fin - self._prochain)
+            numeros = list(range(self._prochain, self._prochain + pris))
+            self._prochain += pris
+
+        manque = nombre - len(numeros)
+        if manque:
+            using = router.db_for_write(CompteurNumero)
+            taille = max(manque, self.taille_bloc)
+            debut = _reserver(self.nom, taille, using)
+            numeros += range(debut, debut + manque)
+            if manque < taille:
+                reste = (debut + manque, debut + taille)
+                if get_connection(using).in_atomic_block:
+                    on_commit(lambda: self._conserver(*reste), using=using)
+                else:
+                    self._conserver(*reste)
+        return numeros
+
+    def _conserver(self, debut, fin):
+        with self._verrou:
+            if self._prochain >= self._fin:
+                self._prochain, self._fin = debut, fin
+
+
+allocateur_comptes = AllocateurNumeros(
+    "numero_compte", getattr(settings, "ACCOUNT_NUMBER_BLOCK_SIZE", 100)
+)
+
+
+def numeros_compte(nombre=1):
+    """Nouveaux numéros de compte, avec chiffre de contrôle"""
+    return [formater(valeur) for valeur in allocateur_comptes.allouer(nombre)]
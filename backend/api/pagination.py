@@ -0,0 +1,134 @@
+import base64
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TransactionCursorPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur le couple (date_transaction, id).
+
+    La position est encodée dans le curseur, ce qui permet de filtrer avec
+    `WHERE (date_transaction, id) < (d, i)` au lieu d'un OFFSET : une page
+    profonde coûte autant que la première grâce aux index composites.
+
+    Le mode est optionnel : sans paramètre `cursor` ni `page_size`, la liste
+    complète est renvoyée comme auparavant.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 500
+    invalid_cursor_message = "Curseur invalide"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.preparer(queryset, request)
+        if queryset is None:
+            return None
+        return self.conserver(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request):
+        """Variante de `paginate_queryset` pour les vues asynchrones"""
+        queryset = self.preparer(queryset, request)
+        if queryset is None:
+            return None
+        return self.conserver([instance async for instance in queryset])
+
+    def preparer(self, queryset, request):
+        params = request.query_params
+        if (
+            self.cursor_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(params.get(self.cursor_query_param))
+        queryset = queryset.order_by("-date_transaction", "-id")
+        if position is not None:
+            date_transaction, pk = position
+            queryset = queryset.filter(
+                Q(date_transaction__lt=date_transaction)
+                | Q(date_transaction=date_transaction, id__lt=pk)
+            )
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        return queryset[: self.page_size + 1]
+
+    def conserver(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+            date_str, pk = raw.rsplit("|", 1)
+            date_transaction = parse_datetime(date_str)
+            pk = int(pk)
+        except (ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if date_transaction is None:
+            raise NotFound(self.invalid_cursor_message)
+        return date_transaction, pk
+
+    def position(self, element):
+        """(date_transaction, id) d'une transaction ou d'une ligne de `values()`"""
+        if isinstance(element, dict):
+            return element["date_transaction"], element["id"]
+        return element.date_transaction, element.pk
+
+    def encode_cursor(self, element):
+        date_transaction, pk = self.position(element)
+        raw = f"{date_transaction.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(
+            self.base_url, self.page_size_query_param, self.page_size
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
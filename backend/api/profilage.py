@@ -0,0 +1,267 @@
+import math
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+
+class Histogramme:
+    """
+    Histogramme à seaux logarithmiques fixes, dans l'esprit de HdrHistogram.
+
+    Chaque puissance de deux est découpée en `sous_seaux` seaux de même
+    largeur relative : l'index d'une valeur se calcule en temps constant avec
+    `math.frexp`, sans recherche ni allocation. Les valeurs hors bornes sont
+    comptées dans le premier ou le dernier seau.
+    """
+
+    def __init__(self, exposant_min, exposant_max, sous_seaux=2):
+        self.exposant_min = exposant_min
+        self.sous_seaux = sous_seaux
+        self.bornes = [
+            2.0 ** (exposant + i / sous_seaux)
+            for exposant in range(exposant_min, exposant_max)
+            for i in range(1, sous_seaux + 1)
+        ]
+        self.comptes = [0] * (len(self.bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def index(self, valeur):
+        if valeur <= 0:
+            return 0
+        mantisse, exposant = math.frexp(valeur)  # valeur = mantisse * 2**exposant
+        # log2(2 * mantisse) ∈ [0, 1[ donne le sous-seau dans l'octave
+        sous_seau = math.ceil(math.log2(2 * mantisse) * self.sous_seaux)
+        index = (exposant - 1 - self.exposant_min) * self.sous_seaux + sous_seau - 1
+        return min(max(index, 0), len(self.bornes))
+
+    def enregistrer(self, valeur):
+        self.comptes[self.index(valeur)] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+
+class Mesures:
+    """Temps de réponse, requêtes SQL, temps SQL et connexions d'un endpoint"""
+
+    def __init__(self):
+        self.duree = Histogramme(-14, 6)  # de 61 µs à 64 s
+        self.requetes_sql = Histogramme(-1, 10, sous_seaux=1)  # de 1 à 1024
+        self.duree_sql = Histogramme(-14, 6)
+        self.connexions = Histogramme(-1, 3, sous_seaux=1)  # de 1 à 8
+
+
+class Registre:
+    """Mesures par nom d'URL, protégées par un verrou unique"""
+
+    def __init__(self):
+        self._mesures = {}
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, nom, methode, duree, requetes_sql, duree_sql, connexions):
+        with self._verrou:
+            mesures = self._mesures.get((nom, methode))
+            if mesures is None:
+                mesures = self._mesures[(nom, methode)] = Mesures()
+            mesures.duree.enregistrer(duree)
+            mesures.requetes_sql.enregistrer(requetes_sql)
+            mesures.duree_sql.enregistrer(duree_sql)
+            mesures.connexions.enregistrer(connexions)
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._mesures.clear()
+
+    def exposition(self):
+        """Rend les histogrammes au format texte de Prometheus"""
+        metriques = [
+            ("api_request_duration_seconds", "duree", "Durée des requêtes HTTP."),
+            (
+                "api_request_db_queries",
+                "requetes_sql",
+                "Nombre de requêtes SQL par requête HTTP.",
+            ),
+            (
+                "api_request_db_duration_seconds",
+                "duree_sql",
+                "Temps passé en base par requête HTTP.",
+            ),
+            (
+                "api_request_db_connections",
+                "connexions",
+                "Connexions ouvertes ou empruntées au pool par requête HTTP.",
+            ),
+        ]
+        with self._verrou:
+            instantane = [
+                (nom, methode, mesures)
+                for (nom, methode), mesures in sorted(self._mesures.items())
+            ]
+            lignes = []
+            for metrique, attribut, aide in metriques:
+                lignes.append(f"# HELP {metrique} {aide}")
+                lignes.append(f"# TYPE {metrique} histogram")
+                for nom, methode, mesures in instantane:
+                    histogramme = getattr(mesures, attribut)
+                    etiquettes = f'url_name="{nom}",method="{methode}"'
+                    cumul = 0
+                    for borne, compte in zip(histogramme.bornes, histogramme.comptes):
+                        cumul += compte
+                        lignes.append(
+                            f'{metrique}_bucket{{{etiquettes},le="{borne:.6g}"}} {cumul}'
+                        )
+                    lignes.append(
+                        f'{metrique}_bucket{{{etiquettes},le="+Inf"}} {histogramme.nombre}'
+                    )
+                    lignes.append(
+                        f"{metrique}_sum{{{etiquettes}}} {histogramme.somme:.6f}"
+                    )
+                    lignes.append(
+                        f"{metrique}_count{{{etiquettes}}} {histogramme.nombre}"
+                    )
+        return "\n".join(lignes) + "\n"
+
+
+registre = Registre()
+
+# Statistiques instantanées des pools psycopg ; les autres sont cumulées
+JAUGES_POOL = {
+    "pool_min",
+    "pool_max",
+    "pool_size",
+    "pool_available",
+    "requests_waiting",
+}
+
+
+def exposition_pools():
+    """Statistiques des pools de connexions psycopg 3 au format texte de Prometheus"""
+    statistiques = {}
+    for connection in connections.all():
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            for cle, valeur in pool.get_stats().items():
+                statistiques.setdefault(cle, []).append((connection.alias, valeur))
+
+    lignes = []
+    for cle, valeurs in sorted(statistiques.items()):
+        if cle in JAUGES_POOL:
+            metrique, type_metrique = f"api_db_pool_{cle}", "gauge"
+        else:
+            metrique, type_metrique = f"api_db_pool_{cle}_total", "counter"
+        lignes.append(f"# HELP {metrique} Statistique {cle} du pool psycopg.")
+        lignes.append(f"# TYPE {metrique} {type_metrique}")
+        for alias, valeur in valeurs:
+            lignes.append(f'{metrique}{{database="{alias}"}} {valeur}')
+    return "\n".join(lignes) + "\n" if lignes else ""
+
+
+class CompteurSQL:
+    """`execute_wrapper` qui compte les requêtes SQL et leur durée"""
+
+    def __init__(self):
+        self.requetes = 0
+        self.duree = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree += time.perf_counter() - debut
+            self.requetes += 1
+
+
+class Mesure:
+    """
+    Requêtes SQL, temps SQL et connexions acquises sur les connexions du
+    thread qui appelle `commencer` puis `terminer`.
+    """
+
+    def __init__(self):
+        self.compteur = CompteurSQL()
+        self.connexions = 0
+        self._pile = ExitStack()
+        self._fermees = []
+
+    def commencer(self):
+        # Une connexion persistante déjà ouverte n'est pas une acquisition
+        self._fermees = [
+            connection
+            for connection in connections.all()
+            if connection.connection is None
+        ]
+        for connection in connections.all():
+            self._pile.enter_context(connection.execute_wrapper(self.compteur))
+
+    def terminer(self):
+        self._pile.close()
+        self.connexions = sum(
+            1 for connection in self._fermees if connection.connection is not None
+        )
+
+
+@sync_and_async_middleware
+class ProfilageMiddleware:
+    """
+    Mesure la durée, le nombre de requêtes SQL, le temps SQL et le nombre de
+    connexions acquises (ouvertes ou empruntées au pool) de chaque requête.
+
+    Activé par le réglage `PROFILING_ENABLED`. Les mesures sont agrégées par
+    nom d'URL et méthode HTTP dans des histogrammes en mémoire (propres à
+    chaque processus), exposés par l'endpoint `metrics/`. Les requêtes qui ne
+    correspondent à aucune URL nommée ne sont pas mesurées.
+
+    Sous ASGI, les vues asynchrones restent asynchrones : les compteurs SQL
+    sont posés sur le thread où l'ORM asynchrone exécute les requêtes de la
+    requête HTTP (`sync_to_async` avec `thread_sensitive`).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mesure = Mesure()
+        debut = time.perf_counter()
+        mesure.commencer()
+        try:
+            response = self.get_response(request)
+        finally:
+            mesure.terminer()
+        self.enregistrer(request, time.perf_counter() - debut, mesure)
+        return response
+
+    async def __acall__(self, request):
+        mesure = Mesure()
+        debut = time.perf_counter()
+        await sync_to_async(mesure.commencer)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(mesure.terminer)()
+        self.enregistrer(request, time.perf_counter() - debut, mesure)
+        return response
+
+    def enregistrer(self, request, duree, mesure):
+        resolver_match = getattr(request, "resolver_match", None)
+        if resolver_match is not None and resolver_match.url_name:
+            registre.enregistrer(
+                resolver_match.url_name,
+                request.method,
+                duree,
+                mesure.compteur.requetes,
+                mesure.compteur.duree,
+                mesure.connexions,
+            )
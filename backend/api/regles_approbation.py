@@ -0,0 +1,160 @@
+import operator
+import threading
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Pret
+
+# Décisions possibles d'une règle ; sans règle satisfaite, l'opération
+# attend un administrateur
+DECISIONS = ("approuve", "rejete")
+
+# Prêts comptés dans l'encours d'un utilisateur
+STATUTS_ENCOURS = ("en_cours", "en_attente")
+
+
+class Contexte(NamedTuple):
+    """Grandeurs évaluées par les règles pour un virement ou un prêt"""
+
+    montant: Decimal
+    anciennete_jours: float  # depuis l'ouverture du compte
+    role: str
+    encours: Decimal  # prêts en cours ou en attente de l'utilisateur
+
+
+class Regle(NamedTuple):
+    nom: str
+    decision: str
+    predicat: object
+    utilise_encours: bool
+
+
+# Conditions : <grandeur>_min, <grandeur>_max, ou roles (liste de rôles)
+OPERATEURS = {"min": operator.ge, "max": operator.le}
+
+
+def _condition(cle, valeur):
+    if cle == "roles":
+        roles = frozenset(valeur)
+        return lambda contexte: contexte.role in roles
+    grandeur, _, suffixe = cle.rpartition("_")
+    if grandeur not in Contexte._fields or suffixe not in OPERATEURS:
+        raise ImproperlyConfigured(f"Condition d'approbation inconnue : {cle}")
+    comparer, index = OPERATEURS[suffixe], Contexte._fields.index(grandeur)
+    if grandeur != "anciennete_jours":
+        valeur = Decimal(valeur)
+    return lambda contexte: comparer(contexte[index], valeur)
+
+
+def _conjonction(predicats):
+    if len(predicats) == 1:
+        return predicats[0]
+    return lambda contexte: all(predicat(contexte) for predicat in predicats)
+
+
+def compiler(nom, decision, conditions):
+    """Règle déclarative -> prédicat sur un `Contexte`"""
+    if decision not in DECISIONS:
+        raise ImproperlyConfigured(
+            f"Décision inconnue pour la règle {nom} : {decision}"
+        )
+    predicat = _conjonction(
+        [_condition(cle, valeur) for cle, valeur in conditions.items()]
+    )
+    utilise_encours = any(cle.startswith("encours_") for cle in conditions)
+    return Regle(nom, decision, predicat, utilise_encours)
+
+
+class MoteurRegles:
+    """
+    Règles d'approbation automatique des virements et des prêts.
+
+    Les règles de chaque type d'opération sont compilées une fois puis
+    évaluées dans l'ordre : la première satisfaite décide. L'encours de
+    l'utilisateur n'est lu en base que si une règle du type en dépend.
+    """
+
+    def __init__(self, regles):
+        self.regles = {
+            objet: [compiler(*regle) for regle in liste]
+            for objet, liste in regles.items()
+        }
+        self.decisions = {}
+        self._verrou = threading.Lock()
+
+    def utilise_encours(self, objet):
+        return any(regle.utilise_encours for regle in self.regles.get(objet, ()))
+
+    def decider(self, objet, contexte):
+        """(décision, nom de la règle), ou (None, None) pour une approbation manuelle"""
+        for regle in self.regles.get(objet, ()):
+            if regle.predicat(contexte):
+                return regle.decision, regle.nom
+        return None, None
+
+    def evaluer(self, objet, compte, montant):
+        """
+        Décide pour une opération de `montant` sur `compte`, avant son
+        enregistrement : l'encours d'une demande de prêt inclut son montant.
+        """
+        encours = Decimal("0")
+        if self.utilise_encours(objet):
+            encours = encours_utilisateur(compte.utilisateur_id)
+            if objet == "pret":
+                encours += montant
+        contexte = Contexte(
+            Decimal(montant),
+            (timezone.now() - compte.date_ouverture).total_seconds() / 86400,
+            compte.utilisateur.role,
+            encours,
+        )
+        decision, nom = self.decider(objet, contexte)
+        with self._verrou:
+            cle = (objet, decision or "manuel")
+            self.decisions[cle] = self.decisions.get(cle, 0) + 1
+        return decision, nom
+
+    def exposition(self):
+        """Décisions des règles au format texte de Prometheus"""
+        lignes = [
+            "# HELP api_approval_rules_decisions_total Opérations décidées par les règles.",
+            "# TYPE api_approval_rules_decisions_total counter",
+        ]
+        for (objet, decision), nombre in sorted(self.decisions.items()):
+            lignes.append(
+                "api_approval_rules_decisions_total"
+                f'{{objet="{objet}",decision="{decision}"}} {nombre}'
+            )
+        return "\n".join(lignes) + "\n"
+
+
+def encours_utilisateur(utilisateur_id):
+    return Pret.objects.filter(
+        compte__utilisateur_id=utilisateur_id, statut__in=STATUTS_ENCOURS
+    ).aggregate(total=Sum("montant"))["total"] or Decimal("0")
+
+
+_moteur = None
+_verrou_moteur = threading.Lock()
+
+
+def moteur_regles():
+    """Moteur du processus, compilé depuis `APPROVAL_RULES` au premier appel"""
+    global _moteur
+    if _moteur is None:
+        with _verrou_moteur:
+            if _moteur is None:
+                _moteur = MoteurRegles(getattr(settings, "APPROVAL_RULES", {}))
+    return _moteur
+
+
+def reinitialiser():
+    """Oublie le moteur courant (réglages modifiés, tests)"""
+    global _moteur
+    with _verrou_moteur:
+        _moteur = None
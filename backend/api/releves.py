@@ -0,0 +1,125 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework.utils.encoders import JSONEncoder
+
+from .grand_livre import ZERO, solde_a_date
+from .models import EcritureComptable
+
+# Nombre de lignes lues par aller-retour du curseur côté serveur
+TAILLE_CHUNK = 2000
+# Nombre de lignes envoyées à la fois par le flux asynchrone (ASGI)
+LIGNES_PAR_ENVOI = 500
+
+COLONNES = [
+    "date",
+    "sequence",
+    "transaction",
+    "type",
+    "sens",
+    "montant",
+    "solde",
+    "contrepartie",
+    "commentaire",
+]
+
+
+def lignes_releve(compte_id, debut=None, fin=None):
+    """
+    Itère sur les lignes du relevé d'un compte, de la plus ancienne à la plus récente.
+
+    Les lignes viennent des écritures du grand livre, lues par un curseur côté
+    serveur (`iterator`), ce qui garde la mémoire constante. Le solde courant
+    part du solde à la date `debut` et est mis à jour à chaque ligne.
+    """
+    solde = solde_a_date(compte_id, debut) if debut else ZERO
+
+    ecritures = EcritureComptable.objects.filter(compte_id=compte_id)
+    if debut:
+        ecritures = ecritures.filter(date_ecriture__gt=debut)
+    if fin:
+        ecritures = ecritures.filter(date_ecriture__lte=fin)
+    # Autre jambe du mouvement : numéro du compte ou nom de la contrepartie externe
+    contrepartie = (
+        EcritureComptable.objects.filter(mouvement=OuterRef("mouvement"))
+        .exclude(pk=OuterRef("pk"))
+        .annotate(nom=Coalesce("compte__numero_compte", "contrepartie"))
+        .values("nom")[:1]
+    )
+    ecritures = (
+        ecritures.annotate(nom_contrepartie=Subquery(contrepartie))
+        .order_by("sequence")
+        .values_list(
+            "date_ecriture",
+            "sequence",
+            "transaction_id",
+            "transaction__type",
+            "sens",
+            "montant",
+            "nom_contrepartie",
+            "transaction__commentaire",
+        )
+    )
+
+    for (
+        date,
+        sequence,
+        transaction_id,
+        type_transaction,
+        sens,
+        montant,
+        nom_contrepartie,
+        commentaire,
+    ) in ecritures.iterator(chunk_size=TAILLE_CHUNK):
+        solde = solde + montant if sens == "credit" else solde - montant
+        yield {
+            "date": date,
+            "sequence": sequence,
+            "transaction": transaction_id,
+            "type": type_transaction or "",
+            "sens": sens,
+            "montant": montant,
+            "solde": solde,
+            "contrepartie": nom_contrepartie or "",
+            "commentaire": commentaire or "",
+        }
+
+
+class _Tampon:
+    """Pseudo-fichier dont `write` renvoie la ligne au lieu de la stocker"""
+
+    def write(self, valeur):
+        return valeur
+
+
+def flux_csv(lignes):
+    writer = csv.DictWriter(_Tampon(), fieldnames=COLONNES)
+    yield writer.writeheader()
+    for ligne in lignes:
+        ligne["date"] = ligne["date"].isoformat()
+        yield writer.writerow(ligne)
+
+
+def flux_jsonl(lignes):
+    for ligne in lignes:
+        # Montants en chaînes, comme dans les réponses de l'API
+        ligne["montant"] = str(ligne["montant"])
+        ligne["solde"] = str(ligne["solde"])
+        yield json.dumps(ligne, cls=JSONEncoder, ensure_ascii=False) + "\n"
+
+
+async def flux_asynchrone(flux):
+    """
+    Adapte un flux synchrone pour un StreamingHttpResponse servi sous ASGI.
+
+    Sous ASGI, Django consomme un itérateur synchrone en entier avant d'envoyer
+    le premier octet. Les lignes sont ici lues par paquets dans le thread de la
+    requête (`thread_sensitive`), qui garde la connexion et le curseur serveur.
+    """
+    lire = sync_to_async(lambda: list(islice(flux, LIGNES_PAR_ENVOI)))
+    while paquet := await lire():
+        yield "".join(paquet)
@@ -0,0 +1,141 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+from .caches import construire_cache
+
+# Réplica choisi pour les lectures du contexte courant (requête, tâche...)
+_replica = ContextVar("replica", default=None)
+
+# Utilisateurs ayant écrit récemment : leurs lectures restent sur le primaire
+ecritures_recentes = construire_cache(
+    "ecritures_recentes",
+    alias=getattr(settings, "REPLICA_STICKINESS_CACHE_ALIAS", "default"),
+    ttl=getattr(settings, "REPLICA_STICKINESS_SECONDS", 10),
+)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def marquer_ecriture(utilisateur):
+    """Lit sur le primaire pendant `REPLICA_STICKINESS_SECONDS` après une écriture"""
+    if utilisateur is not None and utilisateur.is_authenticated:
+        ecritures_recentes.set(str(utilisateur.pk), True)
+
+
+def choisir_replica(utilisateur=None):
+    """
+    Réplica tiré au hasard, ou None pour lire sur le primaire.
+
+    Le primaire est choisi si aucun réplica n'est configuré, si le cache des
+    écritures récentes n'est pas partagé entre processus (`cache_partage`),
+    ou si `utilisateur` a écrit trop récemment pour que les réplicas l'aient
+    rattrapé (lecture de ses propres écritures). Sans cache partagé, une
+    écriture servie par un processus ne serait pas vue des autres, qui
+    pourraient lire sur un réplica en retard.
+    """
+    if not replicas() or not ecritures_recentes.partage:
+        return None
+    if (
+        utilisateur is not None
+        and utilisateur.is_authenticated
+        and ecritures_recentes.get(str(utilisateur.pk))
+    ):
+        return None
+    return random.choice(replicas())
+
+
+@contextmanager
+def lecture_replica(utilisateur=None):
+    """Envoie les lectures du bloc vers le réplica de `choisir_replica`"""
+    alias = choisir_replica(utilisateur)
+    jeton = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(jeton)
+
+
+class RouteurReplicas:
+    """
+    Routeur des lectures vers les réplicas, sur activation explicite.
+
+    Les lectures vont au réplica choisi par `lecture_replica`, sauf dans une
+    transaction ouverte sur le primaire, qui doit voir ses propres écritures.
+    Les écritures et les migrations restent sur le primaire.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Toutes les bases contiennent les mêmes données
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
+
+
+class LectureReplicaMixin:
+    """
+    Vue DRF dont les requêtes en lecture (GET, HEAD, OPTIONS) sont servies par
+    un réplica, hors fenêtre de lecture de ses propres écritures.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Après authentification : le choix dépend des écritures de l'utilisateur
+        if request.method in SAFE_METHODS:
+            self._jeton_replica = _replica.set(choisir_replica(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        jeton = getattr(self, "_jeton_replica", None)
+        if jeton is not None:
+            self._jeton_replica = None
+            _replica.reset(jeton)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+@sync_and_async_middleware
+class EcritureCollanteMiddleware:
+    """
+    Marque l'auteur de toute requête d'écriture (POST, PUT, PATCH, DELETE)
+    pour que ses lectures suivantes restent sur le primaire.
+
+    DRF reporte l'utilisateur authentifié par JWT sur la requête Django, qui
+    est donc connu au retour de la vue. Sous ASGI, les vues asynchrones
+    restent asynchrones : seul le marquage passe par `sync_to_async`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            marquer_ecriture(getattr(request, "user", None))
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            await sync_to_async(marquer_ecriture)(getattr(request, "user", None))
+        return response
@@ -0,0 +1,243 @@
+import decimal
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.http import HttpResponse
+from rest_framework import fields, relations
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import ISO_8601, api_settings
+
+try:
+    import orjson
+except ImportError:  # repli sur l'encodeur C du module json
+    orjson = None
+
+
+class NonSupporte(Exception):
+    """Champ sans conversion rapide équivalente : la vue garde le serializer DRF"""
+
+
+def _iso(valeur):
+    # Comme DateTimeField et le JSONEncoder de DRF : UTC noté « Z »
+    texte = valeur.isoformat()
+    if texte.endswith("+00:00"):
+        return texte[:-6] + "Z"
+    return texte
+
+
+def _date_heure(champ):
+    if getattr(champ, "format", api_settings.DATETIME_FORMAT).lower() != ISO_8601:
+        raise NonSupporte
+    fuseau = champ.timezone if hasattr(champ, "timezone") else champ.default_timezone()
+    if fuseau is None:
+        raise NonSupporte
+    return lambda valeur: _iso(valeur.astimezone(fuseau))
+
+
+def _date(champ):
+    if getattr(champ, "format", api_settings.DATE_FORMAT).lower() != ISO_8601:
+        raise NonSupporte
+    return lambda valeur: valeur.isoformat()
+
+
+def _decimal(champ):
+    if (
+        champ.localize
+        or champ.normalize_output
+        or champ.decimal_places is None
+        or not getattr(champ, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    ):
+        raise NonSupporte
+    quantum = decimal.Decimal(".1") ** champ.decimal_places
+    contexte = decimal.getcontext().copy()
+    if champ.max_digits is not None:
+        contexte.prec = champ.max_digits
+    rounding = champ.rounding
+    return lambda valeur: format(
+        valeur.quantize(quantum, rounding=rounding, context=contexte), "f"
+    )
+
+
+def _fichier(champ, champ_modele):
+    if not getattr(champ, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+        return None
+    request = champ.context.get("request")
+    stockage = champ_modele.storage
+    if request is None:
+        return lambda nom: stockage.url(nom) if nom else None
+    return lambda nom: request.build_absolute_uri(stockage.url(nom)) if nom else None
+
+
+def _lecture_seule(champ_modele):
+    # ReadOnlyField : la valeur brute passe par le JSONEncoder de DRF
+    if isinstance(champ_modele, models.DateTimeField):
+        return _iso
+    if isinstance(champ_modele, models.DateField):
+        return lambda valeur: valeur.isoformat()
+    if isinstance(champ_modele, (models.DecimalField, models.TimeField)):
+        raise NonSupporte
+    return None
+
+
+def _chemin(modele, attributs):
+    """
+    Champ de modèle au bout de `attributs`, et colonnes des relations
+    nullables traversées : si l'une est nulle, DRF omet le champ.
+    """
+    gardes = []
+    champ_modele = None
+    for position, attribut in enumerate(attributs):
+        if modele is None:
+            raise NonSupporte
+        try:
+            champ_modele = modele._meta.get_field(attribut)
+        except FieldDoesNotExist:
+            raise NonSupporte
+        if not champ_modele.concrete:
+            raise NonSupporte
+        modele = champ_modele.related_model
+        if modele is not None and position < len(attributs) - 1:
+            if champ_modele.null:
+                gardes.append("__".join(attributs[: position + 1]))
+    return champ_modele, gardes
+
+
+class Plan:
+    """
+    Conversion précompilée d'un serializer en lecture seule.
+
+    `colonnes` sont les champs à demander à `values()` ; `conversions` donne,
+    pour chaque champ lisible du serializer et dans son ordre : le nom de
+    sortie, la colonne, la fonction de conversion (None si la valeur est déjà
+    une primitive JSON) et les colonnes de garde.
+    """
+
+    def __init__(self, serializer):
+        modele = serializer.Meta.model
+        self.conversions = []
+        colonnes = {}
+        for nom, champ in serializer.fields.items():
+            if champ.write_only:
+                continue
+            if not champ.source_attrs:
+                raise NonSupporte  # source="*"
+            champ_modele, gardes = _chemin(modele, champ.source_attrs)
+            if champ_modele.is_relation and not isinstance(
+                champ, relations.PrimaryKeyRelatedField
+            ):
+                raise NonSupporte  # values() donnerait la clé, pas l'objet
+            if isinstance(champ, fields.ReadOnlyField):
+                convertir = _lecture_seule(champ_modele)
+            elif isinstance(champ, fields.DecimalField):
+                convertir = _decimal(champ)
+            elif isinstance(champ, fields.DateTimeField):
+                convertir = _date_heure(champ)
+            elif isinstance(champ, fields.DateField):
+                convertir = _date(champ)
+            elif isinstance(champ, fields.FileField):
+                convertir = _fichier(champ, champ_modele)
+            elif isinstance(champ, relations.PrimaryKeyRelatedField):
+                if champ.pk_field is not None:
+                    raise NonSupporte
+                convertir = None
+            elif isinstance(
+                champ,
+                (
+                    fields.BooleanField,
+                    fields.CharField,
+                    fields.ChoiceField,
+                    fields.IntegerField,
+                ),
+            ):
+                convertir = None
+            else:
+                raise NonSupporte
+            if gardes and (
+                champ.default is not fields.empty or champ.allow_null or champ.required
+            ):
+                # Sur une relation nulle, DRF renverrait une valeur par défaut
+                raise NonSupporte
+            colonne = "__".join(champ.source_attrs)
+            colonnes[colonne] = None
+            for garde in gardes:
+                colonnes[garde] = None
+            self.conversions.append((nom, colonne, convertir, tuple(gardes)))
+        self.colonnes = list(colonnes)
+
+    def convertir(self, lignes):
+        """Lignes de `values(*colonnes)` -> dictionnaires identiques à `serializer.data`"""
+        conversions = self.conversions
+        resultats = []
+        for ligne in lignes:
+            donnees = {}
+            for nom, colonne, convertir, gardes in conversions:
+                if gardes and any(ligne[garde] is None for garde in gardes):
+                    continue
+                valeur = ligne[colonne]
+                if convertir is None or valeur is None:
+                    donnees[nom] = valeur
+                else:
+                    donnees[nom] = convertir(valeur)
+            resultats.append(donnees)
+        return resultats
+
+
+def rendre(donnees):
+    """
+    Octets identiques à `JSONRenderer().render(donnees)` pour des primitives.
+
+    Utilise orjson s'il est installé, sinon `json.dumps` sans encodeur
+    personnalisé (donc entièrement en C), avec les réglages par défaut de DRF.
+    """
+    if orjson is not None:
+        contenu = orjson.dumps(donnees)
+    else:
+        contenu = json.dumps(
+            donnees, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+        ).encode()
+    # JSONRenderer échappe ces deux séparateurs, invalides en JavaScript
+    return contenu.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+        b"\xe2\x80\xa9", b"\\u2029"
+    )
+
+
+class ListeRapideMixin:
+    """
+    Chemin rapide de `list()` pour les vues de liste en lecture seule.
+
+    Les lignes sont lues avec `values()` sur les seules colonnes utiles,
+    converties par un `Plan` puis rendues en JSON sans instancier de modèle
+    ni passer par les champs DRF. Le résultat est identique octet pour octet.
+    Activé par le réglage `FAST_LIST_SERIALIZATION` (désactivé par défaut) ;
+    le serializer DRF reste utilisé sinon, si le client demande un autre rendu que le JSON compact,
+    ou si un champ n'a pas de conversion rapide.
+    """
+
+    def plan_rapide(self, request):
+        if not getattr(settings, "FAST_LIST_SERIALIZATION", False):
+            return None
+        if type(request.accepted_renderer) is not JSONRenderer or (
+            "indent" in (request.accepted_media_type or "")
+        ):
+            return None
+        if not (api_settings.UNICODE_JSON and api_settings.COMPACT_JSON):
+            return None
+        try:
+            return Plan(self.get_serializer())
+        except NonSupporte:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        plan = self.plan_rapide(request)
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*plan.colonnes)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            donnees = self.get_paginated_response(plan.convertir(page)).data
+        else:
+            donnees = plan.convertir(queryset)
+        return HttpResponse(rendre(donnees), content_type=JSONRenderer.media_type)
@@ -1,6 +1,9 @@
+from django.db.transaction import atomic
 from rest_framework import serializers
 
-from .models import CompteBancaire, Utilisateur, Transaction, Pret
+from .cumuls import etat_transaction, mettre_a_jour_cumuls
+from .models import CompteBancaire, Echeance, Utilisateur, Transaction, Pret, Tache
+from .services import crediter
 
 
 class CompteBancaireListSerializer(serializers.ModelSerializer):
@@ -73,7 +76,12 @@ class CompteBancaireSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        compte = CompteBancaire.objects.create(**validated_data)
+        # Le solde initial passe par le grand livre comme écriture d'ouverture
+        solde = validated_data.pop("solde", 0)
+        with atomic():
+            compte = CompteBancaire.objects.create(**validated_data)
+            if solde:
+                compte.solde = crediter(compte.pk, solde, contrepartie="ouverture")
         return compte
 
 
@@ -113,28 +121,22 @@ class TransactionSerializer(serializers.ModelSerializer):
     )
     date = serializers.ReadOnlyField(source="date_transaction")
 
-    # Ajoutez cette méthode pour déboguer les erreurs de validation
     def validate(self, attrs):
-        print("Validation des données:", attrs)
-        try:
-            # Valider que pour un virement, un compte destinataire est fourni
-            if attrs.get("type") == "virement" and "compte_destination" not in attrs:
-                raise serializers.ValidationError(
-                    "Un compte destinataire est requis pour un virement"
-                )
-
-            # Valider que le compte source et destinataire sont différents
-            if attrs.get("type") == "virement" and attrs.get(
-                "compte_source"
-            ) == attrs.get("compte_destination"):
-                raise serializers.ValidationError(
-                    "Le compte source et destinataire ne peuvent pas être identiques"
-                )
-
-            return attrs
-        except Exception as e:
-            print("Erreur de validation:", str(e))
-            raise
+        # Valider que pour un virement, un compte destinataire est fourni
+        if attrs.get("type") == "virement" and "compte_destination" not in attrs:
+            raise serializers.ValidationError(
+                "Un compte destinataire est requis pour un virement"
+            )
+
+        # Valider que le compte source et destinataire sont différents
+        if attrs.get("type") == "virement" and attrs.get("compte_source") == attrs.get(
+            "compte_destination"
+        ):
+            raise serializers.ValidationError(
+                "Le compte source et destinataire ne peuvent pas être identiques"
+            )
+
+        return attrs
 
     class Meta:
         model = Transaction
@@ -150,8 +152,9 @@ class TransactionSerializer(serializers.ModelSerializer):
             "commentaire",
             "source_numero",
             "destination_numero",
+            "alertes",
         ]
-        read_only_fields = ["id", "date_transaction"]
+        read_only_fields = ["id", "date_transaction", "alertes"]
 
     def validate_montant(self, value):
         if value <= 0:
@@ -169,7 +172,9 @@ class TransactionSerializer(serializers.ModelSerializer):
                 "Compte destinataire requis pour un virement"
             )
 
-        transaction = Transaction.objects.create(**validated_data)
+        with atomic():
+            transaction = Transaction.objects.create(**validated_data)
+            mettre_a_jour_cumuls(ajouter=[etat_transaction(transaction)])
         return transaction
 
 
@@ -195,12 +200,20 @@ class PretSerializer(serializers.ModelSerializer):
             "statut",
             "date_demande",
             "date_remboursement",
+            "taux_annuel",
+            "duree_mois",
+            "type_amortissement",
+            "date_debut",
+            "interets_courus",
         ]
         read_only_fields = [
             "date_demande",
             "date_remboursement",
             "utilisateur_nom",
             "compte_numero",
+            "taux_annuel",
+            "date_debut",
+            "interets_courus",
         ]
 
     def validate_montant(self, value):
@@ -209,3 +222,49 @@ class PretSerializer(serializers.ModelSerializer):
                 "Le montant du prêt doit être supérieur à zéro."
             )
         return value
+
+    def validate_duree_mois(self, value):
+        if not 1 <= value <= 360:
+            raise serializers.ValidationError(
+                "La durée du prêt doit être comprise entre 1 et 360 mois."
+            )
+        return value
+
+
+class EcheanceSerializer(serializers.ModelSerializer):
+    """Serializer pour les échéances d'un prêt"""
+
+    class Meta:
+        model = Echeance
+        fields = ["numero", "date_echeance", "capital", "interets", "restant_du"]
+
+
+class ApprobationGroupeeSerializer(serializers.Serializer):
+    """Serializer pour approuver ou rejeter plusieurs éléments en attente"""
+
+    type = serializers.ChoiceField(choices=["virement", "pret", "compte"])
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000,
+    )
+    decision = serializers.ChoiceField(choices=["approuve", "rejete"])
+    # Traitement par un travailleur `runworker` : la réponse donne la tâche à suivre
+    asynchrone = serializers.BooleanField(default=False)
+
+
+class TacheSerializer(serializers.ModelSerializer):
+    """Serializer pour suivre une tâche différée"""
+
+    class Meta:
+        model = Tache
+        fields = [
+            "id",
+            "nom",
+            "statut",
+            "tentatives",
+            "resultat",
+            "date_creation",
+            "date_fin",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,252 @@
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+from .grand_livre import (
+    Mouvement,
+    Position,
+    enregistrer_mouvement,
+    enregistrer_mouvements,
+    soldes_grand_livre,
+)
+from .models import CompteBancaire, Transaction
+
+CENTIME = Decimal("0.01")
+
+
+class SoldeInsuffisant(ValidationError):
+    """Le compte à débiter n'a pas un solde suffisant"""
+
+    default_detail = "Solde insuffisant pour effectuer ce virement"
+    default_code = "solde_insuffisant"
+
+
+def _montant(montant):
+    # Arrondi au centime comme le fait la colonne DecimalField(decimal_places=2)
+    montant = Decimal(montant).quantize(CENTIME, rounding=ROUND_HALF_UP)
+    if montant <= 0:
+        raise ValidationError("Le montant doit être supérieur à zéro.")
+    return montant
+
+
+def _position(compte_id):
+    sequence, solde = CompteBancaire.objects.values_list("nb_ecritures", "solde").get(
+        pk=compte_id
+    )
+    return Position(compte_id, sequence, solde)
+
+
+def crediter(compte_id, montant, transaction_liee=None, contrepartie="externe"):
+    """
+    Crédite un compte par une mise à jour côté base (`solde = solde + montant`).
+
+    Le mouvement est inscrit au grand livre face à `contrepartie`. Retourne le
+    nouveau solde.
+    """
+    montant = _montant(montant)
+    with transaction.atomic():
+        lignes = CompteBancaire.objects.filter(pk=compte_id).update(
+            solde=F("solde") + montant, nb_ecritures=F("nb_ecritures") + 1
+        )
+        if not lignes:
+            raise CompteBancaire.DoesNotExist(f"Compte {compte_id} introuvable")
+        position = _position(compte_id)
+        enregistrer_mouvement(
+            montant,
+            credit=position,
+            contrepartie=contrepartie,
+            transaction=transaction_liee,
+        )
+        return position.solde
+
+
+def debiter(compte_id, montant, transaction_liee=None, contrepartie="externe"):
+    """
+    Débite un compte de façon atomique.
+
+    La condition `solde >= montant` est évaluée dans la requête UPDATE, donc
+    deux débits concurrents ne peuvent pas rendre le solde négatif. Lève
+    `SoldeInsuffisant` si aucune ligne n'a été modifiée. Retourne le nouveau
+    solde.
+    """
+    montant = _montant(montant)
+    with transaction.atomic():
+        lignes = CompteBancaire.objects.filter(pk=compte_id, solde__gte=montant).update(
+            solde=F("solde") - montant, nb_ecritures=F("nb_ecritures") + 1
+        )
+        if not lignes:
+            if not CompteBancaire.objects.filter(pk=compte_id).exists():
+                raise CompteBancaire.DoesNotExist(f"Compte {compte_id} introuvable")
+            raise SoldeInsuffisant()
+        position = _position(compte_id)
+        enregistrer_mouvement(
+            montant,
+            debit=position,
+            contrepartie=contrepartie,
+            transaction=transaction_liee,
+        )
+        return position.solde
+
+
+def transferer(source_id, destination_id, montant, transaction_liee=None):
+    """
+    Transfère un montant entre deux comptes dans une seule transaction.
+
+    Les deux lignes sont verrouillées (`SELECT ... FOR UPDATE`) par ordre de
+    clé primaire croissante : deux virements croisés A→B et B→A prennent les
+    verrous dans le même ordre et ne peuvent pas s'interbloquer. Retourne le
+    couple (solde source, solde destination).
+    """
+    montant = _montant(montant)
+    source_id = CompteBancaire._meta.pk.to_python(source_id)
+    destination_id = CompteBancaire._meta.pk.to_python(destination_id)
+    if source_id == destination_id:
+        raise ValidationError(
+            "Le compte source et destinataire ne peuvent pas être identiques"
+        )
+
+    with transaction.atomic():
+        comptes = {
+            compte.pk: compte
+            for compte in CompteBancaire.objects.select_for_update()
+            .filter(pk__in=[source_id, destination_id])
+            .order_by("pk")
+            .only("pk", "solde", "nb_ecritures")
+        }
+        if source_id not in comptes or destination_id not in comptes:
+            raise CompteBancaire.DoesNotExist("Compte introuvable")
+
+        source, destination = comptes[source_id], comptes[destination_id]
+        if source.solde < montant:
+            raise SoldeInsuffisant()
+
+        CompteBancaire.objects.filter(pk=source_id).update(
+            solde=F("solde") - montant, nb_ecritures=F("nb_ecritures") + 1
+        )
+        CompteBancaire.objects.filter(pk=destination_id).update(
+            solde=F("solde") + montant, nb_ecritures=F("nb_ecritures") + 1
+        )
+        debit = Position(source_id, source.nb_ecritures + 1, source.solde - montant)
+        credit = Position(
+            destination_id, destination.nb_ecritures + 1, destination.solde + montant
+        )
+        enregistrer_mouvement(
+            montant, debit=debit, credit=credit, transaction=transaction_liee
+        )
+        return debit.solde, credit.solde
+
+
+class Operation(NamedTuple):
+    """Opération d'un règlement groupé : débit de `source_id`, crédit de `destination_id`"""
+
+    cle: object
+    montant: Decimal
+    source_id: int = None
+    destination_id: int = None
+    transaction: object = None
+    contrepartie: str = "externe"
+
+
+def regler_en_lot(operations):
+    """
+    Applique une liste d'`Operation` en une seule passe ensembliste.
+
+    Tous les comptes concernés sont verrouillés en une requête, par ordre de
+    clé primaire, puis les opérations sont appliquées en mémoire dans l'ordre
+    reçu. Les soldes sont écrits par un seul `bulk_update` et les écritures
+    par un seul `bulk_create`. Une `transaction` liée encore non enregistrée
+    ne l'est que si son opération est réglée. Retourne {cle: None} pour une opération réglée,
+    {cle: message} pour une opération refusée.
+    """
+    ids = {op.source_id for op in operations} | {op.destination_id for op in operations}
+    ids.discard(None)
+
+    with transaction.atomic():
+        comptes = {
+            compte.pk: compte
+            for compte in CompteBancaire.objects.select_for_update()
+            .filter(pk__in=ids)
+            .order_by("pk")
+            .only("pk", "solde", "nb_ecritures")
+        }
+        resultats = {}
+        mouvements = []
+        modifies = {}
+
+        for op in operations:
+            try:
+                op = op._replace(montant=_montant(op.montant))
+            except ValidationError as erreur:
+                resultats[op.cle] = str(erreur.detail[0])
+                continue
+            source = comptes.get(op.source_id)
+            destination = comptes.get(op.destination_id)
+            if (op.source_id and not source) or (op.destination_id and not destination):
+                resultats[op.cle] = "Compte introuvable"
+                continue
+            if source and source.solde < op.montant:
+                resultats[op.cle] = SoldeInsuffisant.default_detail
+                continue
+
+            debit = credit = None
+            if source:
+                source.solde -= op.montant
+                source.nb_ecritures += 1
+                debit = Position(source.pk, source.nb_ecritures, source.solde)
+                modifies[source.pk] = source
+            if destination:
+                destination.solde += op.montant
+                destination.nb_ecritures += 1
+                credit = Position(
+                    destination.pk, destination.nb_ecritures, destination.solde
+                )
+                modifies[destination.pk] = destination
+
+            mouvements.append(
+                Mouvement(op.montant, debit, credit, op.contrepartie, op.transaction)
+            )
+            resultats[op.cle] = None
+
+        CompteBancaire.objects.bulk_update(modifies.values(), ["solde", "nb_ecritures"])
+        Transaction.objects.bulk_create(
+            [
+                mouvement.transaction
+                for mouvement in mouvements
+                if mouvement.transaction is not None
+                and mouvement.transaction.pk is None
+            ]
+        )
+        enregistrer_mouvements(mouvements)
+        return resultats
+
+
+def ajuster_grand_livre(compte_id, contrepartie="ajustement"):
+    """
+    Aligne le grand livre sur le solde du compte sans modifier ce dernier.
+
+    Utilisé par la réconciliation quand `solde` a été modifié hors de ce
+    service (par exemple depuis l'administration). L'écart est recalculé sous
+    verrou. Retourne l'écart inscrit.
+    """
+    with transaction.atomic():
+        solde = (
+            CompteBancaire.objects.select_for_update()
+            .values_list("solde", flat=True)
+            .get(pk=compte_id)
+        )
+        ecart = solde - soldes_grand_livre([compte_id])[compte_id]
+        if not ecart:
+            return ecart
+
+        CompteBancaire.objects.filter(pk=compte_id).update(
+            nb_ecritures=F("nb_ecritures") + 1
+        )
+        position = _position(compte_id)
+        if ecart > 0:
+            enregistrer_mouvement(ecart, credit=position, contrepartie=contrepartie)
+        else:
+            enregistrer_mouvement(-ecart, debit=position, contrepartie=contrepartie)
+        return ecart
@@ -0,0 +1,57 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import invalider_utilisateur
+from .models import (
+    CompteBancaire,
+    CompteSupprime,
+    Transaction,
+    TransactionSupprimee,
+    Utilisateur,
+)
+from .verification import invalider_verification
+
+
+@receiver([post_save, post_delete], sender=CompteBancaire)
+def invalider_compte(sender, instance, **kwargs):
+    invalider_verification([instance.numero_compte])
+
+
+@receiver(post_delete, sender=CompteBancaire)
+def tracer_suppression_compte(sender, instance, **kwargs):
+    # Les clients synchronisés retirent le compte, ses transactions et ses prêts
+    CompteSupprime.objects.create(
+        compte_id=instance.pk, utilisateur_id=instance.utilisateur_id
+    )
+
+
+@receiver(pre_delete, sender=CompteBancaire)
+def tracer_transactions_contrepartie(sender, instance, **kwargs):
+    # Les transactions partent en cascade avec le compte : l'autre participant
+    # ne reçoit pas la trace du compte, qui n'est pas le sien
+    contreparties = [
+        Transaction.objects.filter(compte_source=instance).values_list(
+            "pk", "compte_destination__utilisateur_id"
+        ),
+        Transaction.objects.filter(compte_destination=instance).values_list(
+            "pk", "compte_source__utilisateur_id"
+        ),
+    ]
+    TransactionSupprimee.objects.bulk_create(
+        TransactionSupprimee(transaction_id=pk, utilisateur_id=utilisateur_id)
+        for transactions in contreparties
+        for pk, utilisateur_id in transactions
+        if utilisateur_id not in (None, instance.utilisateur_id)
+    )
+
+
+@receiver([post_save, post_delete], sender=Utilisateur)
+def invalider_cache_utilisateur(sender, instance, **kwargs):
+    invalider_utilisateur(instance.pk)
+
+
+@receiver(post_save, sender=Utilisateur)
+def invalider_comptes_utilisateur(sender, instance, created, **kwargs):
+    # Le nom et le rôle du propriétaire font partie des données de vérification
+    if not created:
+        invalider_verification(instance.comptes.values_list("numero_compte", flat=True))
@@ -0,0 +1,170 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import (
+    CompteBancaire,
+    CompteSupprime,
+    Pret,
+    Transaction,
+    TransactionSupprimee,
+)
+from .serialisation_rapide import NonSupporte, Plan
+from .serializers import CompteBancaireSerializer, PretSerializer, TransactionSerializer
+
+SEL = "api.synchronisation"
+
+
+def _comptes(utilisateur):
+    queryset = CompteBancaire.objects.select_related("utilisateur")
+    if utilisateur.role == "admin":
+        return queryset
+    return queryset.filter(utilisateur=utilisateur)
+
+
+def _transactions(utilisateur):
+    queryset = Transaction.objects.select_related("compte_source", "compte_destination")
+    if utilisateur.role == "admin":
+        return queryset
+    comptes = CompteBancaire.objects.filter(utilisateur=utilisateur)
+    return queryset.filter(
+        Q(compte_source__in=comptes) | Q(compte_destination__in=comptes)
+    )
+
+
+def _prets(utilisateur):
+    queryset = Pret.objects.select_related("compte__utilisateur")
+    if utilisateur.role == "admin":
+        return queryset
+    if utilisateur.role == "client":
+        return queryset.filter(compte__utilisateur=utilisateur)
+    return queryset.none()
+
+
+# Nom dans la réponse, lignes visibles de l'utilisateur, serializer
+SOURCES = (
+    ("comptes", _comptes, CompteBancaireSerializer),
+    ("transactions", _transactions, TransactionSerializer),
+    ("prets", _prets, PretSerializer),
+)
+
+
+def lire_jeton(jeton):
+    """Curseurs {source: (date, id)} et date des suppressions ; vides sans jeton"""
+    if not jeton:
+        return {}, None
+    try:
+        contenu = signing.loads(jeton, salt=SEL)
+        curseurs = {
+            nom: (parse_datetime(date), identifiant)
+            for nom, (date, identifiant) in contenu["curseurs"].items()
+        }
+        suppressions = parse_datetime(contenu["suppressions"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise ValidationError({"depuis": "Jeton de synchronisation invalide."})
+    if suppressions is None or any(date is None for date, _ in curseurs.values()):
+        raise ValidationError({"depuis": "Jeton de synchronisation invalide."})
+    return curseurs, suppressions
+
+
+def creer_jeton(curseurs, suppressions):
+    return signing.dumps(
+        {
+            "curseurs": {
+                nom: [date.isoformat(), identifiant]
+                for nom, (date, identifiant) in curseurs.items()
+            },
+            "suppressions": suppressions.isoformat(),
+        },
+        salt=SEL,
+        compress=True,
+    )
+
+
+def _page(queryset, serializer, curseur, limite):
+    """
+    Lignes modifiées après `curseur`, dans l'ordre (date_modification, id) :
+    au plus `limite` données sérialisées, le curseur de la dernière, et si
+    d'autres lignes suivent.
+    """
+    if curseur is not None:
+        date, identifiant = curseur
+        queryset = queryset.filter(
+            Q(date_modification__gt=date)
+            | Q(date_modification=date, pk__gt=identifiant)
+        )
+    queryset = queryset.order_by("date_modification", "pk")
+    try:
+        plan = Plan(serializer)
+    except NonSupporte:
+        plan = None
+    if plan is None:
+        objets = list(queryset[: limite + 1])
+        suite = len(objets) > limite
+        objets = objets[:limite]
+        donnees = type(serializer)(objets, many=True, context=serializer.context).data
+        dernier = (objets[-1].date_modification, objets[-1].pk) if objets else None
+    else:
+        colonnes = list(dict.fromkeys([*plan.colonnes, "date_modification", "id"]))
+        lignes = list(queryset.values(*colonnes)[: limite + 1])
+        suite = len(lignes) > limite
+        lignes = lignes[:limite]
+        donnees = plan.convertir(lignes)
+        dernier = (
+            (lignes[-1]["date_modification"], lignes[-1]["id"]) if lignes else None
+        )
+    return donnees, dernier, suite
+
+
+def synchroniser(request, jeton=None, limite=None):
+    """
+    Lignes créées ou modifiées depuis `jeton` (tout, sans jeton), comptes
+    supprimés depuis, et le jeton de l'appel suivant. Les transactions
+    supprimées avec le compte d'un autre utilisateur sont listées à part :
+    le client retire lui-même celles de ses comptes supprimés.
+
+    Chaque modèle a son curseur (date_modification, id) : une page pleine
+    s'arrête à sa dernière ligne, et `complet` est faux tant qu'un modèle a
+    des lignes en attente. Sinon le curseur recule de `SYNC_OVERLAP_SECONDS`
+    avant le début de l'appel, sans jamais revenir en arrière : les écritures
+    validées tardivement ou pas encore répliquées sont relues au prochain
+    appel. Le client remplace donc les lignes par leur id.
+    """
+    limite = min(limite or settings.SYNC_PAGE_SIZE, settings.SYNC_PAGE_SIZE)
+    curseurs, suppressions = lire_jeton(jeton)
+    marge = timezone.now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+    utilisateur = request.user
+
+    resultat, nouveaux, complet = {}, {}, True
+    for nom, lignes, classe in SOURCES:
+        curseur = curseurs.get(nom)
+        donnees, dernier, suite = _page(
+            lignes(utilisateur), classe(context={"request": request}), curseur, limite
+        )
+        resultat[nom] = donnees
+        if suite:
+            complet = False
+            nouveaux[nom] = dernier
+        else:
+            nouveaux[nom] = max(filter(None, (curseur, (marge, 0))))
+
+    for nom, traces, champ in (
+        ("comptes_supprimes", CompteSupprime, "compte_id"),
+        ("transactions_supprimees", TransactionSupprimee, "transaction_id"),
+    ):
+        if suppressions is None:
+            # Premier appel : le client n'a encore rien à retirer
+            resultat[nom] = []
+            continue
+        supprimes = traces.objects.filter(date_suppression__gt=suppressions)
+        if utilisateur.role != "admin":
+            supprimes = supprimes.filter(utilisateur_id=utilisateur.pk)
+        resultat[nom] = sorted(set(supprimes.values_list(champ, flat=True)))
+    resultat["jeton"] = creer_jeton(nouveaux, max(filter(None, (suppressions, marge))))
+    resultat["complet"] = complet
+    return resultat
@@ -0,0 +1,274 @@
+import logging
+import os
+import socket
+import tempfile
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models import F
+from django.db.transaction import atomic
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .approbations import approuver_en_lot
+from .cumuls import reconstruire
+from .models import CompteBancaire, Tache
+from .releves import flux_csv, flux_jsonl, lignes_releve
+
+logger = logging.getLogger(__name__)
+
+# Fonctions exécutables, par nom de tâche
+TACHES = {}
+
+
+def tache(nom):
+    """Enregistre une fonction comme tâche `nom` ; ses arguments sont nommés et en JSON"""
+
+    def enregistrer(fonction):
+        TACHES[nom] = fonction
+        return fonction
+
+    return enregistrer
+
+
+def differer(nom, utilisateur=None, delai=0, max_tentatives=None, **arguments):
+    """
+    Enregistre une tâche, exécutée ensuite par un travailleur `runworker`.
+
+    Dans une transaction, la tâche n'est visible des travailleurs qu'après le
+    commit : elle ne peut pas porter sur des écritures annulées.
+    """
+    if nom not in TACHES:
+        raise KeyError(f"Tâche inconnue : {nom}")
+    return Tache.objects.create(
+        nom=nom,
+        arguments=arguments,
+        utilisateur=utilisateur,
+        disponible_le=timezone.now() + timedelta(seconds=delai),
+        max_tentatives=max_tentatives or settings.JOB_QUEUE_MAX_ATTEMPTS,
+    )
+
+
+def nom_travailleur(numero=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{numero}:{uuid.uuid4().hex[:8]}"
+
+
+def reclamer(travailleur, nombre=1):
+    """
+    Réserve jusqu'à `nombre` tâches disponibles, les plus anciennes d'abord.
+
+    Les lignes déjà verrouillées par un autre travailleur sont sautées
+    (`SELECT ... FOR UPDATE SKIP LOCKED`) : les travailleurs ne s'attendent
+    pas. Sans SKIP LOCKED (SQLite), la mise à jour conditionnelle sur le
+    statut départage deux travailleurs ayant lu les mêmes lignes.
+    """
+    maintenant = timezone.now()
+    with atomic():
+        ids = list(
+            Tache.objects.select_for_update(skip_locked=True)
+            .filter(statut="en_attente", disponible_le__lte=maintenant)
+            .order_by("disponible_le", "id")
+            .values_list("pk", flat=True)[:nombre]
+        )
+        if not ids:
+            return []
+        Tache.objects.filter(pk__in=ids, statut="en_attente").update(
+            statut="en_cours",
+            reclamee_par=travailleur,
+            reclamee_le=maintenant,
+            tentatives=F("tentatives") + 1,
+        )
+    taches = Tache.objects.filter(pk__in=ids, statut="en_cours")
+    if not connection.features.has_select_for_update_skip_locked:
+        taches = taches.filter(reclamee_par=travailleur)
+    return list(taches.order_by("disponible_le", "id"))
+
+
+def executer(tache):
+    """
+    Exécute une tâche réservée et enregistre son issue.
+
+    Une tâche en échec est reprise après `JOB_QUEUE_RETRY_DELAY` secondes,
+    délai doublé à chaque tentative, jusqu'à `max_tentatives`. Retourne le
+    statut enregistré, ou None si la tâche a été libérée entre-temps.
+    """
+    fonction = TACHES.get(tache.nom)
+    try:
+        if fonction is None:
+            raise KeyError(f"Tâche inconnue : {tache.nom}")
+        resultat = fonction(**tache.arguments)
+    except Exception:
+        logger.exception("Tâche %s #%s en échec", tache.nom, tache.pk)
+        maintenant = timezone.now()
+        if fonction is not None and tache.tentatives < tache.max_tentatives:
+            delai = settings.JOB_QUEUE_RETRY_DELAY * 2 ** (tache.tentatives - 1)
+            issue = {
+                "statut": "en_attente",
+                "disponible_le": maintenant + timedelta(seconds=delai),
+            }
+        else:
+            issue = {"statut": "echouee", "date_fin": maintenant}
+        issue["erreur"] = traceback.format_exc()
+    else:
+        issue = {
+            "statut": "terminee",
+            "resultat": resultat,
+            "erreur": "",
+            "date_fin": timezone.now(),
+        }
+    # Sauf si la tâche, jugée bloquée, a été rendue à un autre travailleur
+    if not Tache.objects.filter(
+        pk=tache.pk, statut="en_cours", reclamee_par=tache.reclamee_par
+    ).update(**issue):
+        logger.warning(
+            "Tâche %s #%s reprise entre-temps : issue ignorée", tache.nom, tache.pk
+        )
+        return None
+    return issue["statut"]
+
+
+def rendre(taches):
+    """Remet en attente des tâches réservées mais non exécutées (arrêt du travailleur)"""
+    for tache in taches:
+        Tache.objects.filter(
+            pk=tache.pk, statut="en_cours", reclamee_par=tache.reclamee_par
+        ).update(statut="en_attente", tentatives=F("tentatives") - 1)
+
+
+def renouveler(travailleur):
+    """Repousse l'échéance de réservation des tâches en cours de `travailleur`"""
+    return Tache.objects.filter(statut="en_cours", reclamee_par=travailleur).update(
+        reclamee_le=timezone.now()
+    )
+
+
+def entretenir(travailleur, fin, intervalle):
+    """
+    Renouvelle toutes les `intervalle` secondes les réservations de
+    `travailleur`, jusqu'à `fin` : une tâche longue n'est pas jugée bloquée.
+    """
+    try:
+        while not fin.wait(intervalle):
+            try:
+                renouveler(travailleur)
+            except DatabaseError:
+                logger.exception("Renouvellement impossible (%s)", travailleur)
+                connection.close()
+    finally:
+        connection.close()
+
+
+def liberer_bloquees():
+    """
+    Tâches dont la réservation n'a pas été renouvelée depuis plus de
+    `JOB_QUEUE_LOCK_TIMEOUT` secondes, par un travailleur arrêté brutalement :
+    reprises, ou en échec si elles ont épuisé leurs tentatives. Retourne le
+    nombre de tâches libérées.
+    """
+    maintenant = timezone.now()
+    bloquees = Tache.objects.filter(
+        statut="en_cours",
+        reclamee_le__lt=maintenant - timedelta(seconds=settings.JOB_QUEUE_LOCK_TIMEOUT),
+    )
+    echouees = bloquees.filter(tentatives__gte=F("max_tentatives")).update(
+        statut="echouee", erreur="Travailleur arrêté pendant l'exécution"
+    )
+    reprises = bloquees.update(statut="en_attente", disponible_le=maintenant)
+    return echouees + reprises
+
+
+def travailler(travailleur, arret, lot=1, attente=1.0, une_fois=False):
+    """
+    Boucle d'un travailleur : réserve et exécute des tâches jusqu'à `arret`.
+
+    Attend `attente` secondes quand la file est vide, ou s'arrête si
+    `une_fois`. Un fil annexe renouvelle les réservations du travailleur
+    (`entretenir`) tant que la boucle tourne. Retourne le nombre de tâches
+    exécutées.
+    """
+    executees = 0
+    fin = threading.Event()
+    battement = threading.Thread(
+        target=entretenir,
+        args=(travailleur, fin, settings.JOB_QUEUE_HEARTBEAT_INTERVAL),
+        daemon=True,
+    )
+    battement.start()
+    try:
+        while not arret.is_set():
+            close_old_connections()
+            try:
+                taches = reclamer(travailleur, lot)
+            except DatabaseError:
+                # Base indisponible ou verrouillée : le travailleur réessaie
+                logger.exception("Réservation impossible (%s)", travailleur)
+                connection.close()
+                arret.wait(attente)
+                continue
+            if not taches:
+                if une_fois:
+                    break
+                arret.wait(attente)
+                continue
+            for position, tache in enumerate(taches):
+                if arret.is_set():
+                    rendre(taches[position:])
+                    break
+                executer(tache)
+                executees += 1
+    finally:
+        fin.set()
+        battement.join()
+        connection.close()
+    return executees
+
+
+@tache("ping")
+def ping(**arguments):
+    """Tâche vide, pour mesurer le débit de la file"""
+    return arguments or None
+
+
+@tache("approbation_groupee")
+def approbation_groupee(type, ids, decision):
+    resultats = approuver_en_lot(type, ids, decision)
+    return {
+        "traites": len(resultats),
+        "succes": sum(resultat["succes"] for resultat in resultats),
+        "resultats": resultats,
+    }
+
+
+@tache("releve")
+def releve(compte_id, export="csv", since=None, until=None):
+    """
+    Relevé écrit dans le stockage privé (`STORAGES["prive"]`), jamais servi
+    directement : le demandeur le télécharge par api/taches/<id>/fichier/.
+    """
+    compte = CompteBancaire.objects.get(pk=compte_id)
+    lignes = lignes_releve(
+        compte.pk,
+        parse_datetime(since) if since else None,
+        parse_datetime(until) if until else None,
+    )
+    flux = flux_csv(lignes) if export == "csv" else flux_jsonl(lignes)
+    with tempfile.TemporaryFile("w+b") as fichier:
+        for morceau in flux:
+            fichier.write(morceau.encode("utf-8"))
+        fichier.seek(0)
+        nom = storages["prive"].save(
+            f"releves/{uuid.uuid4().hex}/releve-{compte.numero_compte}.{export}",
+            File(fichier),
+        )
+    return {"fichier": nom}
+
+
+@tache("reconstruire_cumuls")
+def reconstruire_cumuls(taille_lot=1000):
+    return {"cumuls": reconstruire(taille_lot)}
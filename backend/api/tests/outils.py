@@ -0,0 +1,26 @@
+from decimal import Decimal
+
+from rest_framework.test import APIClient
+
+from api.models import CompteBancaire, Utilisateur
+
+
+def creer_utilisateur(nom, role="client"):
+    return Utilisateur.objects.create_user(
+        username=nom, password="x", role=role, first_name=nom, last_name=nom.upper()
+    )
+
+
+def creer_compte(utilisateur, solde=1000, statut="approuve", type_compte="courant"):
+    return CompteBancaire.objects.create(
+        utilisateur=utilisateur,
+        solde=Decimal(solde),
+        statut=statut,
+        type_compte=type_compte,
+    )
+
+
+def client_api(utilisateur):
+    client = APIClient()
+    client.force_authenticate(utilisateur)
+    return client
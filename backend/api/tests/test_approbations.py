@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from api.approbations import approuver_en_lot
+from api.grand_livre import soldes_grand_livre
+from api.models import CompteBancaire, Pret, Transaction
+
+from .outils import creer_compte, creer_utilisateur
+
+
+class ApprobationEnLotTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        self.compte = creer_compte(self.alice, solde=0)
+
+    def test_prets_regles_seulement(self):
+        regle = Pret.objects.create(compte=self.compte, motif="m", montant=100)
+        refuse = Pret.objects.create(compte=self.compte, motif="m", montant=0)
+
+        resultats = approuver_en_lot("pret", [regle.pk, refuse.pk], "approuve")
+
+        self.assertEqual([r["succes"] for r in resultats], [True, False])
+        self.assertEqual(
+            dict(Pret.objects.values_list("pk", "statut")),
+            {regle.pk: "en_cours", refuse.pk: "en_attente"},
+        )
+        transaction = Transaction.objects.get(type="pret")
+        self.assertEqual(transaction.montant, Decimal("100"))
+        self.assertEqual(
+            list(transaction.ecritures.values_list("sens", flat=True).order_by("sens")),
+            ["credit", "debit"],
+        )
+        self.assertEqual(
+            CompteBancaire.objects.get(pk=self.compte.pk).solde, Decimal("100")
+        )
+        self.assertEqual(soldes_grand_livre([self.compte.pk])[self.compte.pk], 100)
+
+    def test_virements(self):
+        autre = creer_compte(self.alice, solde=0)
+        approuver_en_lot(
+            "pret",
+            [Pret.objects.create(compte=self.compte, motif="m", montant=50).pk],
+            "approuve",
+        )
+        virements = [
+            Transaction.objects.create(
+                compte_source=self.compte,
+                compte_destination=autre,
+                type="transfert",
+                montant=montant,
+                status="en_attente",
+            )
+            for montant in (30, 30)
+        ]
+        resultats = approuver_en_lot("virement", [v.pk for v in virements], "approuve")
+        self.assertEqual([r["succes"] for r in resultats], [True, False])
+        self.assertEqual(
+            [Transaction.objects.get(pk=v.pk).status for v in virements],
+            ["succès", "en_attente"],
+        )
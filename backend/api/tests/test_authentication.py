@@ -0,0 +1,70 @@
+import tempfile
+
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import cache_utilisateurs
+from api.models import Utilisateur
+
+from .outils import creer_utilisateur
+
+CACHE_FICHIERS = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(),
+    }
+}
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class AuthentificationMixin:
+    def setUp(self):
+        caches["default"].clear()
+        self.admin = creer_utilisateur("admin", "admin")
+
+    def get(self, url, utilisateur):
+        return Client().get(
+            url,
+            headers={"Authorization": f"Bearer {AccessToken.for_user(utilisateur)}"},
+        )
+
+    def test_desactivation_en_masse(self):
+        self.assertEqual(self.get("/api/user-info/", self.admin).status_code, 200)
+        Utilisateur.objects.filter(pk=self.admin.pk).update(is_active=False)
+        self.assertEqual(self.get("/api/user-info/", self.admin).status_code, 401)
+
+    def test_changement_de_role(self):
+        self.assertEqual(self.get("/api/stats/", self.admin).status_code, 200)
+        self.admin.role = "client"
+        Utilisateur.objects.bulk_update([self.admin], ["role"])
+        self.assertEqual(self.get("/api/stats/", self.admin).status_code, 403)
+
+
+@override_settings(CACHES=CACHE_FICHIERS)
+class CachePartageTests(AuthentificationMixin, TestCase):
+    def test_utilisateur_en_cache(self):
+        self.assertTrue(cache_utilisateurs.partage)
+        self.get("/api/user-info/", self.admin)
+        self.assertIsNotNone(cache_utilisateurs.get(str(self.admin.pk)))
+        self.admin.last_name = "NOUVEAU"
+        self.admin.save()
+        self.assertIsNone(cache_utilisateurs.get(str(self.admin.pk)))
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CacheLocalTests(AuthentificationMixin, TestCase):
+    def test_pas_de_cache_local(self):
+        self.assertFalse(cache_utilisateurs.partage)
+        self.get("/api/user-info/", self.admin)
+        self.assertIsNone(cache_utilisateurs.get(str(self.admin.pk)))
+
+
+class JetonTests(TestCase):
+    def test_sans_role(self):
+        creer_utilisateur("alice")
+        reponse = Client().post(
+            "/api/token/", {"username": "alice", "password": "x"}, "application/json"
+        )
+        self.assertEqual(reponse.status_code, 200, reponse.content)
+        self.assertNotIn("role", AccessToken(reponse.json()["access"]).payload)
@@ -0,0 +1,123 @@
+import threading
+from unittest import mock, skipUnless
+
+from django.db import connection, connections
+from django.db.transaction import atomic
+from django.test import TestCase, TransactionTestCase
+
+from api import cumuls
+from api.cumuls import etat_transaction, mettre_a_jour_cumuls, reconstruire
+from api.models import CumulJournalier, Transaction
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+
+class CumulsMixin:
+    def setUp(self):
+        alice = creer_utilisateur("alice")
+        self.comptes = [creer_compte(alice) for _ in range(3)]
+
+    def virement(self, compte, montant=10, status="en_attente"):
+        with atomic():
+            transaction = Transaction.objects.create(
+                compte_source=compte,
+                compte_destination=self.comptes[-1],
+                type="transfert",
+                montant=montant,
+                status=status,
+            )
+            mettre_a_jour_cumuls(ajouter=[etat_transaction(transaction)])
+        return transaction
+
+    @staticmethod
+    def etat_cumuls():
+        return sorted(
+            CumulJournalier.objects.values_list(
+                "compte_id", "jour", "categorie", "statut", "nombre", "montant"
+            )
+        )
+
+
+class ReconstruireTests(CumulsMixin, TestCase):
+    def test_identique_aux_mises_a_jour(self):
+        for compte in self.comptes:
+            self.virement(compte)
+            self.virement(compte, 5, "succès")
+        attendu = self.etat_cumuls()
+        CumulJournalier.objects.filter(compte=self.comptes[0]).update(nombre=99)
+        CumulJournalier.objects.filter(compte=self.comptes[1]).delete()
+
+        self.assertEqual(reconstruire(taille_lot=2), len(attendu))
+        self.assertEqual(self.etat_cumuls(), attendu)
+
+    def test_lot_recommence(self):
+        self.virement(self.comptes[0])
+        attendu = self.etat_cumuls()
+        agreger = cumuls._agreger
+
+        def concurrent(ids):
+            # Ligne créée par une mise à jour incrémentale pendant le lot
+            lignes = agreger(ids)
+            appels.append(ids)
+            if len(appels) == 1:
+                (ligne,) = lignes
+                CumulJournalier.objects.create(
+                    compte_id=ligne.compte_id,
+                    jour=ligne.jour,
+                    categorie=ligne.categorie,
+                    statut=ligne.statut,
+                )
+            return lignes
+
+        appels = []
+        with mock.patch.object(cumuls, "_agreger", concurrent):
+            reconstruire()
+        self.assertEqual(len(appels), 2)
+        self.assertEqual(self.etat_cumuls(), attendu)
+
+    def test_statistiques_date_invalide(self):
+        admin = client_api(creer_utilisateur("admin", role="admin"))
+        for valeur in ("hier", "2024-02-30"):
+            with self.subTest(valeur=valeur):
+                reponse = admin.get("/api/stats/", {"since": valeur})
+                self.assertEqual(reponse.status_code, 400)
+                self.assertIn("since", reponse.data)
+
+
+@skipUnless(
+    connection.features.has_select_for_update, "Verrous de lignes non supportés"
+)
+class ReconstruireConcurrentTests(CumulsMixin, TransactionTestCase):
+    def test_sans_perte(self):
+        fin = threading.Event()
+
+        def ecrire(compte):
+            try:
+                for _ in range(20):
+                    self.virement(compte)
+            finally:
+                connections.close_all()
+
+        def reconstruire_en_boucle():
+            try:
+                while not fin.is_set():
+                    reconstruire(taille_lot=1)
+            finally:
+                connections.close_all()
+
+        reconstructeur = threading.Thread(target=reconstruire_en_boucle)
+        reconstructeur.start()
+        ecrivains = [
+            threading.Thread(target=ecrire, args=(compte,)) for compte in self.comptes
+        ]
+        for fil in ecrivains:
+            fil.start()
+        for fil in ecrivains:
+            fil.join()
+        fin.set()
+        reconstructeur.join()
+
+        attendu = self.etat_cumuls()
+        reconstruire()
+        self.assertEqual(self.etat_cumuls(), attendu)
+        self.assertEqual(sum(ligne[4] for ligne in attendu), 60)
@@ -0,0 +1,162 @@
+from decimal import Decimal
+
+from django.db.models import ProtectedError
+from django.test import TestCase, override_settings
+
+from api.grand_livre import solde_a_date, soldes_grand_livre
+from api.models import (
+    CompteBancaire,
+    EcritureComptable,
+    SoldeInstantane,
+    Utilisateur,
+)
+from api.services import (
+    Operation,
+    SoldeInsuffisant,
+    ajuster_grand_livre,
+    crediter,
+    debiter,
+    regler_en_lot,
+    transferer,
+)
+
+from .outils import creer_compte, creer_utilisateur
+
+
+class GrandLivreTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        self.source = creer_compte(self.alice, solde=0)
+        self.destination = creer_compte(self.alice, solde=0)
+
+    def solde(self, compte):
+        return CompteBancaire.objects.get(pk=compte.pk).solde
+
+    def test_partie_double(self):
+        crediter(self.source.pk, "100")
+        transferer(self.source.pk, self.destination.pk, "30")
+        debiter(self.destination.pk, "5")
+
+        self.assertEqual(self.solde(self.source), Decimal("70"))
+        self.assertEqual(self.solde(self.destination), Decimal("25"))
+        self.assertEqual(
+            soldes_grand_livre([self.source.pk, self.destination.pk]),
+            {self.source.pk: Decimal("70"), self.destination.pk: Decimal("25")},
+        )
+        # Chaque mouvement a exactement un débit et un crédit de même montant
+        for mouvement in EcritureComptable.objects.values_list(
+            "mouvement", flat=True
+        ).distinct():
+            ecritures = EcritureComptable.objects.filter(mouvement=mouvement)
+            self.assertEqual(
+                sorted(ecritures.values_list("sens", flat=True)), ["credit", "debit"]
+            )
+            self.assertEqual(len(set(ecritures.values_list("montant", flat=True))), 1)
+        self.assertEqual(
+            list(
+                self.source.ecritures.order_by("sequence").values_list(
+                    "sequence", flat=True
+                )
+            ),
+            [1, 2],
+        )
+
+    def test_solde_insuffisant(self):
+        crediter(self.source.pk, "10")
+        with self.assertRaises(SoldeInsuffisant):
+            debiter(self.source.pk, "10.01")
+        with self.assertRaises(SoldeInsuffisant):
+            transferer(self.source.pk, self.destination.pk, "11")
+        self.assertEqual(self.solde(self.source), Decimal("10"))
+        self.assertEqual(EcritureComptable.objects.count(), 2)
+
+    def test_ajout_seul(self):
+        crediter(self.source.pk, "10")
+        ecriture = EcritureComptable.objects.first()
+        with self.assertRaises(ValueError):
+            ecriture.save()
+        with self.assertRaises(ValueError):
+            ecriture.delete()
+        # Les écritures en masse ne passent pas par le modèle
+        with self.assertRaises(ValueError):
+            EcritureComptable.objects.filter(pk=ecriture.pk).update(montant=1)
+        with self.assertRaises(ValueError):
+            self.source.ecritures.all().delete()
+        ecriture.refresh_from_db()
+        self.assertEqual(ecriture.montant, Decimal("10"))
+
+    def test_compte_protege(self):
+        crediter(self.source.pk, "10")
+        with self.assertRaises(ProtectedError):
+            self.source.delete()
+        with self.assertRaises(ProtectedError):
+            self.alice.delete()
+
+        self.assertEqual(self.source.ecritures.count(), 1)
+        # Sans écriture, le compte reste supprimable
+        self.destination.delete()
+
+    def test_admin_lecture_seule(self):
+        crediter(self.source.pk, "10")
+        ecriture = self.source.ecritures.get()
+        self.client.force_login(
+            Utilisateur.objects.create_superuser("root", password="x", role="admin")
+        )
+        url = f"/admin/api/ecriturecomptable/{ecriture.pk}/change/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(
+            self.client.post(url, {"montant": "1", "sens": "debit"}).status_code, 403
+        )
+        self.assertEqual(
+            self.client.post(
+                f"/admin/api/ecriturecomptable/{ecriture.pk}/delete/", {"post": "yes"}
+            ).status_code,
+            403,
+        )
+        self.assertTrue(EcritureComptable.objects.filter(pk=ecriture.pk).exists())
+
+    @override_settings(LEDGER_SNAPSHOT_INTERVAL=3)
+    def test_instantanes(self):
+        for _ in range(7):
+            crediter(self.source.pk, "10")
+        self.assertEqual(
+            list(
+                SoldeInstantane.objects.filter(compte=self.source).values_list(
+                    "sequence", "solde"
+                )
+            ),
+            [(3, Decimal("30")), (6, Decimal("60"))],
+        )
+        self.assertEqual(solde_a_date(self.source.pk), Decimal("70"))
+        self.assertEqual(soldes_grand_livre([self.source.pk])[self.source.pk], 70)
+        quatrieme = self.source.ecritures.get(sequence=4).date_ecriture
+        self.assertLessEqual(solde_a_date(self.source.pk, quatrieme), Decimal("70"))
+        self.assertGreaterEqual(solde_a_date(self.source.pk, quatrieme), Decimal("40"))
+
+    def test_reglement_en_lot(self):
+        crediter(self.source.pk, "50")
+        resultats = regler_en_lot(
+            [
+                Operation("a", Decimal("20"), self.source.pk, self.destination.pk),
+                Operation("b", Decimal("40"), self.source.pk, self.destination.pk),
+                Operation("c", Decimal("-1"), None, self.destination.pk),
+                Operation("d", Decimal("5"), None, self.destination.pk),
+            ]
+        )
+        self.assertIsNone(resultats["a"])
+        self.assertEqual(resultats["b"], SoldeInsuffisant.default_detail)
+        self.assertIsNotNone(resultats["c"])
+        self.assertIsNone(resultats["d"])
+        self.assertEqual(self.solde(self.source), Decimal("30"))
+        self.assertEqual(self.solde(self.destination), Decimal("25"))
+        self.assertEqual(
+            soldes_grand_livre([self.source.pk, self.destination.pk]),
+            {self.source.pk: Decimal("30"), self.destination.pk: Decimal("25")},
+        )
+
+    def test_ajustement(self):
+        crediter(self.source.pk, "10")
+        CompteBancaire.objects.filter(pk=self.source.pk).update(solde=Decimal("4"))
+        self.assertEqual(ajuster_grand_livre(self.source.pk), Decimal("-6"))
+        self.assertEqual(soldes_grand_livre([self.source.pk])[self.source.pk], 4)
+        self.assertEqual(ajuster_grand_livre(self.source.pk), 0)
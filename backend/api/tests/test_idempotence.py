@@ -0,0 +1,103 @@
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from api.caches import CacheDjango
+from api.idempotence import cache_reponses
+from api.models import CleIdempotence, CompteBancaire, Transaction
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+
+class IdempotenceTests(TestCase):
+    def setUp(self):
+        cache_reponses.clear()
+        self.alice = creer_utilisateur("alice")
+        self.courant = creer_compte(self.alice, solde=100)
+        self.epargne = creer_compte(self.alice, solde=0, type_compte="epargne")
+        self.client = client_api(self.alice)
+
+    def epargner(self, montant, cle="cle-1"):
+        return self.client.post(
+            "/api/epargne/",
+            {
+                "compte": self.courant.pk,
+                "compte_epargne": self.epargne.pk,
+                "montant": str(montant),
+            },
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=cle,
+        )
+
+    def solde(self, compte):
+        return CompteBancaire.objects.get(pk=compte.pk).solde
+
+    def test_rejeu(self):
+        premiere = self.epargner(30)
+        self.assertEqual(premiere.status_code, 200, premiere.content)
+        # Rejouée depuis la base, puis depuis le cache en mémoire
+        for vider_cache in (True, False):
+            if vider_cache:
+                cache_reponses.clear()
+            seconde = self.epargner(30)
+            self.assertEqual(seconde.status_code, 200)
+            self.assertEqual(seconde["Idempotent-Replayed"], "true")
+            self.assertEqual(seconde.json(), premiere.json())
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(self.solde(self.courant), Decimal("70"))
+        self.assertEqual(self.epargner(31).status_code, 422)
+
+    def test_reponse_enregistree_avec_le_mouvement(self):
+        self.epargner(30)
+        cle = CleIdempotence.objects.get()
+        self.assertEqual(cle.code_statut, 200)
+        self.assertEqual(cle.reponse, {"detail": "Epargne effectué avec succès"})
+
+    def test_erreur_libere_la_cle(self):
+        reponse = self.epargner(500)
+        self.assertEqual(reponse.status_code, 400)
+        self.assertFalse(CleIdempotence.objects.exists())
+        self.assertEqual(self.epargner(50).status_code, 200)
+        self.assertEqual(self.solde(self.courant), Decimal("50"))
+
+    def test_exception_annule_la_reservation(self):
+        with self.assertRaises(Exception):
+            self.client.post(
+                "/api/epargne/",
+                {"compte": self.courant.pk, "compte_epargne": self.epargne.pk},
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="cle-1",
+            )
+        self.assertFalse(CleIdempotence.objects.exists())
+
+    def test_reservation_sans_reponse_jamais_reexecutee(self):
+        CleIdempotence.objects.create(
+            utilisateur=self.alice, cle="cle-1", chemin="/api/epargne/", empreinte="x"
+        )
+        self.assertEqual(self.epargner(30).status_code, 409)
+        self.assertEqual(self.solde(self.courant), Decimal("100"))
+        self.assertFalse(Transaction.objects.exists())
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "partage": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "partage",
+        },
+    }
+)
+class CacheDjangoTests(TestCase):
+    def test_clear_limite_au_prefixe(self):
+        caches["partage"].set("autre", 1)
+        cache, voisin = CacheDjango("partage", "a"), CacheDjango("partage", "b")
+        cache.set("cle", 1)
+        voisin.set("cle", 2)
+        cache.clear()
+        self.assertIsNone(cache.get("cle"))
+        self.assertEqual(voisin.get("cle"), 2)
+        self.assertEqual(caches["partage"].get("autre"), 1)
+        cache.set("cle", 3)
+        self.assertEqual(cache.get("cle"), 3)
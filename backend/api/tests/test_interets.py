@@ -0,0 +1,60 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.approbations import approuver_en_lot
+from api.grand_livre import soldes_grand_livre
+from api.interets import fenetres, traiter_lot
+from api.models import CompteBancaire, CumulJournalier, Pret, Transaction
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+
+class InteretsTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        self.compte = creer_compte(self.alice, solde=0)
+        self.pret = Pret.objects.create(
+            compte=self.compte, motif="m", montant=1000, taux_annuel=Decimal("0.12")
+        )
+        approuver_en_lot("pret", [self.pret.pk], "approuve")
+        self.date = timezone.localdate() + timedelta(days=45)
+
+    def comptabiliser(self, date):
+        return [traiter_lot(debut, fin, date) for debut, fin in fenetres()]
+
+    def test_constat_sans_mouvement(self):
+        (resultat,) = self.comptabiliser(self.date)
+
+        self.assertEqual(resultat["transactions"], 1)
+        interets = Transaction.objects.get(type="interets")
+        self.assertEqual(interets.montant, resultat["interets"])
+        self.assertEqual(
+            Pret.objects.get(pk=self.pret.pk).interets_courus, interets.montant
+        )
+        # Ni écriture au grand livre ni effet sur le solde
+        self.assertFalse(interets.ecritures.exists())
+        solde = CompteBancaire.objects.get(pk=self.compte.pk).solde
+        self.assertEqual(solde, Decimal("1000"))
+        self.assertEqual(soldes_grand_livre([self.compte.pk])[self.compte.pk], solde)
+
+    def test_idempotent(self):
+        self.comptabiliser(self.date)
+        self.assertEqual(self.comptabiliser(self.date)[0]["transactions"], 0)
+        self.assertEqual(Transaction.objects.filter(type="interets").count(), 1)
+
+    def test_statistiques(self):
+        self.comptabiliser(self.date)
+        self.assertTrue(CumulJournalier.objects.filter(categorie="interets").exists())
+
+        reponse = client_api(creer_utilisateur("admin", role="admin")).get(
+            "/api/stats/", {"until": self.date.isoformat()}
+        )
+
+        self.assertEqual(reponse.status_code, 200)
+        # Le volume journalier ne compte que les mouvements de fonds
+        self.assertEqual(
+            sum(Decimal(jour["montant"]) for jour in reponse.data["par_jour"]), 0
+        )
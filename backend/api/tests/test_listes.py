@@ -0,0 +1,75 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Pret, Transaction
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+
+class NombreRequetesListesTests(TestCase):
+    """Les listes chargent leurs relations sans requête par ligne (N+1)"""
+
+    def setUp(self):
+        self.admin = creer_utilisateur("admin", "admin")
+        self.alice = creer_utilisateur("alice")
+        self.bob = creer_utilisateur("bob")
+        self.compte_alice = creer_compte(self.alice)
+        self.compte_bob = creer_compte(self.bob)
+
+    def ajouter(self, nombre):
+        for _ in range(nombre):
+            Transaction.objects.create(
+                compte_source=self.compte_alice,
+                compte_destination=self.compte_bob,
+                type="transfert",
+                montant=1,
+                status="succès",
+            )
+            Pret.objects.create(compte=self.compte_alice, motif="m", montant=1)
+            creer_compte(self.bob)
+
+    def compter(self, utilisateur, url):
+        client = client_api(utilisateur)
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = client.get(url)
+        self.assertEqual(reponse.status_code, 200, reponse.content)
+        return len(requetes)
+
+    def test_nombre_constant(self):
+        for url in ("/api/transactions/", "/api/comptes/", "/api/prets/"):
+            for utilisateur in (self.admin, self.alice):
+                with self.subTest(url=url, utilisateur=utilisateur.username):
+                    self.ajouter(2)
+                    petit = self.compter(utilisateur, url)
+                    self.ajouter(20)
+                    self.assertEqual(self.compter(utilisateur, url), petit)
+
+    def test_nombre_exact(self):
+        self.ajouter(10)
+        for url in ("/api/transactions/", "/api/comptes/", "/api/prets/"):
+            with self.subTest(url=url):
+                # L'authentification est forcée : une seule requête, la liste
+                with self.assertNumQueries(1):
+                    client_api(self.admin).get(url)
+
+
+class SerialisationRapideTests(TestCase):
+    def setUp(self):
+        self.admin = creer_utilisateur("admin", "admin")
+        compte = creer_compte(creer_utilisateur("alice"))
+        Transaction.objects.create(
+            compte_source=compte, type="depot", montant="12.50", status="succès"
+        )
+        Pret.objects.create(compte=compte, motif="m", montant="99.99")
+
+    def test_sortie_identique(self):
+        for url in ("/api/transactions/", "/api/comptes/", "/api/prets/"):
+            with self.subTest(url=url):
+                with override_settings(FAST_LIST_SERIALIZATION=True):
+                    rapide = client_api(self.admin).get(url)
+                lente = client_api(self.admin).get(url)
+                # Sans réglage, la liste passe par le serializer DRF
+                self.assertFalse(hasattr(rapide, "data"))
+                self.assertTrue(hasattr(lente, "data"))
+                self.assertEqual(rapide.content, lente.content)
@@ -0,0 +1,139 @@
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from api.mobile_money import calculer_frais, importer_reglements
+from api.models import CompteBancaire, ReglementImporte, Transaction
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+EN_TETE = (
+    "numero_compte,type_transaction,montant,fournisseur,numero_telephone,reference\n"
+)
+
+
+class FraisTests(TestCase):
+    def test_arrondi_au_centime(self):
+        self.assertEqual(
+            calculer_frais("mvola", "retrait", Decimal("100")), Decimal("0.80")
+        )
+        self.assertEqual(
+            calculer_frais("mvola", "depot", Decimal("10.50")), Decimal("0.03")
+        )
+        self.assertEqual(
+            calculer_frais("inconnu", "retrait", Decimal("3")), Decimal("0.03")
+        )
+
+    def test_commentaire(self):
+        alice = creer_utilisateur("alice")
+        compte = creer_compte(alice)
+        reponse = client_api(alice).post(
+            "/api/transactions/mobile-money/",
+            {
+                "compte": compte.pk,
+                "montant": "100",
+                "type_transaction": "retrait",
+                "fournisseur": "mvola",
+                "numero_telephone": "034",
+            },
+            format="json",
+        )
+        self.assertEqual(reponse.status_code, 201, reponse.content)
+        self.assertTrue(Transaction.objects.get().commentaire.endswith("Frais: 0.80"))
+        self.assertEqual(
+            CompteBancaire.objects.get(pk=compte.pk).solde, Decimal("899.20")
+        )
+
+
+class ImportReglementsTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        self.compte = creer_compte(self.alice, solde=0)
+
+    def fichier(self, *lignes):
+        numero = self.compte.numero_compte
+        return io.StringIO(
+            EN_TETE
+            + "".join(
+                f"{numero},{type_},{montant},mvola,034,{reference}\n"
+                for type_, montant, reference in lignes
+            )
+        )
+
+    def solde(self):
+        return CompteBancaire.objects.get(pk=self.compte.pk).solde
+
+    def test_reimport_ignore(self):
+        lignes = [
+            ("depot", "100", "R1"),
+            ("retrait", "500", "R2"),
+            ("depot", "1", "R1"),
+        ]
+        rapport = importer_reglements(self.fichier(*lignes), taille_lot=2)
+        self.assertEqual(
+            (rapport.reglees, rapport.rejetees, rapport.doublons), (1, 1, 1)
+        )
+        self.assertEqual(self.solde(), Decimal("99.70"))
+
+        rapport = importer_reglements(self.fichier(*lignes))
+        self.assertEqual(
+            (rapport.reglees, rapport.rejetees, rapport.doublons), (0, 0, 3)
+        )
+        self.assertEqual(self.solde(), Decimal("99.70"))
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(ReglementImporte.objects.count(), 2)
+
+    def test_reference_requise(self):
+        rapport = importer_reglements(self.fichier(("depot", "100", "")))
+        self.assertEqual((rapport.reglees, rapport.rejetees), (0, 1))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_reference_par_fournisseur(self):
+        importer_reglements(self.fichier(("depot", "100", "R1")))
+        autre = io.StringIO(
+            EN_TETE + f"{self.compte.numero_compte},depot,100,orange_money,034,R1\n"
+        )
+        self.assertEqual(importer_reglements(autre).reglees, 1)
+
+    def test_montants_invalides(self):
+        lignes = [
+            ("depot", montant, f"R{i}")
+            for i, montant in enumerate(
+                ["NaN", "sNaN", "Infinity", "-Infinity", "1e20", "0.004", "abc"]
+            )
+        ]
+        rapport = importer_reglements(self.fichier(*lignes, ("depot", "10.005", "OK")))
+        self.assertEqual((rapport.reglees, rapport.rejetees), (1, 7))
+        self.assertEqual(Transaction.objects.get().montant, Decimal("10.01"))
+
+    def test_import_concurrent(self):
+        autre = Transaction.objects.create(
+            compte_source=self.compte,
+            compte_destination=self.compte,
+            type="depot",
+            montant=1,
+        )
+        filtre = ReglementImporte.objects.filter
+
+        def concurrent(**criteres):
+            # L'autre import enregistre R1 juste après la lecture des doublons
+            resultat = list(filtre(**criteres).values_list("fournisseur", "reference"))
+            if not ReglementImporte.objects.exists():
+                ReglementImporte.objects.create(
+                    fournisseur="mvola", reference="R1", transaction=autre
+                )
+            return mock.Mock(values_list=lambda *champs: resultat)
+
+        with mock.patch.object(ReglementImporte.objects, "filter", concurrent):
+            rapport = importer_reglements(
+                self.fichier(("depot", "100", "R1"), ("depot", "50", "R2"))
+            )
+        self.assertEqual(
+            (rapport.reglees, rapport.rejetees, rapport.doublons), (1, 0, 1)
+        )
+        self.assertEqual(
+            self.solde(),
+            Decimal("50") - calculer_frais("mvola", "depot", Decimal("50")),
+        )
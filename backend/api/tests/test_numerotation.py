@@ -0,0 +1,80 @@
+from django.db import connection
+from django.db.transaction import atomic
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.models import CompteurNumero
+from api.numerotation import (
+    CHIFFRES,
+    PREFIXE,
+    AllocateurNumeros,
+    chiffre_controle,
+    formater,
+)
+
+
+def valide(numero):
+    """Contrôle de Luhn sur les chiffres du numéro, clé comprise"""
+    chiffres = numero.removeprefix(PREFIXE)
+    return chiffre_controle(int(chiffres[:-1])) == int(chiffres[-1])
+
+
+class LuhnTests(TestCase):
+    def test_valeurs_connues(self):
+        self.assertEqual(chiffre_controle(7992739871), 3)
+        self.assertEqual(chiffre_controle(0), 0)
+        self.assertEqual(formater(42), f"{PREFIXE}{'0' * (CHIFFRES - 2)}42" + "2")
+
+    def test_faute_de_frappe_detectee(self):
+        numero = formater(1234567)
+        self.assertTrue(valide(numero))
+        debut = len(PREFIXE)
+        for position in range(debut, len(numero)):
+            for chiffre in "0123456789":
+                if chiffre == numero[position]:
+                    continue
+                faux = numero[:position] + chiffre + numero[position + 1 :]
+                self.assertFalse(valide(faux), faux)
+
+    def test_ordre_alphabetique(self):
+        numeros = [formater(valeur) for valeur in (9, 10, 99, 100, 12345)]
+        self.assertEqual(sorted(numeros), numeros)
+
+
+class AllocateurTests(TestCase):
+    def test_blocs(self):
+        allocateur = AllocateurNumeros("test", taille_bloc=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocateur.allouer(2), [1, 2])
+        # Reste du bloc consommé en mémoire, sans requête
+        with CaptureQueriesContext(connection) as requetes:
+            self.assertEqual(allocateur.allouer(3), [3, 4, 5])
+        self.assertEqual(len(requetes), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocateur.allouer(7), list(range(6, 13)))
+        self.assertEqual(CompteurNumero.objects.get(nom="test").valeur, 12)
+
+    def test_processus_distincts(self):
+        premier = AllocateurNumeros("test", taille_bloc=3)
+        second = AllocateurNumeros("test", taille_bloc=3)
+        numeros = []
+        for _ in range(4):
+            with self.captureOnCommitCallbacks(execute=True):
+                numeros += premier.allouer(1) + second.allouer(2)
+        # Des trous possibles, jamais de doublons
+        self.assertEqual(len(set(numeros)), len(numeros))
+
+    def test_rollback(self):
+        allocateur = AllocateurNumeros("test", taille_bloc=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with atomic():
+                    annule = allocateur.allouer(1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        # Réservation annulée : le reste du bloc n'est pas conservé
+        self.assertFalse(CompteurNumero.objects.filter(nom="test").exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocateur.allouer(1), annule)
+        self.assertEqual(allocateur.allouer(4), [2, 3, 4, 5])
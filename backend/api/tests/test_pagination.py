@@ -0,0 +1,90 @@
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Transaction
+from api.pagination import TransactionCursorPagination
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+
+class FiltresTransactionsTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        creer_compte(self.alice)
+
+    def test_date_invalide(self):
+        client = client_api(self.alice)
+        for valeur in ("hier", "2024-02-30T00:00", "2024-13-01"):
+            with self.subTest(valeur=valeur):
+                reponse = client.get("/api/transactions/", {"since": valeur})
+                self.assertEqual(reponse.status_code, 400)
+                self.assertIn("since", reponse.data)
+        reponse = client.get("/api/transactions/", {"until": "2024-02-29T00:00Z"})
+        self.assertEqual(reponse.status_code, 200)
+
+
+class PaginationCurseurTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        compte = creer_compte(self.alice)
+        maintenant = timezone.now()
+        for rang in range(7):
+            transaction = Transaction.objects.create(
+                compte_source=compte, type="depot", montant=1, status="succès"
+            )
+            # Dates en double : l'id départage les égalités
+            Transaction.objects.filter(pk=transaction.pk).update(
+                date_transaction=maintenant - timedelta(seconds=rang // 3)
+            )
+
+    def test_aller_retour(self):
+        pagination = TransactionCursorPagination()
+        transaction = Transaction.objects.first()
+        curseur = pagination.encode_cursor(transaction)
+        self.assertEqual(
+            pagination.decode_cursor(curseur),
+            (transaction.date_transaction, transaction.pk),
+        )
+        self.assertEqual(
+            pagination.encode_cursor(
+                {"date_transaction": transaction.date_transaction, "id": transaction.pk}
+            ),
+            curseur,
+        )
+
+    def test_parcours_complet(self):
+        client = client_api(self.alice)
+        params, ids, pages = {"page_size": 2}, [], 0
+        while True:
+            reponse = client.get("/api/transactions/", params)
+            self.assertEqual(reponse.status_code, 200)
+            pages += 1
+            ids += [ligne["id"] for ligne in reponse.data["results"]]
+            if not reponse.data["next"]:
+                break
+            params = {
+                cle: valeurs[0]
+                for cle, valeurs in parse_qs(
+                    urlparse(reponse.data["next"]).query
+                ).items()
+            }
+
+        self.assertEqual(pages, 4)
+        self.assertEqual(
+            ids,
+            list(
+                Transaction.objects.order_by("-date_transaction", "-id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
+    def test_curseur_invalide(self):
+        client = client_api(self.alice)
+        for curseur in ("x", "bm9u", "MjAyNC0wMi0zMFQwMDowMHwx"):
+            with self.subTest(curseur=curseur):
+                reponse = client.get("/api/transactions/", {"cursor": curseur})
+                self.assertEqual(reponse.status_code, 404)
@@ -0,0 +1,51 @@
+import re
+
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.profilage import ProfilageMiddleware, registre
+
+from .outils import creer_compte, creer_utilisateur
+
+
+def requetes_sql(nom):
+    """Somme des requêtes SQL mesurées pour l'URL `nom`"""
+    trouve = re.search(
+        rf'api_request_db_queries_sum{{url_name="{nom}",method="GET"}} (\S+)',
+        registre.exposition(),
+    )
+    return float(trouve.group(1)) if trouve else None
+
+
+@override_settings(PROFILING_ENABLED=True)
+class ProfilageTests(TestCase):
+    def setUp(self):
+        registre.reinitialiser()
+        self.alice = creer_utilisateur("alice")
+        creer_compte(self.alice)
+        self.en_tete = {"Authorization": f"Bearer {AccessToken.for_user(self.alice)}"}
+
+    def tearDown(self):
+        registre.reinitialiser()
+
+    def test_synchrone_et_asynchrone(self):
+        def vue(request):
+            return HttpResponse()
+
+        async def vue_async(request):
+            return HttpResponse()
+
+        self.assertFalse(iscoroutinefunction(ProfilageMiddleware(vue)))
+        self.assertTrue(iscoroutinefunction(ProfilageMiddleware(vue_async)))
+
+    def test_vue_synchrone(self):
+        reponse = Client().get("/api/comptes/", headers=self.en_tete)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertGreater(requetes_sql("liste-comptes"), 0)
+
+    async def test_vue_asynchrone(self):
+        reponse = await AsyncClient().get("/api/async/comptes/", headers=self.en_tete)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertGreater(requetes_sql("liste-comptes-async"), 0)
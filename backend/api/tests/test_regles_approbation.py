@@ -0,0 +1,90 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api import regles_approbation
+from api.models import CompteBancaire, Pret
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+REGLES = {
+    "pret": [
+        ("exposition", "rejete", {"encours_min": Decimal("1000")}),
+        ("anciens", "approuve", {"anciennete_jours_min": 90}),
+    ],
+}
+
+
+class ReglesMixin:
+    def setUp(self):
+        regles_approbation.reinitialiser()
+        self.alice = creer_utilisateur("alice")
+        self.compte = creer_compte(self.alice, solde=0)
+        CompteBancaire.objects.filter(pk=self.compte.pk).update(
+            date_ouverture=timezone.now() - timedelta(days=100)
+        )
+
+    def tearDown(self):
+        regles_approbation.reinitialiser()
+
+    def demander(self, montant):
+        reponse = client_api(self.alice).post(
+            "/api/prets/demander/",
+            {"compte": self.compte.pk, "motif": "m", "montant": str(montant)},
+            format="json",
+        )
+        self.assertEqual(reponse.status_code, 201, reponse.content)
+        return reponse.data["statut"]
+
+
+@override_settings(APPROVAL_RULES=REGLES)
+class FaireUnPretTests(ReglesMixin, TestCase):
+    def test_encours(self):
+        self.assertEqual(self.demander(600), "en_cours")
+        # L'encours inclut la demande : 600 + 400 atteint la limite
+        self.assertEqual(self.demander(400), "rejeté")
+        self.assertEqual(self.demander(300), "en_cours")
+        self.assertEqual(
+            CompteBancaire.objects.get(pk=self.compte.pk).solde, Decimal("900")
+        )
+
+    def test_compte_recent(self):
+        compte = creer_compte(self.alice, solde=0)
+        reponse = client_api(self.alice).post(
+            "/api/prets/demander/",
+            {"compte": compte.pk, "motif": "m", "montant": "10"},
+            format="json",
+        )
+        self.assertEqual(reponse.data["statut"], "en_attente")
+
+
+@skipUnless(
+    connection.features.has_select_for_update, "Verrous de lignes non supportés"
+)
+@override_settings(APPROVAL_RULES=REGLES)
+class DemandesConcurrentesTests(ReglesMixin, TransactionTestCase):
+    def test_encours_non_depasse(self):
+        depart = threading.Barrier(4)
+        statuts = []
+
+        def demander():
+            try:
+                depart.wait()
+                statuts.append(self.demander(600))
+            finally:
+                connections.close_all()
+
+        fils = [threading.Thread(target=demander) for _ in range(4)]
+        for fil in fils:
+            fil.start()
+        for fil in fils:
+            fil.join()
+
+        # Une seule demande passe sous la limite de 1000
+        self.assertEqual(sorted(statuts), ["en_cours", "rejeté", "rejeté", "rejeté"])
+        self.assertEqual(Pret.objects.filter(statut="en_cours").count(), 1)
@@ -0,0 +1,45 @@
+import json
+
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.services import crediter, debiter
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+
+class ReleveCompteTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        self.compte = creer_compte(self.alice, solde=0)
+        crediter(self.compte.pk, "100")
+        debiter(self.compte.pk, "30")
+        self.url = f"/api/comptes/{self.compte.pk}/releve/"
+
+    def test_date_invalide(self):
+        client = client_api(self.alice)
+        for param in ("since", "until"):
+            for valeur in ("hier", "2024-02-30T00:00"):
+                with self.subTest(param=param, valeur=valeur):
+                    reponse = client.get(self.url, {param: valeur})
+                    self.assertEqual(reponse.status_code, 400)
+                    self.assertIn(param, reponse.data)
+
+    def test_wsgi(self):
+        reponse = client_api(self.alice).get(self.url)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertFalse(reponse.is_async)
+        lignes = b"".join(reponse.streaming_content).decode().splitlines()
+        self.assertEqual(len(lignes), 3)
+
+    async def test_asgi(self):
+        en_tete = {"Authorization": f"Bearer {AccessToken.for_user(self.alice)}"}
+        reponse = await self.async_client.get(
+            self.url, {"export": "jsonl"}, headers=en_tete
+        )
+        self.assertEqual(reponse.status_code, 200)
+        # Flux asynchrone : envoyé au fil de l'eau, sans tampon
+        self.assertTrue(reponse.is_async)
+        contenu = b"".join([morceau async for morceau in reponse.streaming_content])
+        soldes = [json.loads(ligne)["solde"] for ligne in contenu.splitlines()]
+        self.assertEqual(soldes, ["100.00", "70.00"])
@@ -0,0 +1,126 @@
+import tempfile
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.replicas import EcritureCollanteMiddleware, choisir_replica, ecritures_recentes
+
+from .outils import creer_compte, creer_utilisateur
+
+CACHE_FICHIERS = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(),
+    }
+}
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=CACHE_FICHIERS, DATABASE_REPLICAS=["replica1"])
+class ChoixReplicaTests(TestCase):
+    def setUp(self):
+        ecritures_recentes.clear()
+        self.alice = creer_utilisateur("alice")
+
+    def test_lecture_de_ses_ecritures(self):
+        self.assertEqual(choisir_replica(self.alice), "replica1")
+        self.assertEqual(choisir_replica(), "replica1")
+
+        ecritures_recentes.set(str(self.alice.pk), True)
+
+        self.assertIsNone(choisir_replica(self.alice))
+        self.assertEqual(choisir_replica(creer_utilisateur("bob")), "replica1")
+
+    @override_settings(CACHES=CACHE_LOCAL)
+    def test_cache_local(self):
+        # Une écriture marquée dans un autre processus ne serait pas vue
+        self.assertIsNone(choisir_replica(self.alice))
+        self.assertIsNone(choisir_replica())
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_sans_replica(self):
+        self.assertIsNone(choisir_replica(self.alice))
+
+
+@override_settings(CACHES=CACHE_FICHIERS)
+class EcritureCollanteMiddlewareTests(TestCase):
+    def setUp(self):
+        ecritures_recentes.clear()
+        self.alice = creer_utilisateur("alice")
+
+    def requete(self, methode):
+        request = getattr(RequestFactory(), methode)("/")
+        request.user = self.alice
+        return request
+
+    def test_synchrone(self):
+        middleware = EcritureCollanteMiddleware(lambda request: HttpResponse())
+        self.assertFalse(iscoroutinefunction(middleware))
+
+        middleware(self.requete("get"))
+        self.assertIsNone(ecritures_recentes.get(str(self.alice.pk)))
+        middleware(self.requete("post"))
+        self.assertTrue(ecritures_recentes.get(str(self.alice.pk)))
+
+    def test_asynchrone(self):
+        async def vue(request):
+            return HttpResponse()
+
+        middleware = EcritureCollanteMiddleware(vue)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        async_to_sync(middleware)(self.requete("get"))
+        self.assertIsNone(ecritures_recentes.get(str(self.alice.pk)))
+        async_to_sync(middleware)(self.requete("post"))
+        self.assertTrue(ecritures_recentes.get(str(self.alice.pk)))
+
+
+@override_settings(CACHES=CACHE_FICHIERS, DATABASE_REPLICAS=["replica1"])
+class RoutageReplicasTests(TransactionTestCase):
+    # replica1 : miroir de la base de test (config.settings)
+    # Hors TestCase : une transaction ouverte garde les lectures sur le primaire
+    databases = {"default", "replica1"}
+
+    def setUp(self):
+        ecritures_recentes.clear()
+        self.alice = creer_utilisateur("alice")
+        creer_compte(self.alice)
+
+    def get(self, url, utilisateur):
+        en_tete = {"Authorization": f"Bearer {AccessToken.for_user(utilisateur)}"}
+        with CaptureQueriesContext(
+            connections["default"]
+        ) as primaire, CaptureQueriesContext(connections["replica1"]) as replica:
+            reponse = Client().get(url, headers=en_tete)
+        self.assertEqual(reponse.status_code, 200)
+        return len(primaire), len(replica)
+
+    def test_lectures_sur_le_replica(self):
+        primaire, replica = self.get("/api/comptes/", self.alice)
+        self.assertGreater(replica, 0)
+        # Seule l'authentification lit l'utilisateur sur le primaire
+        self.assertLessEqual(primaire, 1)
+
+    def test_lecture_apres_ecriture(self):
+        reponse = Client().post(
+            "/api/comptes/creer/",
+            {"type_compte": "epargne"},
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.alice)}"},
+        )
+        self.assertEqual(reponse.status_code, 201, reponse.content)
+
+        primaire, replica = self.get("/api/comptes/", self.alice)
+        self.assertEqual(replica, 0)
+        self.assertGreater(primaire, 0)
+        # Les autres utilisateurs lisent toujours sur le réplica
+        self.assertGreater(self.get("/api/comptes/", creer_utilisateur("bob"))[1], 0)
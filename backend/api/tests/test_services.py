@@ -0,0 +1,135 @@
+import threading
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from api.grand_livre import soldes_grand_livre
+from api.models import CompteBancaire, EcritureComptable
+from api.services import SoldeInsuffisant, crediter, debiter, transferer
+
+from .outils import creer_compte, creer_utilisateur
+
+
+def solde(compte):
+    return CompteBancaire.objects.get(pk=compte.pk).solde
+
+
+class ServicesTests(TestCase):
+    def setUp(self):
+        alice = creer_utilisateur("alice")
+        self.compte = creer_compte(alice, solde=0)
+        self.autre = creer_compte(alice, solde=0)
+        crediter(self.compte.pk, "100")
+
+    def test_debit_conditionnel(self):
+        with self.assertRaises(SoldeInsuffisant):
+            debiter(self.compte.pk, "100.01")
+        # Refusé par la condition de l'UPDATE : ni solde ni écriture modifiés
+        self.assertEqual(solde(self.compte), Decimal("100"))
+        self.assertEqual(EcritureComptable.objects.count(), 2)
+
+        self.assertEqual(debiter(self.compte.pk, "100"), Decimal("0"))
+        self.assertEqual(solde(self.compte), Decimal("0"))
+
+    def test_montant(self):
+        self.assertEqual(crediter(self.compte.pk, "0.005"), Decimal("100.01"))
+        for montant in ("0", "-1", "0.004"):
+            with self.subTest(montant=montant):
+                with self.assertRaises(ValidationError):
+                    debiter(self.compte.pk, montant)
+        with self.assertRaises(CompteBancaire.DoesNotExist):
+            crediter(0, "1")
+        with self.assertRaises(CompteBancaire.DoesNotExist):
+            debiter(0, "1")
+
+    def test_transfert(self):
+        with self.assertRaises(SoldeInsuffisant):
+            transferer(self.compte.pk, self.autre.pk, "101")
+        with self.assertRaises(ValidationError):
+            transferer(self.compte.pk, str(self.compte.pk), "1")
+
+        self.assertEqual(
+            transferer(self.compte.pk, self.autre.pk, "40"),
+            (Decimal("60"), Decimal("40")),
+        )
+        self.assertEqual(
+            soldes_grand_livre([self.compte.pk, self.autre.pk]),
+            {self.compte.pk: Decimal("60"), self.autre.pk: Decimal("40")},
+        )
+
+    def test_ordre_des_verrous(self):
+        # Virement du compte le plus récent vers le plus ancien : les verrous
+        # sont tout de même pris par clé croissante
+        transferer(self.compte.pk, self.autre.pk, "50")
+        with CaptureQueriesContext(connection) as requetes:
+            transferer(self.autre.pk, self.compte.pk, "10")
+        (verrou,) = [
+            requete["sql"]
+            for requete in requetes
+            if requete["sql"].startswith("SELECT")
+            and "api_comptebancaire" in requete["sql"]
+        ]
+        self.assertIn(
+            f'ORDER BY "api_comptebancaire"."{CompteBancaire._meta.pk.column}" ASC',
+            verrou,
+        )
+
+
+@skipUnless(
+    connection.features.has_select_for_update, "Verrous de lignes non supportés"
+)
+class ConcurrenceTests(TransactionTestCase):
+    def setUp(self):
+        alice = creer_utilisateur("alice")
+        self.a = creer_compte(alice, solde=0)
+        self.b = creer_compte(alice, solde=0)
+        crediter(self.a.pk, "100")
+        crediter(self.b.pk, "100")
+
+    def executer(self, fonctions):
+        depart = threading.Barrier(len(fonctions))
+        resultats = []
+
+        def lancer(fonction):
+            try:
+                depart.wait()
+                fonction()
+                resultats.append(True)
+            except SoldeInsuffisant:
+                resultats.append(False)
+            finally:
+                connections.close_all()
+
+        fils = [threading.Thread(target=lancer, args=(f,)) for f in fonctions]
+        for fil in fils:
+            fil.start()
+        for fil in fils:
+            fil.join()
+        return resultats
+
+    def test_credits_sans_perte(self):
+        self.executer([lambda: crediter(self.a.pk, "1")] * 20)
+        self.assertEqual(solde(self.a), Decimal("120"))
+        self.assertEqual(soldes_grand_livre([self.a.pk])[self.a.pk], Decimal("120"))
+
+    def test_debits_jamais_negatifs(self):
+        resultats = self.executer([lambda: debiter(self.a.pk, "30")] * 8)
+        self.assertEqual(resultats.count(True), 3)
+        self.assertEqual(solde(self.a), Decimal("10"))
+
+    def test_virements_croises(self):
+        # A→B et B→A en même temps : sans ordre des verrous, interblocage
+        fonctions = [
+            lambda: transferer(self.a.pk, self.b.pk, "5"),
+            lambda: transferer(self.b.pk, self.a.pk, "5"),
+        ] * 10
+        self.assertEqual(self.executer(fonctions), [True] * 20)
+        self.assertEqual(solde(self.a) + solde(self.b), Decimal("200"))
+        self.assertEqual(
+            soldes_grand_livre([self.a.pk, self.b.pk]),
+            {self.a.pk: solde(self.a), self.b.pk: solde(self.b)},
+        )
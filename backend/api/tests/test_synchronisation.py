@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import CompteBancaire, Pret, Transaction
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=10)
+class SynchronisationTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        self.compte = creer_compte(self.alice)
+        self.autre = creer_compte(creer_utilisateur("bob"))
+        for _ in range(5):
+            Transaction.objects.create(
+                compte_source=self.compte,
+                compte_destination=self.autre,
+                type="transfert",
+                montant=1,
+                status="en_attente",
+            )
+        Pret.objects.create(compte=self.compte, motif="m", montant=10)
+        self.vieillir()
+
+    def vieillir(self, secondes=60, modele=None, **filtres):
+        """Recule la date de modification : hors de la marge relue"""
+        date = timezone.now() - timedelta(seconds=secondes)
+        for classe in [modele] if modele else [CompteBancaire, Transaction, Pret]:
+            classe.objects.filter(**filtres).update(date_modification=date)
+
+    def synchroniser(self, **params):
+        reponse = client_api(self.alice).get("/api/sync/", params)
+        self.assertEqual(reponse.status_code, 200, reponse.content)
+        return reponse.data
+
+    @staticmethod
+    def ids(lignes):
+        return sorted(ligne["id"] for ligne in lignes)
+
+    def test_complet_puis_increment(self):
+        donnees = self.synchroniser()
+        self.assertEqual(len(donnees["transactions"]), 5)
+        self.assertEqual(self.ids(donnees["comptes"]), [self.compte.pk])
+        self.assertTrue(donnees["complet"])
+
+        donnees = self.synchroniser(depuis=donnees["jeton"])
+        self.assertEqual(
+            (donnees["comptes"], donnees["transactions"], donnees["prets"]),
+            ([], [], []),
+        )
+
+        transaction = Transaction.objects.order_by("pk").first()
+        Transaction.objects.filter(pk=transaction.pk).update(status="succès")
+        donnees = self.synchroniser(depuis=donnees["jeton"])
+        self.assertEqual(self.ids(donnees["transactions"]), [transaction.pk])
+        self.assertEqual(donnees["transactions"][0]["status"], "succès")
+
+    def test_validation_tardive(self):
+        jeton = self.synchroniser()["jeton"]
+        # Modifiée avant l'appel précédent, mais validée après : dans la marge
+        transaction = Transaction.objects.order_by("pk").last()
+        Transaction.objects.filter(pk=transaction.pk).update(status="succès")
+        self.vieillir(5, Transaction, pk=transaction.pk)
+
+        donnees = self.synchroniser(depuis=jeton)
+        self.assertEqual(self.ids(donnees["transactions"]), [transaction.pk])
+        # Relue tant qu'elle est dans la marge : le client remplace par id
+        donnees = self.synchroniser(depuis=donnees["jeton"])
+        self.assertEqual(self.ids(donnees["transactions"]), [transaction.pk])
+
+    def test_pages(self):
+        ids, jeton, appels = [], None, 0
+        while True:
+            params = {"limite": 2}
+            if jeton:
+                params["depuis"] = jeton
+            donnees = self.synchroniser(**params)
+            appels += 1
+            ids += [ligne["id"] for ligne in donnees["transactions"]]
+            jeton = donnees["jeton"]
+            if donnees["complet"]:
+                break
+
+        self.assertEqual(appels, 3)
+        self.assertEqual(
+            ids, list(Transaction.objects.order_by("pk").values_list("pk", flat=True))
+        )
+        # Synchronisation complète : les lignes hors de la marge ne sont plus lues
+        self.assertEqual(self.synchroniser(depuis=jeton)["transactions"], [])
+
+    def test_comptes_supprimes(self):
+        jeton = self.synchroniser()["jeton"]
+        self.assertEqual(self.synchroniser(depuis=jeton)["comptes_supprimes"], [])
+
+        compte = creer_compte(self.alice)
+        identifiant = compte.pk
+        compte.delete()
+        self.autre.delete()  # compte de bob : pas dans la réponse d'alice
+
+        donnees = self.synchroniser(depuis=jeton)
+        self.assertEqual(donnees["comptes_supprimes"], [identifiant])
+
+    def test_transactions_de_la_contrepartie(self):
+        jeton = self.synchroniser()["jeton"]
+        ids = list(Transaction.objects.values_list("pk", flat=True))
+        self.assertEqual(self.synchroniser(depuis=jeton)["transactions_supprimees"], [])
+
+        # Compte de bob : ses transactions avec alice disparaissent en cascade
+        self.autre.delete()
+
+        donnees = self.synchroniser(depuis=jeton)
+        self.assertEqual(donnees["comptes_supprimes"], [])
+        self.assertEqual(donnees["transactions_supprimees"], sorted(ids))
+        bob = client_api(self.autre.utilisateur).get("/api/sync/", {"depuis": jeton})
+        self.assertEqual(bob.data["transactions_supprimees"], [])
+
+    def test_jeton_invalide(self):
+        reponse = client_api(self.alice).get("/api/sync/", {"depuis": "x"})
+        self.assertEqual(reponse.status_code, 400)
+        reponse = client_api(self.alice).get("/api/sync/", {"limite": "0"})
+        self.assertEqual(reponse.status_code, 400)
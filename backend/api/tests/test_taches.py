@@ -0,0 +1,135 @@
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api import taches
+from api.models import Tache
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+
+class TachesTestMixin:
+    """Tâches de test enregistrées le temps du test seulement"""
+
+    def enregistrer(self, nom, fonction):
+        taches.tache(nom)(fonction)
+        self.addCleanup(taches.TACHES.pop, nom)
+
+    def executer_disponibles(self):
+        # `travailler` ferme la connexion : réservé aux TransactionTestCase
+        return [taches.executer(tache) for tache in taches.reclamer("t", 10)]
+
+
+class FileTachesTests(TachesTestMixin, TestCase):
+    def test_execution(self):
+        tache = taches.differer("ping", valeur=1)
+        self.assertEqual(self.executer_disponibles(), ["terminee"])
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.resultat), ("terminee", {"valeur": 1}))
+
+    def test_reprises(self):
+        def echec():
+            raise RuntimeError("panne")
+
+        self.enregistrer("echec", echec)
+        tache = taches.differer("echec", max_tentatives=2)
+
+        self.executer_disponibles()
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), ("en_attente", 1))
+        self.assertGreater(tache.disponible_le, timezone.now())
+
+        Tache.objects.filter(pk=tache.pk).update(disponible_le=timezone.now())
+        self.executer_disponibles()
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), ("echouee", 2))
+        self.assertIn("panne", tache.erreur)
+
+    def test_tache_bloquee(self):
+        tache = taches.differer("ping")
+        (reservee,) = taches.reclamer("arrete")
+        Tache.objects.filter(pk=tache.pk).update(
+            reclamee_le=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(taches.liberer_bloquees(), 1)
+        # L'issue de l'ancien travailleur est ignorée
+        self.assertIsNone(taches.executer(reservee))
+        (reprise,) = taches.reclamer("vivant")
+        self.assertEqual(taches.executer(reprise), "terminee")
+
+    def test_reservation_renouvelee(self):
+        tache = taches.differer("ping")
+        taches.reclamer("vivant")
+        Tache.objects.filter(pk=tache.pk).update(
+            reclamee_le=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(taches.renouveler("vivant"), 1)
+        self.assertEqual(taches.liberer_bloquees(), 0)
+
+
+@override_settings(JOB_QUEUE_HEARTBEAT_INTERVAL=0.05)
+class BattementTests(TachesTestMixin, TransactionTestCase):
+    def test_tache_longue(self):
+        self.enregistrer("longue", lambda: time.sleep(0.5))
+        tache = taches.differer("longue")
+
+        taches.travailler("t", threading.Event(), une_fois=True)
+
+        tache.refresh_from_db()
+        self.assertEqual(tache.statut, "terminee")
+        # Réservation renouvelée pendant l'exécution
+        self.assertGreater(
+            tache.reclamee_le - tache.date_creation, timedelta(seconds=0.1)
+        )
+
+
+class ReleveDiffereTests(TachesTestMixin, TestCase):
+    def setUp(self):
+        self.prive = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.prive)
+        stockages = {
+            **settings.STORAGES,
+            "prive": {
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+                "OPTIONS": {"location": self.prive},
+            },
+        }
+        self.enterContext(override_settings(STORAGES=stockages))
+        self.alice = creer_utilisateur("alice")
+        self.compte = creer_compte(self.alice)
+
+    def test_fichier_prive(self):
+        client = client_api(self.alice)
+        reponse = client.get(f"/api/comptes/{self.compte.pk}/releve/?asynchrone=1")
+        self.assertEqual(reponse.status_code, 202)
+        identifiant = reponse.data["id"]
+        self.assertEqual(
+            client.get(f"/api/taches/{identifiant}/fichier/").status_code, 404
+        )
+
+        self.assertEqual(self.executer_disponibles(), ["terminee"])
+
+        resultat = client.get(f"/api/taches/{identifiant}/").data["resultat"]
+        self.assertEqual(list(resultat), ["fichier"])
+        self.assertFalse(resultat["fichier"].startswith(settings.MEDIA_ROOT))
+
+        reponse = client.get(f"/api/taches/{identifiant}/fichier/")
+        self.assertEqual(reponse.status_code, 200)
+        self.assertTrue(b"".join(reponse.streaming_content).startswith(b"date,"))
+
+        autre = client_api(creer_utilisateur("bob"))
+        self.assertEqual(
+            autre.get(f"/api/taches/{identifiant}/fichier/").status_code, 404
+        )
+        admin = client_api(creer_utilisateur("admin", "admin"))
+        self.assertEqual(
+            admin.get(f"/api/taches/{identifiant}/fichier/").status_code, 200
+        )
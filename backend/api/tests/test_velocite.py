@@ -0,0 +1,107 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import velocite
+from api.models import Transaction
+from api.velocite import MoteurVelocite
+
+from .outils import client_api, creer_compte, creer_utilisateur
+
+# Au plus deux virements par compte et par heure
+REGLES = [("compte", 3600, Decimal("1000000"), 2)]
+
+
+class MoteurVelociteTests(TestCase):
+    def setUp(self):
+        self.alice = creer_utilisateur("alice")
+        self.source = creer_compte(self.alice)
+        self.destination = creer_compte(creer_utilisateur("bob"))
+        self.moteur = MoteurVelocite(REGLES, intervalle_synchro=0, recouvrement=30)
+
+    def virement(self, type_transaction="transfert", status="en_attente"):
+        return Transaction.objects.create(
+            compte_source=self.source,
+            compte_destination=self.destination,
+            type=type_transaction,
+            montant=10,
+            status=status,
+        )
+
+    def evaluer(self):
+        return self.moteur.evaluer(self.source.pk, self.alice.pk, Decimal("10"))
+
+    def test_amorcage_et_autres_processus(self):
+        self.virement()
+        self.virement(status="échoué")
+        self.assertEqual(self.evaluer().motifs, [])
+        # Virement d'un autre processus, lu à la relecture suivante
+        self.virement()
+        self.assertIn("plus de 2", self.evaluer().motifs[0])
+
+    def test_virement_local_compte_une_fois(self):
+        controle = self.evaluer()
+        self.moteur.confirmer(self.virement().pk)
+        self.assertEqual(controle.motifs, [])
+        self.assertEqual(self.evaluer().motifs, [])
+        self.assertIn("plus de 2", self.evaluer().motifs[0])
+
+    def test_validation_tardive(self):
+        # Virement créé avant une relecture mais validé après : sa clé est
+        # déjà dépassée, seule sa date le fait relire
+        tardif = self.virement("depot")
+        self.evaluer()
+        Transaction.objects.filter(pk=tardif.pk).update(
+            type="transfert", date_transaction=timezone.now() - timedelta(seconds=5)
+        )
+        self.assertIn("plus de 2", self.evaluer().motifs[0])
+
+    def test_cles_bornees(self):
+        ancien = self.virement()
+        Transaction.objects.filter(pk=ancien.pk).update(
+            date_transaction=timezone.now() - timedelta(minutes=10)
+        )
+        self.evaluer()
+        # Compté, mais trop ancien pour être relu : sa clé est oubliée
+        self.assertNotIn(ancien.pk, self.moteur._vus)
+        self.moteur.confirmer(self.virement().pk)
+        self.assertEqual(len(self.moteur._vus), 1)
+
+
+@override_settings(VELOCITY_RULES=REGLES, VELOCITY_SYNC_INTERVAL=0)
+class EffectuerTransactionTests(TestCase):
+    def setUp(self):
+        velocite.reinitialiser()
+        self.alice = creer_utilisateur("alice")
+        self.source = creer_compte(self.alice)
+        self.destination = creer_compte(creer_utilisateur("bob"))
+
+    def tearDown(self):
+        velocite.reinitialiser()
+
+    def post(self, type_transaction):
+        return client_api(self.alice).post(
+            "/api/transactions/create/",
+            {
+                "compte_source": self.source.pk,
+                "compte_destination": self.destination.pk,
+                "type": type_transaction,
+                "montant": "10",
+                "status": "succès",
+            },
+            format="json",
+        )
+
+    def test_toujours_un_virement(self):
+        for type_transaction in ("depot", "retrait", "pret"):
+            with self.subTest(type=type_transaction):
+                reponse = self.post(type_transaction)
+                self.assertEqual(reponse.status_code, 201, reponse.content)
+                self.assertEqual(reponse.data["type"], "transfert")
+        # Chaque virement est compté par la vélocité, une seule fois
+        self.assertEqual(
+            list(Transaction.objects.values_list("status", flat=True).order_by("pk")),
+            ["succès", "succès", "en_attente"],
+        )
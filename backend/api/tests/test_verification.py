@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from api.verification import (
+    cache_verification,
+    donnees_verification,
+    invalider_verification,
+)
+
+from .outils import creer_compte, creer_utilisateur
+
+
+class InvaliderVerificationTests(TestCase):
+    def setUp(self):
+        cache_verification.clear()
+        self.compte = creer_compte(creer_utilisateur("alice"))
+
+    def test_invalidation_comptee_une_fois(self):
+        numero = self.compte.numero_compte
+        donnees_verification(numero)
+        avant = cache_verification.invalidations
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalider_verification([numero])
+            # Retiré aussitôt, compté seulement au commit
+            self.assertEqual(cache_verification.invalidations, avant)
+            echecs = cache_verification.echecs
+            # Lecture concurrente : remise en cache avant le commit
+            donnees_verification(numero)
+            self.assertEqual(cache_verification.echecs, echecs + 1)
+
+        self.assertEqual(cache_verification.invalidations, avant + 1)
+        # La valeur remise en cache avant le commit est retirée
+        echecs = cache_verification.echecs
+        donnees_verification(numero)
+        self.assertEqual(cache_verification.echecs, echecs + 1)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import views, vues_async
 
 urlpatterns = [
     # Authentification
@@ -19,6 +19,11 @@ urlpatterns = [
         views.DetailCompteBancaireClient.as_view(),
         name="detail-compte",
     ),
+    path(
+        "comptes/<int:pk>/releve/",
+        views.ReleveCompte.as_view(),
+        name="releve-compte",
+    ),
     # Prêts
     path("prets/", views.ListePret.as_view(), name="liste-prets"),
     path("prets/demander/", views.FaireUnPret.as_view(), name="demander-pret"),
@@ -27,11 +32,22 @@ urlpatterns = [
         views.RembourserPret.as_view(),
         name="rembourser-pret",
     ),
+    path(
+        "prets/<int:pk>/echeancier/",
+        views.EcheancierPret.as_view(),
+        name="echeancier-pret",
+    ),
     path(
         "prets/<int:pk>/approuver/",
         views.ApprouverRejeterPret.as_view(),
         name="approuver-rejeter-pret",
     ),
+    # Approbations groupées
+    path(
+        "approbations/",
+        views.ApprobationGroupee.as_view(),
+        name="approbations-groupees",
+    ),
     # Transactions
     path(
         "transactions/create/",
@@ -48,9 +64,38 @@ urlpatterns = [
         views.MobileMoneyTransactionView.as_view(),
         name="mobile-money-transaction",
     ),
+    path(
+        "transactions/mobile-money/reglements/",
+        views.ImportReglementsMobileMoney.as_view(),
+        name="import-reglements-mobile-money",
+    ),
     path("transactions/", views.ListTransaction.as_view(), name="liste-transactions"),
     path("verify-account/", views.verify_account, name="verify-account"),
     path("user-info/", views.UserInfo.as_view(), name="user-info"),
+    path("stats/", views.Statistiques.as_view(), name="statistiques"),
+    path("metrics/", views.Metriques.as_view(), name="metriques"),
+    path("sync/", views.Synchronisation.as_view(), name="synchronisation"),
+    path("taches/<int:pk>/", views.SuiviTache.as_view(), name="suivi-tache"),
+    path(
+        "taches/<int:pk>/fichier/",
+        views.FichierTache.as_view(),
+        name="fichier-tache",
+    ),
+    # Variantes asynchrones des endpoints de lecture (servies sous ASGI)
+    path(
+        "async/transactions/",
+        vues_async.liste_transactions,
+        name="liste-transactions-async",
+    ),
+    path("async/comptes/", vues_async.liste_comptes, name="liste-comptes-async"),
+    path("async/prets/", vues_async.liste_prets, name="liste-prets-async"),
+    path("async/user-info/", vues_async.user_info, name="user-info-async"),
+    path("async/evenements/", vues_async.evenements, name="evenements"),
+    path(
+        "async/verify-account/",
+        vues_async.verify_account,
+        name="verify-account-async",
+    ),
     # Epargne
     path(
         "epargne/",
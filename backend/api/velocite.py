@@ -0,0 +1,264 @@
+import threading
+import time
+from array import array
+from datetime import timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Transaction
+
+
+class Regle(NamedTuple):
+    """Limite sur une fenêtre glissante, par compte source ou par utilisateur"""
+
+    portee: str  # "compte" ou "utilisateur"
+    duree: int  # secondes
+    montant_max: Decimal
+    nombre_max: int
+
+
+class Fenetre:
+    """
+    Anneau de `seaux` seaux couvrant `duree` secondes.
+
+    Chaque seau garde l'époque (instant // largeur) qu'il cumule : un seau
+    d'une époque sortie de la fenêtre compte pour zéro et est réutilisé sans
+    remise à zéro préalable. La fenêtre est donc glissante à un seau près.
+    Montants en centimes.
+    """
+
+    __slots__ = ("largeur", "montants", "nombres", "epoques")
+
+    def __init__(self, duree, seaux):
+        self.largeur = duree / seaux
+        self.montants = array("q", bytes(8 * seaux))
+        self.nombres = array("q", bytes(8 * seaux))
+        self.epoques = array("q", [-1]) * seaux
+
+    def ajouter(self, instant, centimes, nombre=1):
+        epoque = int(instant // self.largeur)
+        index = epoque % len(self.epoques)
+        if self.epoques[index] == epoque:
+            self.montants[index] += centimes
+            self.nombres[index] += nombre
+        elif self.epoques[index] < epoque:
+            self.epoques[index] = epoque
+            self.montants[index] = centimes
+            self.nombres[index] = nombre
+        # Sinon l'instant est antérieur à la fenêtre : ignoré
+
+    def totaux(self, instant):
+        epoque = int(instant // self.largeur)
+        premiere = epoque - len(self.epoques)
+        montant = nombre = 0
+        for index, epoque_seau in enumerate(self.epoques):
+            if premiere < epoque_seau <= epoque:
+                montant += self.montants[index]
+                nombre += self.nombres[index]
+        return montant, nombre
+
+    def expiree(self, instant):
+        return max(self.epoques) <= int(instant // self.largeur) - len(self.epoques)
+
+
+class Decision(NamedTuple):
+    """Résultat du contrôle d'un virement ; `motifs` vide : exécution immédiate"""
+
+    motifs: list
+    cles: list
+    instant: float
+    centimes: int
+
+
+def _centimes(montant):
+    return int(Decimal(montant).scaleb(2))
+
+
+class MoteurVelocite:
+    """
+    Compteurs glissants des virements par compte source et par utilisateur.
+
+    Le moteur vit dans le processus. Il est amorcé au premier contrôle par les
+    virements des fenêtres en cours (hors échecs), puis relit au plus toutes
+    les `intervalle_synchro` secondes les virements créés depuis, pour tenir
+    compte des autres processus. Chaque relecture recule de `recouvrement`
+    secondes avant la précédente : un virement daté avant elle mais validé
+    après est encore lu. Les virements déjà comptés sont reconnus par leur
+    clé, gardée le temps du recouvrement seulement. Les virements contrôlés
+    ici sont comptés dès le contrôle, acceptés ou non, et leur clé est
+    retenue par `confirmer` avant leur validation.
+    """
+
+    def __init__(
+        self,
+        regles,
+        seaux=12,
+        plafond_unitaire=None,
+        intervalle_synchro=1.0,
+        recouvrement=10,
+    ):
+        self.regles = [Regle(*regle) for regle in regles]
+        self._limites = [_centimes(regle.montant_max) for regle in self.regles]
+        self.seaux = seaux
+        self.plafond_unitaire = plafond_unitaire
+        self.intervalle_synchro = intervalle_synchro
+        self.recouvrement = recouvrement
+        self.duree_max = max((regle.duree for regle in self.regles), default=0)
+        self.decisions = {"automatique": 0, "controle": 0}
+        self._fenetres = {}
+        # Clé -> date (timestamp) des virements comptés encore relisibles
+        self._vus = {}
+        self._depuis = None
+        self._derniere_synchro = 0.0
+        self._enregistrements = 0
+        self._verrou = threading.Lock()
+
+    def _cles(self, compte_id, utilisateur_id):
+        ids = {"compte": compte_id, "utilisateur": utilisateur_id}
+        return [(index, ids[regle.portee]) for index, regle in enumerate(self.regles)]
+
+    def _ajouter(self, cles, instant, centimes, nombre=1):
+        for cle in cles:
+            fenetre = self._fenetres.get(cle)
+            if fenetre is None:
+                fenetre = Fenetre(self.regles[cle[0]].duree, self.seaux)
+                self._fenetres[cle] = fenetre
+            fenetre.ajouter(instant, centimes, nombre)
+        self._enregistrements += 1
+        if self._enregistrements % 10000 == 0:
+            self._purger(instant)
+
+    def _purger(self, instant):
+        for cle in [
+            cle for cle, fenetre in self._fenetres.items() if fenetre.expiree(instant)
+        ]:
+            del self._fenetres[cle]
+
+    def synchroniser(self):
+        """Ajoute les virements enregistrés depuis la dernière lecture"""
+        maintenant = timezone.now()
+        if self._depuis is None:
+            # Amorçage : virements des fenêtres en cours
+            debut = maintenant - timedelta(seconds=self.duree_max)
+        else:
+            debut = self._depuis - timedelta(seconds=self.recouvrement)
+        virements = (
+            Transaction.objects.filter(type="transfert", date_transaction__gte=debut)
+            .exclude(status="échoué")
+            .order_by("date_transaction", "pk")
+        )
+        for pk, compte_id, utilisateur_id, montant, date in virements.values_list(
+            "pk",
+            "compte_source_id",
+            "compte_source__utilisateur_id",
+            "montant",
+            "date_transaction",
+        ).iterator(chunk_size=5000):
+            if pk in self._vus:
+                continue
+            self._vus[pk] = date.timestamp()
+            self._ajouter(
+                self._cles(compte_id, utilisateur_id),
+                date.timestamp(),
+                _centimes(montant),
+            )
+        self._depuis = maintenant
+        # Les virements datés avant la prochaine lecture ne seront plus relus
+        limite = (maintenant - timedelta(seconds=self.recouvrement)).timestamp()
+        self._vus = {pk: date for pk, date in self._vus.items() if date >= limite}
+        self._derniere_synchro = time.monotonic()
+
+    def evaluer(self, compte_id, utilisateur_id, montant):
+        """
+        Contrôle un virement et le compte aussitôt dans les fenêtres.
+
+        Retourne une `Decision` à passer à `confirmer` une fois le virement
+        enregistré, ou à `annuler` s'il échoue.
+        """
+        instant = time.time()
+        centimes = _centimes(montant)
+        cles = self._cles(compte_id, utilisateur_id)
+        motifs = []
+        if self.plafond_unitaire is not None and montant > self.plafond_unitaire:
+            motifs.append(f"montant unitaire > {self.plafond_unitaire}")
+
+        with self._verrou:
+            if time.monotonic() - self._derniere_synchro >= self.intervalle_synchro:
+                self.synchroniser()
+            for regle, limite, cle in zip(self.regles, self._limites, cles):
+                fenetre = self._fenetres.get(cle)
+                montant_fenetre, nombre = (
+                    fenetre.totaux(instant) if fenetre is not None else (0, 0)
+                )
+                if montant_fenetre + centimes > limite:
+                    motifs.append(
+                        f"{regle.portee} : montant > {regle.montant_max} "
+                        f"sur {regle.duree} s"
+                    )
+                if nombre + 1 > regle.nombre_max:
+                    motifs.append(
+                        f"{regle.portee} : plus de {regle.nombre_max} virements "
+                        f"sur {regle.duree} s"
+                    )
+            self._ajouter(cles, instant, centimes)
+            self.decisions["controle" if motifs else "automatique"] += 1
+        return Decision(motifs, cles, instant, centimes)
+
+    def confirmer(self, transaction_id):
+        """
+        Le virement est enregistré : la relecture ne doit pas le recompter.
+
+        À appeler avant la validation de la transaction qui l'enregistre, pour
+        qu'aucune relecture ne le voie avant que sa clé soit retenue.
+        """
+        with self._verrou:
+            self._vus[transaction_id] = time.time()
+
+    def annuler(self, decision):
+        """Retire des fenêtres un virement finalement non enregistré"""
+        with self._verrou:
+            self._ajouter(decision.cles, decision.instant, -decision.centimes, -1)
+
+    def exposition(self):
+        """Décisions du moteur au format texte de Prometheus"""
+        lignes = [
+            "# HELP api_velocity_decisions_total Virements contrôlés par le moteur.",
+            "# TYPE api_velocity_decisions_total counter",
+        ]
+        for decision, nombre in self.decisions.items():
+            lignes.append(
+                f'api_velocity_decisions_total{{decision="{decision}"}} {nombre}'
+            )
+        return "\n".join(lignes) + "\n"
+
+
+_moteur = None
+_verrou_moteur = threading.Lock()
+
+
+def moteur_velocite():
+    """Moteur du processus, construit depuis les réglages au premier appel"""
+    global _moteur
+    if _moteur is None:
+        with _verrou_moteur:
+            if _moteur is None:
+                _moteur = MoteurVelocite(
+                    settings.VELOCITY_RULES,
+                    seaux=getattr(settings, "VELOCITY_BUCKETS", 12),
+                    plafond_unitaire=getattr(
+                        settings, "VELOCITY_SINGLE_TRANSFER_MAX", None
+                    ),
+                    intervalle_synchro=getattr(settings, "VELOCITY_SYNC_INTERVAL", 1.0),
+                    recouvrement=getattr(settings, "VELOCITY_SYNC_OVERLAP", 10),
+                )
+    return _moteur
+
+
+def reinitialiser():
+    """Oublie le moteur courant (réglages modifiés, tests)"""
+    global _moteur
+    with _verrou_moteur:
+        _moteur = None
@@ -0,0 +1,80 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import F
+from django.db.transaction import on_commit
+
+from .caches import construire_cache
+from .models import CompteBancaire
+
+cache_verification = construire_cache(
+    "verification_compte",
+    alias=getattr(settings, "VERIFY_ACCOUNT_CACHE_ALIAS", None),
+    taille_max=getattr(settings, "VERIFY_ACCOUNT_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "VERIFY_ACCOUNT_CACHE_TTL", 300),
+)
+
+
+def _cle(numero_compte):
+    # Empreinte fixe : le numéro saisi peut contenir n'importe quel caractère
+    return hashlib.sha1(numero_compte.encode()).hexdigest()
+
+
+def donnees_verification(numero_compte):
+    """
+    Informations de vérification d'un compte approuvé, ou None s'il n'existe pas.
+
+    Lecture à travers le cache : les numéros inconnus sont aussi mis en cache,
+    la saisie au clavier produisant surtout des numéros incomplets. Une seule
+    requête (jointure sur l'utilisateur) en cas d'absence du cache.
+    """
+    cle = _cle(numero_compte)
+    entree = cache_verification.get(cle)
+    if entree is not None:
+        return entree["compte"]
+
+    compte = _requete(numero_compte).first()
+    cache_verification.set(cle, {"compte": compte})
+    return compte
+
+
+async def adonnees_verification(numero_compte):
+    """Variante asynchrone de `donnees_verification`"""
+    cle = _cle(numero_compte)
+    entree = cache_verification.get(cle)
+    if entree is not None:
+        return entree["compte"]
+
+    compte = await _requete(numero_compte).afirst()
+    cache_verification.set(cle, {"compte": compte})
+    return compte
+
+
+def _requete(numero_compte):
+    return CompteBancaire.objects.filter(
+        numero_compte=numero_compte, statut="approuve"
+    ).values(
+        "id",
+        "numero_compte",
+        type=F("utilisateur__role"),
+        nom_proprietaire=F("utilisateur__last_name"),
+        prenom_proprietaire=F("utilisateur__first_name"),
+    )
+
+
+def invalider_verification(numeros_compte):
+    """
+    Retire des numéros du cache, immédiatement et après le commit en cours.
+
+    La seconde invalidation écarte une valeur remise en cache par une lecture
+    concurrente avant que la modification ne soit visible. Seule celle-ci
+    est comptée dans les métriques du cache.
+    """
+    cles = [_cle(numero) for numero in numeros_compte if numero]
+
+    def invalider(compter):
+        for cle in cles:
+            cache_verification.delete(cle, compter=compter)
+
+    invalider(False)
+    on_commit(lambda: invalider(True))
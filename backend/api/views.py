@@ -1,25 +1,67 @@
-from datetime import datetime
+import io
+import logging
+import os
+from datetime import datetime, timedelta
 from decimal import Decimal
 
-from django.db.models import Q
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q, Sum
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.db.transaction import atomic
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import permissions, generics
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from .models import CompteBancaire, Utilisateur, Pret, Transaction
+from . import caches
+from .amortissement import enregistrer_echeanciers
+from .approbations import approuver_en_lot
+from .cumuls import etat_pret, etat_transaction, mettre_a_jour_cumuls
+from .evenements import hub_evenements
+from .idempotence import idempotent
+from .mobile_money import calculer_frais, commentaire_operation, importer_reglements
+from .models import (
+    CompteBancaire,
+    CumulJournalier,
+    Echeance,
+    Utilisateur,
+    Pret,
+    Tache,
+    Transaction,
+)
+from .pagination import TransactionCursorPagination
+from .releves import flux_asynchrone, flux_csv, flux_jsonl, lignes_releve
 from .permissions import IsAdmin, IsClient
+from .profilage import exposition_pools, registre
+from .regles_approbation import moteur_regles
+from .replicas import LectureReplicaMixin
+from .serialisation_rapide import ListeRapideMixin
+from .services import SoldeInsuffisant, crediter, debiter, transferer
+from .synchronisation import synchroniser
+from .taches import differer
+from .velocite import moteur_velocite
+from .verification import donnees_verification
 from .serializers import (
+    ApprobationGroupeeSerializer,
     CompteBancaireSerializer,
+    EcheanceSerializer,
     UtilisateurSerializer,
     PretSerializer,
+    TacheSerializer,
     TransactionSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class InscriptionUtilisateur(generics.CreateAPIView):
     """Endpoint pour l'inscription d'un utilisateur"""
@@ -63,16 +105,19 @@ class CreationCompteBancaire(generics.CreateAPIView):
         serializer.save(utilisateur=self.request.user)
 
 
-class ListeComptesBancaires(generics.ListAPIView):
+class ListeComptesBancaires(
+    LectureReplicaMixin, ListeRapideMixin, generics.ListAPIView
+):
     """Endpoint pour lister tous les comptes bancaires"""
 
     permission_classes = [IsAuthenticated]
     serializer_class = CompteBancaireSerializer
 
     def get_queryset(self):
+        queryset = CompteBancaire.objects.select_related("utilisateur")
         if self.request.user.role == "admin":
-            return CompteBancaire.objects.all()
-        return CompteBancaire.objects.filter(utilisateur=self.request.user)
+            return queryset.all()
+        return queryset.filter(utilisateur=self.request.user)
 
 
 class DetailCompteBancaireClient(generics.RetrieveUpdateDestroyAPIView):
@@ -115,6 +160,65 @@ class DetailCompteBancaireClient(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
+class ReleveCompte(APIView):
+    """
+    Endpoint pour exporter le relevé d'un compte en flux (CSV ou JSONL)
+
+    Paramètres optionnels : `export` (csv par défaut, ou jsonl), `since` et
+    `until` (dates ISO 8601), `asynchrone` (fichier construit par un
+    travailleur, à suivre sur /taches/<id>/ et à télécharger sur
+    /taches/<id>/fichier/). Le flux est synchrone sous WSGI et asynchrone
+    sous ASGI.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        comptes = CompteBancaire.objects.all()
+        if request.user.role != "admin":
+            comptes = comptes.filter(utilisateur=request.user)
+        compte = generics.get_object_or_404(comptes, pk=pk)
+
+        bornes = {}
+        for param in ("since", "until"):
+            valeur = request.query_params.get(param)
+            if valeur:
+                try:
+                    bornes[param] = parse_datetime(valeur)
+                except ValueError:
+                    bornes[param] = None
+                if bornes[param] is None:
+                    raise ValidationError({param: "Date invalide (format ISO 8601)."})
+
+        export = request.query_params.get("export", "csv")
+        if export not in ("csv", "jsonl"):
+            raise ValidationError({"export": "Format attendu : csv ou jsonl."})
+
+        if request.query_params.get("asynchrone") in ("1", "true"):
+            tache = differer(
+                "releve",
+                utilisateur=request.user,
+                compte_id=compte.pk,
+                export=export,
+                **{param: date.isoformat() for param, date in bornes.items()},
+            )
+            return Response(TacheSerializer(tache).data, status=202)
+
+        lignes = lignes_releve(compte.pk, bornes.get("since"), bornes.get("until"))
+        if export == "csv":
+            flux, content_type = flux_csv(lignes), "text/csv; charset=utf-8"
+        else:
+            flux, content_type = flux_jsonl(lignes), "application/x-ndjson"
+        if isinstance(request._request, ASGIRequest):
+            # Un itérateur synchrone serait entièrement tamponné sous ASGI
+            flux = flux_asynchrone(flux)
+        response = StreamingHttpResponse(flux, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="releve-{compte.numero_compte}.{export}"'
+        )
+        return response
+
+
 class FaireUnPret(generics.CreateAPIView):
     """Endpoint pour faire un prêt"""
 
@@ -123,7 +227,6 @@ class FaireUnPret(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         compte = serializer.validated_data.get("compte")
-        print("compte", compte)
 
         # Vérifie que l'utilisateur est propriétaire du compte
         if compte.utilisateur != self.request.user:
@@ -135,7 +238,35 @@ class FaireUnPret(generics.CreateAPIView):
         if compte.statut != "approuve":
             raise ValidationError("Le compte doit être approuvé pour demander un prêt")
 
-        serializer.save(statut="en_attente")
+        moteur = moteur_regles()
+        with atomic():
+            if moteur.utilise_encours("pret"):
+                # Verrouille les comptes de l'utilisateur (par clé croissante,
+                # comme `transferer`) : deux demandes concurrentes lisent son
+                # encours l'une après l'autre, chacune avec le prêt de l'autre
+                list(
+                    CompteBancaire.objects.select_for_update()
+                    .filter(utilisateur_id=compte.utilisateur_id)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)
+                )
+            decision, regle = moteur.evaluer(
+                "pret", compte, serializer.validated_data["montant"]
+            )
+            pret = serializer.save(
+                statut="en_attente", taux_annuel=settings.LOAN_ANNUAL_RATE
+            )
+            mettre_a_jour_cumuls(ajouter=[etat_pret(pret)])
+            if decision is not None:
+                # Même traitement qu'une décision d'administrateur
+                (resultat,) = approuver_en_lot("pret", [pret.pk], decision)
+                logger.info(
+                    "Prêt %s : %s par la règle « %s »",
+                    pret.pk,
+                    resultat["detail"],
+                    regle,
+                )
+                pret.refresh_from_db()
 
 
 class RembourserPret(generics.UpdateAPIView):
@@ -143,7 +274,7 @@ class RembourserPret(generics.UpdateAPIView):
 
     permission_classes = [IsClient]
     serializer_class = PretSerializer
-    queryset = Pret.objects.all()
+    queryset = Pret.objects.select_related("compte__utilisateur")
     lookup_field = "pk"
 
     def update(self, request, *args, **kwargs):
@@ -173,56 +304,67 @@ class RembourserPret(generics.UpdateAPIView):
         if pret.compte.utilisateur != request.user:
             raise PermissionDenied("Vous ne pouvez rembourser que vos propres prêts.")
 
-        # Vérifie que le prêt est en cours
-        if pret.statut != "en_cours":
-            return Response(
-                {
-                    "detail": f"Ce prêt ne peut pas être remboursé car il est '{pret.get_statut_display()}'."
-                },
-                status=400,
-            )
+        try:
+            with atomic():
+                # Verrouille le prêt pour éviter deux remboursements concurrents
+                pret = Pret.objects.select_for_update().get(pk=pret.pk)
+                avant = etat_pret(pret)
+
+                # Vérifie que le prêt est en cours
+                if pret.statut != "en_cours":
+                    return Response(
+                        {
+                            "detail": f"Ce prêt ne peut pas être remboursé car il est '{pret.get_statut_display()}'."
+                        },
+                        status=400,
+                    )
+
+                # Vérifie que le montant de remboursement ne dépasse pas le montant restant du prêt
+                if montant_remboursement > pret.montant:
+                    return Response(
+                        {
+                            "detail": f"Le montant de remboursement ne peut pas dépasser le montant restant du prêt ({pret.montant})."
+                        },
+                        status=400,
+                    )
+
+                # Créer une transaction pour le remboursement
+                transaction = Transaction.objects.create(
+                    compte_source_id=pret.compte_id,
+                    type="pret",
+                    montant=montant_remboursement,
+                    status="succès",
+                    commentaire=f"Remboursement partiel du prêt #{pret.id},"
+                    f" montant: {montant_remboursement}, date {datetime.now()}",
+                )
 
-        # Vérifie que le compte a suffisamment de solde
-        compte = pret.compte
-        if compte.solde < montant_remboursement:
-            return Response(
-                {"detail": "Solde insuffisant pour effectuer ce remboursement."},
-                status=400,
-            )
+                # Débite le compte si son solde est suffisant
+                debiter(
+                    pret.compte_id,
+                    montant_remboursement,
+                    transaction_liee=transaction,
+                    contrepartie="pret",
+                )
+
+                # Mettre à jour le montant du prêt
+                pret.montant -= montant_remboursement
 
-        # Vérifie que le montant de remboursement ne dépasse pas le montant restant du prêt
-        if montant_remboursement > pret.montant:
+                # Si le prêt est entièrement remboursé
+                if pret.montant == 0:
+                    pret.statut = "rembourse"
+                    pret.date_remboursement = timezone.now()
+
+                pret.save()
+                mettre_a_jour_cumuls(
+                    ajouter=[etat_transaction(transaction), etat_pret(pret)],
+                    retirer=[avant],
+                )
+        except SoldeInsuffisant:
             return Response(
-                {
-                    "detail": f"Le montant de remboursement ne peut pas dépasser le montant restant du prêt ({pret.montant})."
-                },
+                {"detail": "Solde insuffisant pour effectuer ce remboursement."},
                 status=400,
             )
 
-        compte.solde -= montant_remboursement
-        compte.save()
-
-        # Mettre à jour le montant du prêt
-        pret.montant -= montant_remboursement
-
-        # Si le prêt est entièrement remboursé
-        if pret.montant == 0:
-            pret.statut = "rembourse"
-            pret.date_remboursement = str(datetime.now())
-
-        pret.save()
-
-        # Créer une transaction pour le remboursement
-        Transaction.objects.create(
-            compte=compte,
-            type="remboursement",
-            montant=montant_remboursement,
-            status="succès",
-            utilisateur=request.user,
-            commentaire=f"Remboursement partiel du prêt #{pret.id},"
-            f" montant: {montant_remboursement}, date {datetime.now()}",
-        )
-
         return Response(
             {
                 "detail": "Remboursement effectué avec succès.",
@@ -236,36 +378,114 @@ class ApprouverRejeterPret(generics.UpdateAPIView):
 
     permission_classes = [IsAdmin]
     serializer_class = PretSerializer
-    queryset = Pret.objects.all()
+    queryset = Pret.objects.select_related("compte__utilisateur")
     lookup_field = "pk"
 
     def perform_update(self, serializer):
         pret = serializer.instance
         nouveau_statut = serializer.validated_data.get("statut")
-        print(serializer.validated_data)
-
-        # Si le prêt est approuvé
-        if nouveau_statut == "approuve":
-            pret.statut = "en_cours"
-            compte = pret.compte
-            compte.solde += Decimal(pret.montant)
-            compte.save()
+        logger.debug("Mise à jour du prêt %s : %s", pret.pk, serializer.validated_data)
+
+        with atomic():
+            # Verrouille le prêt pour ne créditer le compte qu'une seule fois
+            avant = etat_pret(Pret.objects.select_for_update().get(pk=pret.pk))
+            ajouts = []
+
+            # Si le prêt est approuvé
+            if nouveau_statut == "approuve":
+                if avant.statut != "en_attente":
+                    raise ValidationError("Ce prêt n'est plus en attente d'approbation")
+                pret.statut = "en_cours"
+                pret.date_debut = timezone.localdate()
+                pret.montant_initial = pret.montant
+
+                # Le déblocage du prêt est inscrit comme une transaction
+                transaction = Transaction.objects.create(
+                    compte_source_id=pret.compte_id,
+                    type="pret",
+                    montant=pret.montant,
+                    status="succès",
+                    commentaire=f"Déblocage du prêt #{pret.id},"
+                    f" montant: {pret.montant}, date {datetime.now()}",
+                )
+                crediter(
+                    pret.compte_id,
+                    pret.montant,
+                    transaction_liee=transaction,
+                    contrepartie="pret",
+                )
+                ajouts.append(etat_transaction(transaction))
 
-        serializer.save()
+            pret = serializer.save()
+            if pret.statut == "en_cours" and avant.statut == "en_attente":
+                enregistrer_echeanciers(ids=[pret.pk])
+            ajouts.append(etat_pret(pret))
+            mettre_a_jour_cumuls(ajouter=ajouts, retirer=[avant])
         return Response(serializer.data)
 
 
-class ListePret(generics.ListAPIView):
+class EcheancierPret(LectureReplicaMixin, generics.ListAPIView):
+    """Endpoint pour consulter l'échéancier d'un prêt"""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = EcheanceSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        prets = Pret.objects.all()
+        if self.request.user.role != "admin":
+            prets = prets.filter(compte__utilisateur=self.request.user)
+        if not prets.filter(pk=self.kwargs["pk"]).exists():
+            raise NotFound("Prêt introuvable.")
+        return Echeance.objects.filter(pret_id=self.kwargs["pk"])
+
+
+class ApprobationGroupee(APIView):
+    """Endpoint pour approuver ou rejeter en masse des virements, prêts ou comptes"""
+
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        serializer = ApprobationGroupeeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if serializer.validated_data["asynchrone"]:
+            tache = differer(
+                "approbation_groupee",
+                utilisateur=request.user,
+                type=serializer.validated_data["type"],
+                ids=serializer.validated_data["ids"],
+                decision=serializer.validated_data["decision"],
+            )
+            return Response(TacheSerializer(tache).data, status=202)
+
+        resultats = approuver_en_lot(
+            serializer.validated_data["type"],
+            serializer.validated_data["ids"],
+            serializer.validated_data["decision"],
+        )
+        return Response(
+            {
+                "traites": len(resultats),
+                "succes": sum(resultat["succes"] for resultat in resultats),
+                "resultats": resultats,
+            }
+        )
+
+
+class ListePret(LectureReplicaMixin, ListeRapideMixin, generics.ListAPIView):
     """Endpoint pour lister tous les prets"""
 
     permission_classes = [IsAuthenticated]  # Changement ici
     serializer_class = PretSerializer
 
     def get_queryset(self):
+        # Charger compte et utilisateur en une seule requête (compte_numero, utilisateur_nom)
+        queryset = Pret.objects.select_related("compte__utilisateur")
         if self.request.user.role == "admin":
-            return Pret.objects.all()
+            return queryset.all()
         elif self.request.user.role == "client":
-            return Pret.objects.filter(compte__utilisateur=self.request.user)
+            return queryset.filter(compte__utilisateur=self.request.user)
         else:
             return (
                 Pret.objects.none()
@@ -278,9 +498,12 @@ class EffectuerTransaction(generics.CreateAPIView):
     permission_classes = [IsClient]
     serializer_class = TransactionSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        # Log des données validées pour le débogage
-        print("Données validées:", serializer.validated_data)
+        logger.debug("Données validées : %s", serializer.validated_data)
         compte_source = serializer.validated_data.get("compte_source")
         montant = serializer.validated_data.get("montant")
         compte_destination = serializer.validated_data.get("compte_destination", None)
@@ -306,8 +529,47 @@ class EffectuerTransaction(generics.CreateAPIView):
         if compte_source.solde < montant:
             raise ValidationError("Solde insuffisant pour effectuer ce virement")
 
-        # Pour les virements, on met en attente pour approbation par un admin
-        serializer.save()
+        decision, regle = moteur_regles().evaluer("virement", compte_source, montant)
+        if decision == "rejete":
+            serializer.save(
+                type="transfert",
+                status="échoué",
+                alertes=f"Rejeté par la règle : {regle}",
+            )
+            return
+
+        # Un virement approuvé par les règles reste soumis à la vélocité
+        moteur = moteur_velocite() if settings.VELOCITY_ENABLED else None
+        controle = (
+            moteur.evaluer(compte_source.pk, compte_source.utilisateur_id, montant)
+            if moteur is not None
+            else None
+        )
+        motifs = controle.motifs if controle is not None else []
+        try:
+            with atomic():
+                if decision == "approuve" and not motifs:
+                    transaction = serializer.save(type="transfert", status="succès")
+                    transferer(
+                        compte_source.pk,
+                        compte_destination.pk,
+                        montant,
+                        transaction_liee=transaction,
+                    )
+                else:
+                    # Approbation par un administrateur
+                    transaction = serializer.save(
+                        type="transfert",
+                        status="en_attente",
+                        alertes="; ".join(motifs),
+                    )
+                if controle is not None:
+                    # Avant la validation : aucune relecture ne le recompte
+                    moteur.confirmer(transaction.pk)
+        except Exception:
+            if controle is not None:
+                moteur.annuler(controle)
+            raise
 
 
 class ApprouverRejeterVirement(generics.UpdateAPIView):
@@ -315,7 +577,9 @@ class ApprouverRejeterVirement(generics.UpdateAPIView):
 
     permission_classes = [IsAdmin]
     serializer_class = TransactionSerializer
-    queryset = Transaction.objects.filter(type="transfert")
+    queryset = Transaction.objects.filter(type="transfert").select_related(
+        "compte_source", "compte_destination"
+    )
     lookup_field = "pk"
 
     def perform_update(self, serializer):
@@ -326,23 +590,28 @@ class ApprouverRejeterVirement(generics.UpdateAPIView):
         if transaction.type != "transfert":
             raise ValidationError("Cette transaction n'est pas un virement")
 
-        # Vérifie que le virement est en attente
-        if transaction.status != "en_attente":
-            raise ValidationError("Ce virement n'est plus en attente d'approbation")
-
-        if nouveau_statut == "succès":
-            compte = transaction.compte_source
-            compte_destinataire = transaction.compte_destination
+        with atomic():
+            # Verrouille le virement pour éviter une double approbation
+            avant = etat_transaction(
+                Transaction.objects.select_for_update().get(pk=transaction.pk)
+            )
 
-            if compte.solde < transaction.montant:
-                raise ValidationError("Solde insuffisant pour effectuer ce virement")
+            # Vérifie que le virement est en attente
+            if avant.statut != "en_attente":
+                raise ValidationError("Ce virement n'est plus en attente d'approbation")
 
-            compte.solde -= transaction.montant
-            compte_destinataire.solde += transaction.montant
-            compte.save()
-            compte_destinataire.save()
+            if nouveau_statut == "succès":
+                transferer(
+                    transaction.compte_source_id,
+                    transaction.compte_destination_id,
+                    transaction.montant,
+                    transaction_liee=transaction,
+                )
 
-        serializer.save()
+            transaction = serializer.save()
+            mettre_a_jour_cumuls(
+                ajouter=[etat_transaction(transaction)], retirer=[avant]
+            )
         return Response(
             {"message": f"Virement {nouveau_statut}", "transaction": serializer.data}
         )
@@ -354,6 +623,7 @@ class MobileMoneyTransactionView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = TransactionSerializer
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         compte_id = request.data.get("compte")
         montant = Decimal(request.data.get("montant", 0))  # Convert to Decimal here
@@ -380,73 +650,278 @@ class MobileMoneyTransactionView(generics.CreateAPIView):
             )
 
         # Calcul des frais selon le fournisseur
-        frais_pourcentage = {
-            "mvola": {"depot": 0.003, "retrait": 0.008},
-            "orange_money": {"depot": 0.005, "retrait": 0.01},
-        }.get(fournisseur, {"depot": 0.005, "retrait": 0.01})
-
-        frais = montant * Decimal(frais_pourcentage.get(type_transaction, 0.005))
+        frais = calculer_frais(fournisseur, type_transaction, montant)
+        commentaire = commentaire_operation(
+            type_transaction, fournisseur, numero_telephone, montant, frais
+        )
 
-        # Pour un retrait, vérifier que le solde est suffisant
-        if type_transaction == "retrait":
-            montant_total = montant + frais
-            if compte.solde < montant_total:
-                return Response(
-                    {
-                        "detail": f"Solde insuffisant. Montant demandé: {montant} + frais: {frais}"
-                    },
-                    status=400,
+        try:
+            with atomic():
+                # Créer la transaction
+                transaction = Transaction.objects.create(
+                    compte_source=compte,  # Use compte_source instead of compte
+                    type=type_transaction,
+                    montant=montant,
+                    status="succès",
+                    commentaire=commentaire,
+                    # frais field doesn't exist in the model
                 )
 
-            # Effectuer le retrait
-            compte.solde -= montant_total
-            compte.save()
-
-            commentaire = f"Retrait via {fournisseur} ({numero_telephone}). Montant: {montant}, Frais: {frais}"
-        else:  # dépôt
-            # Effectuer le dépôt
-            montant_net = montant - frais
-            compte.solde += montant_net
-            compte.save()
-
-            commentaire = f"Dépôt via {fournisseur} ({numero_telephone}). Montant: {montant}, Frais: {frais}"
-
-        # Créer la transaction
-        transaction = Transaction.objects.create(
-            compte_source=compte,  # Use compte_source instead of compte
-            type=type_transaction,
-            montant=montant,
-            status="succès",
-            commentaire=commentaire,
-            # frais field doesn't exist in the model
-        )
+                # Pour un retrait, le solde est vérifié dans la requête de débit
+                if type_transaction == "retrait":
+                    nouveau_solde = debiter(
+                        compte.id,
+                        montant + frais,
+                        transaction_liee=transaction,
+                        contrepartie=fournisseur,
+                    )
+                else:  # dépôt
+                    nouveau_solde = crediter(
+                        compte.id,
+                        montant - frais,
+                        transaction_liee=transaction,
+                        contrepartie=fournisseur,
+                    )
+                mettre_a_jour_cumuls(ajouter=[etat_transaction(transaction)])
+        except SoldeInsuffisant:
+            return Response(
+                {
+                    "detail": f"Solde insuffisant. Montant demandé: {montant} + frais: {frais}"
+                },
+                status=400,
+            )
 
         return Response(
             {
                 "detail": f"{type_transaction.capitalize()} effectué avec succès.",
                 "transaction": TransactionSerializer(transaction).data,
-                "nouveau_solde": compte.solde,
+                "nouveau_solde": nouveau_solde,
             },
             status=201,
         )
 
 
-class ListTransaction(generics.ListAPIView):
-    """Endpoint pour lister les transactions d'un utilisateur"""
+class ImportReglementsMobileMoney(APIView):
+    """Endpoint pour importer un fichier de règlement Mobile Money (CSV ou JSONL)"""
+
+    permission_classes = [IsAdmin]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        fichier = request.FILES.get("fichier")
+        if not fichier:
+            return Response({"detail": "Le fichier est requis."}, status=400)
+
+        format_fichier = request.data.get("format") or (
+            "jsonl" if fichier.name.endswith((".jsonl", ".json")) else "csv"
+        )
+        if format_fichier not in ("csv", "jsonl"):
+            return Response({"detail": "Format attendu : csv ou jsonl."}, status=400)
+
+        flux = io.TextIOWrapper(fichier.file, encoding="utf-8-sig", newline="")
+        rapport = importer_reglements(flux, format_fichier)
+        return Response(rapport.as_dict())
+
+
+class ListTransaction(LectureReplicaMixin, ListeRapideMixin, generics.ListAPIView):
+    """
+    Endpoint pour lister les transactions d'un utilisateur
+
+    Filtres optionnels : `since`, `until` (dates ISO 8601), `type` et `status`.
+    La pagination par curseur s'active avec `cursor` ou `page_size`.
+    """
 
     permission_classes = [IsAuthenticated]
     serializer_class = TransactionSerializer
+    pagination_class = TransactionCursorPagination
 
     def get_queryset(self):
         if self.request.user.role == "admin":
             # Récupérer toutes les transactions, triées par date décroissante
-            return Transaction.objects.all().order_by("-date_transaction")
+            queryset = Transaction.objects.all()
+        else:
+            # Récupérer les transactions où l'utilisateur est source OU destinataire
+            user_accounts = CompteBancaire.objects.filter(utilisateur=self.request.user)
+            queryset = Transaction.objects.filter(
+                Q(compte_source__in=user_accounts)
+                | Q(compte_destination__in=user_accounts)
+            )
+        # Charger les comptes liés en une seule requête (source_numero, destination_numero)
+        return (
+            self.filter_transactions(queryset)
+            .select_related("compte_source", "compte_destination")
+            .order_by("-date_transaction", "-id")
+        )
 
-        # Récupérer les transactions où l'utilisateur est source OU destinataire
-        user_accounts = CompteBancaire.objects.filter(utilisateur=self.request.user)
-        return Transaction.objects.filter(
-            Q(compte_source__in=user_accounts) | Q(compte_destination__in=user_accounts)
-        ).order_by("-date_transaction")
+    def filter_transactions(self, queryset):
+        params = self.request.query_params
+
+        for param, lookup in (
+            ("since", "date_transaction__gte"),
+            ("until", "date_transaction__lt"),
+        ):
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                # ValueError : format reconnu mais date impossible (30 février)
+                date = parse_datetime(value)
+            except ValueError:
+                date = None
+            if date is None:
+                raise ValidationError({param: "Date invalide (format ISO 8601)."})
+            queryset = queryset.filter(**{lookup: date})
+
+        if params.get("type"):
+            queryset = queryset.filter(type=params["type"])
+        if params.get("status"):
+            queryset = queryset.filter(status=params["status"])
+        return queryset
+
+
+class Statistiques(LectureReplicaMixin, APIView):
+    """
+    Endpoint des indicateurs du tableau de bord administrateur
+
+    Lit uniquement les cumuls journaliers. Paramètres optionnels : `since` et
+    `until` (dates AAAA-MM-JJ, 30 derniers jours par défaut).
+    """
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        fin = self.lire_date("until") or timezone.localdate()
+        debut = self.lire_date("since") or fin - timedelta(days=29)
+        cumuls = CumulJournalier.objects.filter(jour__gte=debut, jour__lte=fin)
+
+        par_type = (
+            cumuls.values("categorie", "statut")
+            .annotate(nombre=Sum("nombre"), montant=Sum("montant"))
+            .order_by("categorie", "statut")
+        )
+        par_jour = (
+            cumuls.exclude(categorie__in=["pret", "interets"])
+            .values("jour")
+            .annotate(nombre=Sum("nombre"), montant=Sum("montant"))
+            .order_by("jour")
+        )
+        # Éléments en attente et encours des prêts, toutes dates confondues
+        etats = {
+            (ligne["categorie"], ligne["statut"]): ligne
+            for ligne in CumulJournalier.objects.filter(
+                Q(statut="en_attente") | Q(categorie="pret", statut="en_cours")
+            )
+            .values("categorie", "statut")
+            .annotate(nombre=Sum("nombre"), montant=Sum("montant"))
+            .order_by()
+        }
+        vide = {"nombre": 0, "montant": Decimal("0")}
+
+        return Response(
+            {
+                "periode": {"debut": debut, "fin": fin},
+                "par_type": list(par_type),
+                "par_jour": list(par_jour),
+                "virements_en_attente": etats.get(("transfert", "en_attente"), vide)[
+                    "nombre"
+                ],
+                "prets_en_attente": etats.get(("pret", "en_attente"), vide)["nombre"],
+                "encours_prets": {
+                    "nombre": etats.get(("pret", "en_cours"), vide)["nombre"],
+                    "montant": etats.get(("pret", "en_cours"), vide)["montant"],
+                },
+            }
+        )
+
+    def lire_date(self, param):
+        valeur = self.request.query_params.get(param)
+        if not valeur:
+            return None
+        try:
+            date = parse_date(valeur)
+        except ValueError:
+            date = None
+        if date is None:
+            raise ValidationError({param: "Date invalide (format AAAA-MM-JJ)."})
+        return date
+
+
+class Synchronisation(LectureReplicaMixin, APIView):
+    """
+    Endpoint de synchronisation incrémentale des comptes, transactions et prêts
+
+    Sans paramètre, retourne toutes les lignes visibles et un `jeton` ; avec
+    `depuis=<jeton>`, seulement les lignes créées ou modifiées depuis, les
+    comptes supprimés et les transactions supprimées avec le compte d'un
+    autre utilisateur. `limite` borne le nombre de lignes par modèle : tant
+    que `complet` est faux, rappeler aussitôt avec le nouveau jeton.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        limite = request.query_params.get("limite")
+        if limite is not None:
+            try:
+                limite = int(limite)
+            except ValueError:
+                limite = 0
+            if limite < 1:
+                raise ValidationError({"limite": "Entier positif attendu."})
+        return Response(
+            synchroniser(request, request.query_params.get("depuis"), limite)
+        )
+
+
+class SuiviTache(generics.RetrieveAPIView):
+    """Endpoint pour suivre une tâche différée (statut, résultat)"""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = TacheSerializer
+
+    def get_queryset(self):
+        if self.request.user.role == "admin":
+            return Tache.objects.all()
+        return Tache.objects.filter(utilisateur=self.request.user)
+
+
+class FichierTache(SuiviTache):
+    """
+    Endpoint pour télécharger le relevé produit par une tâche différée
+
+    Réservé au demandeur de la tâche et aux administrateurs ; le fichier est
+    lu dans le stockage privé, qui n'a pas d'URL publique.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        tache = self.get_object()
+        if tache.nom != "releve" or tache.statut != "terminee":
+            raise NotFound("Aucun fichier pour cette tâche.")
+        stockage, nom = storages["prive"], tache.resultat["fichier"]
+        if not stockage.exists(nom):
+            raise NotFound("Fichier expiré ou supprimé.")
+        return FileResponse(
+            stockage.open(nom, "rb"),
+            as_attachment=True,
+            filename=os.path.basename(nom),
+        )
+
+
+class Metriques(APIView):
+    """Endpoint des métriques (profilage, caches, pools, contrôles) au format Prometheus"""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return HttpResponse(
+            registre.exposition()
+            + caches.exposition()
+            + exposition_pools()
+            + moteur_velocite().exposition()
+            + moteur_regles().exposition()
+            + hub_evenements().exposition(),
+            content_type="text/plain; version=0.0.4",
+        )
 
 
 @api_view(["POST"])
@@ -458,25 +933,15 @@ def verify_account(request):
     if not numero_compte:
         return Response({"error": "Numéro de compte requis"}, status=400)
 
-    try:
-        compte = CompteBancaire.objects.get(
-            numero_compte=numero_compte, statut="approuve"
-        )
-        # Retourner uniquement les informations nécessaires pour la vérification
-        return Response(
-            {
-                "id": compte.id,
-                "type": compte.utilisateur.role,
-                "numero_compte": compte.numero_compte,
-                "nom_proprietaire": compte.utilisateur.last_name,
-                "prenom_proprietaire": compte.utilisateur.first_name,
-            }
-        )
-    except CompteBancaire.DoesNotExist:
+    # Uniquement les informations nécessaires pour la vérification, mises en cache
+    compte = donnees_verification(str(numero_compte))
+    if compte is None:
         return Response({"error": "Compte non trouvé ou non approuvé"}, status=404)
+    return Response(compte)
 
 
 class Epargne(APIView):
+    @idempotent
     def post(self, request):
         compte_id = request.data.get("compte")
         montant = request.data.get("montant")
@@ -484,26 +949,25 @@ class Epargne(APIView):
         compte_epargne = request.data.get("compte_epargne")
 
         if compte_id and montant and compte_epargne:
-            compte = CompteBancaire.objects.get(id=compte_id)
-            if compte.solde < montant:
+            try:
+                with atomic():
+                    transaction = Transaction.objects.create(
+                        compte_source_id=compte_id,
+                        type="transfert",
+                        compte_destination_id=compte_epargne,
+                        montant=montant,
+                        status="succès",
+                        commentaire=f"Epargne effectué, montant: {montant}, date {datetime.now()}",
+                    )
+                    transferer(
+                        compte_id, compte_epargne, montant, transaction_liee=transaction
+                    )
+                    mettre_a_jour_cumuls(ajouter=[etat_transaction(transaction)])
+            except SoldeInsuffisant:
                 return Response(
-                    {"detail": "Solde insuffisant pour effectuer ce virement"}
+                    {"detail": "Solde insuffisant pour effectuer ce virement"},
+                    status=400,
                 )
-            compte.solde -= montant
-            compte.save()
-
-            compte_epargne = CompteBancaire.objects.get(id=compte_epargne)
-            compte_epargne.solde += montant
-            compte_epargne.save()
-
-            Transaction.objects.create(
-                compte_source=compte,
-                type="transfert",
-                compte_destination=compte_epargne,
-                montant=montant,
-                status="succès",
-                commentaire=f"Epargne effectué, montant: {montant}, date {datetime.now()}",
-            )
 
             return Response({"detail": "Epargne effectué avec succès"})
         else:
@@ -0,0 +1,164 @@
+import json
+from functools import partial, wraps
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import JWTAuthenticationEnCache, JWTAuthenticationParametre
+from .evenements import hub_evenements
+from .models import Utilisateur
+from .pagination import TransactionCursorPagination
+from .replicas import lecture_replica
+from .serializers import UtilisateurSerializer
+from .verification import adonnees_verification
+from .views import ListePret, ListeComptesBancaires, ListTransaction
+
+authentification = JWTAuthenticationEnCache()
+authentification_flux = JWTAuthenticationParametre()
+PARSEURS = [parser() for parser in api_settings.DEFAULT_PARSER_CLASSES]
+
+
+def _reponse(donnees, status=200):
+    return JsonResponse(donnees, encoder=JSONEncoder, safe=False, status=status)
+
+
+def vue_async(vue=None, *, authentification=authentification):
+    """
+    Décorateur des vues asynchrones réservées aux utilisateurs authentifiés.
+
+    Les vues reçoivent une `Request` DRF (pour `query_params` et `data`) dont
+    l'utilisateur est résolu par `authentification.aauthenticate`
+    (`JWTAuthenticationEnCache` par défaut).
+    Comme les vues synchrones équivalentes, les GET lisent sur un réplica.
+    Les exceptions DRF sont rendues comme le ferait une vue DRF.
+    """
+    if vue is None:
+        return partial(vue_async, authentification=authentification)
+
+    @csrf_exempt
+    @wraps(vue)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            resultat = await authentification.aauthenticate(request)
+            if resultat is None:
+                raise NotAuthenticated()
+            drf_request = Request(request, parsers=PARSEURS)
+            drf_request.user, drf_request.auth = resultat
+            if request.method != "GET":
+                return await vue(drf_request, *args, **kwargs)
+            with lecture_replica(drf_request.user):
+                return await vue(drf_request, *args, **kwargs)
+        except APIException as exc:
+            response = _reponse({"detail": exc.detail}, exc.status_code)
+            if exc.status_code == 401:
+                response["WWW-Authenticate"] = authentification.authenticate_header(
+                    request
+                )
+            return response
+
+    return wrapper
+
+
+async def _liste(vue_sync, request):
+    # Le queryset et le serializer sont ceux de la vue synchrone équivalente
+    vue = vue_sync(request=request, format_kwarg=None)
+    instances = [instance async for instance in vue.get_queryset()]
+    return vue.get_serializer(instances, many=True).data
+
+
+@require_GET
+@vue_async
+async def liste_transactions(request):
+    """Variante asynchrone de `ListTransaction`, avec la même pagination par curseur"""
+    vue = ListTransaction(request=request, format_kwarg=None)
+    queryset = vue.get_queryset()
+    paginator = TransactionCursorPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    if page is None:
+        instances = [instance async for instance in queryset]
+        return _reponse(vue.get_serializer(instances, many=True).data)
+    donnees = vue.get_serializer(page, many=True).data
+    return _reponse(paginator.get_paginated_response(donnees).data)
+
+
+@require_GET
+@vue_async
+async def liste_comptes(request):
+    """Variante asynchrone de `ListeComptesBancaires`"""
+    return _reponse(await _liste(ListeComptesBancaires, request))
+
+
+@require_GET
+@vue_async
+async def liste_prets(request):
+    """Variante asynchrone de `ListePret`"""
+    return _reponse(await _liste(ListePret, request))
+
+
+@require_GET
+@vue_async
+async def user_info(request):
+    """Variante asynchrone de `UserInfo`"""
+    utilisateur = await Utilisateur.objects.prefetch_related("comptes").aget(
+        pk=request.user.pk
+    )
+    return _reponse(UtilisateurSerializer(utilisateur).data)
+
+
+@require_POST
+@vue_async
+async def verify_account(request):
+    """Variante asynchrone de `verify_account`"""
+    numero_compte = request.data.get("numero_compte")
+
+    if not numero_compte:
+        return _reponse({"error": "Numéro de compte requis"}, status=400)
+
+    compte = await adonnees_verification(str(numero_compte))
+    if compte is None:
+        return _reponse({"error": "Compte non trouvé ou non approuvé"}, status=404)
+    return _reponse(compte)
+
+
+@require_GET
+@vue_async(authentification=authentification_flux)
+async def evenements(request):
+    """
+    Flux server-sent events des changements de l'utilisateur : « solde »
+    (compte, nouveau solde), « transaction » et « pret » (création ou
+    changement de statut), « resync » si le client a pris trop de retard.
+
+    Un commentaire est envoyé toutes les `EVENTS_HEARTBEAT` secondes pour
+    garder la connexion ouverte ; un client inactif ne coûte aucune requête.
+    À servir sous ASGI : sous WSGI, chaque client occuperait un thread.
+    """
+    hub = hub_evenements()
+    abonnement = hub.abonner(request.user.pk)
+    battement = getattr(settings, "EVENTS_HEARTBEAT", 15)
+
+    async def flux():
+        try:
+            yield f"retry: {getattr(settings, 'EVENTS_RETRY_MS', 3000)}\n\n"
+            async for evenement in abonnement.lire(battement):
+                if evenement is None:
+                    yield ": ping\n\n"
+                    continue
+                type_evenement, donnees = evenement
+                yield (
+                    f"event: {type_evenement}\n"
+                    f"data: {json.dumps(donnees, cls=JSONEncoder)}\n\n"
+                )
+        finally:
+            hub.desabonner(abonnement)
+
+    response = StreamingHttpResponse(flux(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Pas de mise en tampon par un proxy nginx
+    response["X-Accel-Buffering"] = "no"
+    return response
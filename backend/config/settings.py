@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
 from datetime import timedelta
+from decimal import Decimal
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -56,7 +58,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.JWTAuthenticationEnCache",
     ],
 }
 
@@ -74,6 +76,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.profilage.ProfilageMiddleware",
+    "api.replicas.EcritureCollanteMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -99,17 +103,67 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Réutilisation des connexions : soit persistantes (DB_CONN_MAX_AGE secondes,
+# 0 pour fermer après chaque requête), soit empruntées à un pool psycopg 3
+# (DB_POOL). Django interdit de combiner les deux.
+DB_POOL = os.getenv("DB_POOL", "False") == "True"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "django.db.backends.postgresql",
         "NAME": os.getenv("DB_NAME"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        # Vérifie une connexion persistante, ou empruntée au pool, avant usage
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        "OPTIONS": {},
     }
 }
 
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        # Attente maximale d'une connexion libre, en secondes
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        # Connexions inutilisées fermées au-delà de min_size, en secondes
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "600")),
+    }
+
+# Réplicas en lecture : DB_REPLICA_HOSTS="hote1,hote2" déclare les alias
+# replica1, replica2... de même configuration que default. Les vues et tâches
+# qui l'activent (api.replicas) y lisent, sauf juste après une écriture.
+for numero, hote in enumerate(
+    filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1
+):
+    DATABASES[f"replica{numero}"] = {
+        **DATABASES["default"],
+        "HOST": hote.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["api.replicas.RouteurReplicas"]
+
+# Tests (manage.py test) : sans DB_REPLICA_HOSTS, replica1 est un miroir de la
+# base de test, pour exercer le routage (api/tests/test_replicas.py). Il
+# n'entre pas dans DATABASE_REPLICAS : les tests l'activent explicitement.
+if sys.argv[1:2] == ["test"] and "replica1" not in DATABASES:
+    DATABASES["replica1"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+
+
+# Cache partagé entre processus (paquet redis requis) : REDIS_URL="redis://hote:6379/0".
+# Sans lui, le cache par défaut de Django est propre à chaque processus.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -154,5 +208,120 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "api.Utilisateur"
 
+# Grand livre : un solde instantané est enregistré toutes les N écritures d'un compte
+LEDGER_SNAPSHOT_INTERVAL = 100
+
+# Numéros de compte réservés par blocs de N dans la table CompteurNumero
+ACCOUNT_NUMBER_BLOCK_SIZE = 100
+
+# Taux annuel appliqué aux nouvelles demandes de prêt (0.12 = 12 %)
+LOAN_ANNUAL_RATE = Decimal("0.12")
+
+# Idempotence des POST qui déplacent de l'argent (en-tête Idempotency-Key)
+IDEMPOTENCY_CACHE_SIZE = 10000
+IDEMPOTENCY_CACHE_TTL = 3600  # secondes
+
+# Cache de vérification des numéros de compte : LRU local par défaut, ou alias
+# d'un cache de CACHES (Redis, Memcached...) partagé entre processus
+VERIFY_ACCOUNT_CACHE_ALIAS = None
+VERIFY_ACCOUNT_CACHE_SIZE = 10000
+VERIFY_ACCOUNT_CACHE_TTL = 300  # secondes
+
+# Cache des utilisateurs authentifiés par JWT : utilisé seulement si l'alias
+# est partagé entre processus (REDIS_URL), pour qu'une désactivation ou un
+# changement de rôle soit vu partout ; sinon l'utilisateur est relu en base
+JWT_USER_CACHE_ALIAS = os.getenv("JWT_USER_CACHE_ALIAS", "default")
+JWT_USER_CACHE_TTL = 300  # secondes
+
+# Fenêtre pendant laquelle un utilisateur qui vient d'écrire lit sur le
+# primaire, et alias de CACHES qui la mémorise : les réplicas ne sont utilisés
+# que si cet alias est partagé entre processus (REDIS_URL)
+REPLICA_STICKINESS_SECONDS = int(os.getenv("REPLICA_STICKINESS_SECONDS", "10"))
+REPLICA_STICKINESS_CACHE_ALIAS = os.getenv("REPLICA_STICKINESS_CACHE_ALIAS", "default")
+
+# Listes (transactions, comptes, prêts) sérialisées par api.serialisation_rapide
+# plutôt que par les champs DRF, pour une sortie identique. Sur activation :
+# FAST_LIST_SERIALIZATION=True
+FAST_LIST_SERIALIZATION = os.getenv("FAST_LIST_SERIALIZATION", "False") == "True"
+
+# Contrôle de vélocité des virements (api.velocite) : un virement sous toutes
+# les limites est exécuté aussitôt, les autres attendent un administrateur
+VELOCITY_ENABLED = os.getenv("VELOCITY_ENABLED", "True") == "True"
+VELOCITY_RULES = [
+    # (portée, fenêtre en secondes, montant maximal, nombre maximal)
+    ("compte", 3600, Decimal("500000"), 5),
+    ("compte", 86400, Decimal("2000000"), 20),
+    ("utilisateur", 86400, Decimal("5000000"), 40),
+]
+VELOCITY_SINGLE_TRANSFER_MAX = Decimal("1000000")
+VELOCITY_BUCKETS = 12  # seaux par fenêtre : précision de 1/12 de la fenêtre
+VELOCITY_SYNC_INTERVAL = 1.0  # secondes entre deux relectures des virements
+# Secondes relues avant la relecture précédente : durée maximale entre la
+# création d'un virement et la validation de sa transaction
+VELOCITY_SYNC_OVERLAP = 10
+
+# Approbation automatique (api.regles_approbation) : pour chaque type
+# d'opération, la première règle dont toutes les conditions sont remplies
+# approuve ou rejette ; sinon l'opération attend un administrateur.
+# Conditions : montant_min/max, anciennete_jours_min/max (ouverture du compte),
+# encours_min/max (prêts en cours ou en attente de l'utilisateur, demande
+# comprise) et roles. Un virement approuvé reste soumis à la vélocité.
+APPROVAL_RULES = {
+    "virement": [
+        ("virements courants", "approuve", {"montant_max": Decimal("1000000")}),
+    ],
+    "pret": [
+        ("encours excessif", "rejete", {"encours_min": Decimal("20000000")}),
+        (
+            "petits prêts clients établis",
+            "approuve",
+            {
+                "montant_max": Decimal("1000000"),
+                "anciennete_jours_min": 90,
+                "encours_max": Decimal("3000000"),
+                "roles": ["client"],
+            },
+        ),
+    ],
+}
+
+# File de tâches différées (api.taches), exécutées par `manage.py runworker`
+JOB_QUEUE_MAX_ATTEMPTS = 5
+JOB_QUEUE_RETRY_DELAY = 10  # secondes avant la 2e tentative, doublé ensuite
+JOB_QUEUE_LOCK_TIMEOUT = 600  # réservation non renouvelée depuis : reprise
+JOB_QUEUE_HEARTBEAT_INTERVAL = 60  # secondes entre deux renouvellements
+JOB_QUEUE_POLL_INTERVAL = 1.0  # secondes d'attente quand la file est vide
+
+# Événements poussés aux clients (server-sent events sur /api/async/evenements/).
+# HubLocal diffuse dans le processus ; avec plusieurs processus serveur,
+# api.evenements.HubPostgres les relaie par LISTEN/NOTIFY.
+EVENTS_ENABLED = os.getenv("EVENTS_ENABLED", "True") == "True"
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "api.evenements.HubLocal")
+EVENTS_OPTIONS = {"taille_file": 100}
+EVENTS_HEARTBEAT = 15  # secondes entre deux commentaires de maintien
+EVENTS_RETRY_MS = 3000  # délai de reconnexion conseillé aux clients
+
+# Synchronisation incrémentale (api/sync/) : lignes par modèle et par appel,
+# et marge relue à chaque appel pour les écritures validées ou répliquées
+# tardivement
+SYNC_PAGE_SIZE = 500
+SYNC_OVERLAP_SECONDS = 10
+
+# Histogrammes de durée et de requêtes SQL par endpoint, exposés sur /api/metrics/
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False") == "True"
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Fichiers produits pour un utilisateur (relevés différés) : hors de
+# MEDIA_ROOT, jamais servis par /media/, téléchargés par api/taches/<id>/fichier/
+# après contrôle du demandeur
+PRIVATE_MEDIA_ROOT = os.getenv("PRIVATE_MEDIA_ROOT", os.path.join(BASE_DIR, "prive"))
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "prive": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": PRIVATE_MEDIA_ROOT},
+    },
+}